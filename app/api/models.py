@@ -12,6 +12,7 @@ class LLMProvider(str, Enum):
 
     GEMINI = "gemini"
     OPENAI = "openai"
+    STUB = "stub"
 
 
 class QuestionRequest(BaseModel):
@@ -28,7 +29,52 @@ class QuestionRequest(BaseModel):
     )
     provider: LLMProvider | None = Field(
         default=None,
-        description="LLM provider to use: 'gemini' or 'openai'. If not set, uses default fallback order.",
+        description="LLM provider to use: 'gemini', 'openai' or 'stub'. If not set, uses default fallback order.",
+    )
+    ef_search: int | None = Field(
+        default=None,
+        ge=1,
+        le=4096,
+        description="HNSW search breadth override; higher trades latency for recall.",
+    )
+    nprobe: int | None = Field(
+        default=None,
+        ge=1,
+        le=65536,
+        description="IVF lists probed per query; higher trades latency for recall.",
+    )
+    debug: bool = Field(
+        default=False,
+        description="Include a per-stage timing breakdown in the response.",
+    )
+
+
+class TimingSpan(BaseModel):
+    """One timed step of a request."""
+
+    name: str = Field(..., description="Stage, e.g. 'embed' or 'llm'.")
+    duration_ms: float = Field(..., description="Duration in milliseconds.")
+    description: str | None = Field(
+        default=None, description="Provider, cache outcome or error."
+    )
+
+
+class ContextUsage(BaseModel):
+    """Token accounting for the prompt context of an answer."""
+
+    tokens: int = Field(..., description="Estimated context tokens sent.")
+    original_tokens: int = Field(
+        ..., description="Tokens the raw retrieved chunks would have used."
+    )
+    tokens_saved: int = Field(..., description="original_tokens - tokens.")
+    chunks_merged: int = Field(
+        default=0, description="Chunks joined onto a neighbouring chunk."
+    )
+    duplicates_dropped: int = Field(
+        default=0, description="Chunks dropped as duplicates."
+    )
+    truncated: bool = Field(
+        default=False, description="Whether the token budget cut context."
     )
 
 
@@ -43,6 +89,14 @@ class QuestionResponse(BaseModel):
         default_factory=list,
         description="Relevant text chunks used to generate the answer.",
     )
+    context: ContextUsage | None = Field(
+        default=None,
+        description="Prompt context size and tokens saved by assembly.",
+    )
+    timings: list[TimingSpan] | None = Field(
+        default=None,
+        description="Per-stage timing breakdown, when debug was requested.",
+    )
 
 
 class DocumentUploadResponse(BaseModel):
@@ -60,6 +114,41 @@ class DocumentUploadResponse(BaseModel):
         ...,
         description="Total number of text chunks created.",
     )
+    timings: list[TimingSpan] | None = Field(
+        default=None,
+        description="Per-stage timing breakdown, when debug was requested.",
+    )
+
+
+class IngestionJobResponse(BaseModel):
+    """Response model for background uploads and the /jobs endpoint."""
+
+    id: str = Field(..., description="Job identifier.")
+    status: str = Field(
+        ..., description="One of 'queued', 'running', 'completed', 'failed'."
+    )
+    files: list[str] = Field(
+        default_factory=list, description="Files accepted for ingestion."
+    )
+    pages_extracted: int = Field(0, description="Pages with extracted text.")
+    chunks_created: int = Field(0, description="Text chunks created.")
+    chunks_embedded: int = Field(0, description="Chunks embedded so far.")
+    documents_indexed: int = Field(
+        0, description="Documents fully indexed so far."
+    )
+    errors: list[str] = Field(
+        default_factory=list, description="Per-file errors and warnings."
+    )
+    message: str | None = Field(
+        None, description="Result message once the job has finished."
+    )
+    timings: dict[str, float] = Field(
+        default_factory=dict,
+        description="Milliseconds spent per ingestion stage.",
+    )
+    created_at: float = Field(..., description="Unix time the job was queued.")
+    started_at: float | None = None
+    finished_at: float | None = None
 
 
 class ErrorResponse(BaseModel):
@@ -73,3 +162,5 @@ class HealthResponse(BaseModel):
 
     status: str = "healthy"
     collection_stats: dict | None = None
+    llm_providers: dict | None = None
+    metrics: dict | None = None
@@ -2,20 +2,49 @@
 API route definitions for document upload and question answering.
 """
 
+import json
+import secrets
 import time
-
-from fastapi import APIRouter, File, HTTPException, UploadFile, Form
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import (
+    APIRouter,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    UploadFile,
+    Form,
+)
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from loguru import logger
 
 from app.api.models import (
     DocumentUploadResponse,
     ErrorResponse,
     HealthResponse,
+    IngestionJobResponse,
     QuestionRequest,
     QuestionResponse,
 )
+from app.config import settings
+from app.services import metrics, profiling, timing
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.cache import LRUCache, normalize_question
+from app.services.executors import BlockingPool
+from app.services.jobs import IngestionJobManager
 from app.services.llm_service import LLMService
 from app.services.pdf_processor import PDFProcessor
+from app.services.singleflight import SingleFlight
 from app.services.vector_store import VectorStoreService
 
 router = APIRouter()
@@ -24,32 +53,154 @@ router = APIRouter()
 pdf_processor = PDFProcessor()
 vector_store = VectorStoreService()
 llm_service = LLMService()
+ingestion_jobs = IngestionJobManager(pdf_processor, vector_store)
+
+# Blocking retrieval runs off the event loop; LLM calls use async clients
+cpu_pool = BlockingPool("cpu", settings.cpu_pool_workers)
+answer_cache = SemanticAnswerCache()
+single_flight = SingleFlight()
+admission = AdmissionController()
+exact_answer_cache = LRUCache(
+    settings.answer_exact_cache_max_entries,
+    settings.answer_exact_cache_ttl_seconds,
+)
+
+
+def _register_gauges() -> None:
+    """Expose service statistics as gauges read on each scrape."""
+    caches = {
+        "query": vector_store.query_cache_stats,
+        "answer_exact": exact_answer_cache.stats,
+        "answer_semantic": answer_cache.stats,
+    }
+
+    def per_cache(field: str):
+        return lambda: {
+            (name,): stats()[field] for name, stats in caches.items()
+        }
+
+    def per_provider(field: str, transform=lambda v: v):
+        return lambda: {
+            (name,): transform(health[field])
+            for name, health in llm_service.provider_health().items()
+        }
+
+    def embedding_queue_depth():
+        stats = vector_store.embedding_service.batcher_stats()
+        return stats["queue_depth"] if stats else None
+
+    gauge = metrics.gauges.gauge
+    gauge(
+        "rag_index_vectors",
+        "Chunks in the vector index.",
+        lambda: vector_store.get_collection_stats()["total_chunks"],
+    )
+    gauge(
+        "rag_index_documents",
+        "Distinct documents in the vector index.",
+        lambda: vector_store.get_collection_stats()["total_documents"],
+    )
+    gauge(
+        "rag_index_generation",
+        "Vector store generation (bumped on every change).",
+        lambda: vector_store.generation,
+    )
+    gauge(
+        "rag_embedding_queue_depth",
+        "Query embeddings waiting for a batch.",
+        embedding_queue_depth,
+    )
+    gauge(
+        "rag_pool_in_flight",
+        "Tasks running or queued on a worker pool.",
+        lambda: {(cpu_pool.name,): cpu_pool.stats()["in_flight"]},
+        labels=("pool",),
+    )
+    gauge(
+        "rag_admission_active",
+        "Questions currently being answered.",
+        lambda: admission.stats()["active"],
+    )
+    gauge(
+        "rag_admission_queue_depth",
+        "Questions waiting for an admission slot.",
+        lambda: admission.stats()["queue_depth"],
+    )
+    gauge(
+        "rag_cache_entries",
+        "Entries per cache.",
+        per_cache("entries"),
+        labels=("cache",),
+    )
+    gauge(
+        "rag_cache_hit_ratio",
+        "Hit rate per cache.",
+        per_cache("hit_rate"),
+        labels=("cache",),
+    )
+    gauge(
+        "rag_llm_circuit_open",
+        "1 while a provider's circuit breaker is open.",
+        per_provider("state", lambda state: int(state == "open")),
+        labels=("provider",),
+    )
+    gauge(
+        "rag_llm_health_score",
+        "Provider health score (0-1) from its circuit breaker.",
+        per_provider("score"),
+        labels=("provider",),
+    )
+
+
+_register_gauges()
 
 
 @router.post(
     "/documents",
     response_model=DocumentUploadResponse,
-    responses={400: {"model": ErrorResponse}},
+    responses={
+        202: {"model": IngestionJobResponse},
+        400: {"model": ErrorResponse},
+    },
     summary="Upload PDF documents",
-    description="Upload one or more PDF documents to be indexed for RAG.",
+    description=(
+        "Upload one or more PDF documents to be indexed for RAG. With "
+        "background=true the request returns a job immediately; poll "
+        "GET /jobs/{job_id} for progress."
+    ),
 )
 async def upload_documents(
+    response: Response,
     files: list[UploadFile] = File(
         ..., description="One or more PDF files to upload"
     ),
     chunk_size: int | None = Form(None),
     chunk_overlap: int | None = Form(None),
-) -> DocumentUploadResponse:
+    background: bool = Query(
+        False, description="Return a job ID instead of waiting for indexing."
+    ),
+    debug: bool = Query(
+        False, description="Include a per-stage timing breakdown."
+    ),
+    profile: bool = Query(
+        False, description="Profile this upload (if profiling is enabled)."
+    ),
+    x_profile: str | None = Header(None),
+    x_admin_token: str | None = Header(None),
+):
     """Upload and index PDF documents."""
-    start_time = time.time()
-
+    start_time = time.perf_counter()
+    # Background jobs outlive the request, so only waited-on uploads
+    # are profiled
+    profile = not background and _profile_requested(
+        profile, x_profile, x_admin_token
+    )
     if not files:
         raise HTTPException(
             status_code=400, detail="No files provided."
         )
 
-    total_chunks = 0
-    documents_indexed = 0
+    accepted = []
     errors = []
 
     for file in files:
@@ -60,77 +211,88 @@ async def upload_documents(
             )
             continue
 
-        try:
-            # Read file content
-            content = await file.read()
-
-            if not content:
-                errors.append(f"'{file.filename}': Empty file, skipped.")
-                continue
-
-            # Process PDF: extract text and chunk
-            chunks = pdf_processor.process_pdf(
-                content,
-                file.filename,
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-            )
-
-            if not chunks:
-                errors.append(
-                    f"'{file.filename}': No text could be extracted."
-                )
-                continue
-
-            # Store in vector database
-            num_chunks = vector_store.add_chunks(chunks)
-            total_chunks += num_chunks
-            documents_indexed += 1
-
-            logger.info(
-                f"Indexed '{file.filename}': {num_chunks} chunks"
-            )
-
-        except Exception as e:
-            logger.error(
-                f"Error processing '{file.filename}': {e}"
-            )
-            errors.append(f"'{file.filename}': {str(e)}")
+        content = await file.read()
+        if not content:
+            errors.append(f"'{file.filename}': Empty file, skipped.")
+            continue
 
-    elapsed = time.time() - start_time
-    logger.info(
-        f"Document upload completed in {elapsed:.2f}s: "
-        f"{documents_indexed} docs, {total_chunks} chunks"
-    )
+        accepted.append((file.filename, content))
+    read_seconds = time.perf_counter() - start_time
 
-    if documents_indexed == 0:
+    if not accepted:
         error_detail = "No documents were successfully processed."
         if errors:
             error_detail += f" Errors: {'; '.join(errors)}"
         raise HTTPException(status_code=400, detail=error_detail)
 
-    message = "Documents processed successfully"
-    if errors:
-        message += f" (with warnings: {'; '.join(errors)})"
+    # Parsing, chunking and embedding run on the ingestion worker pool
+    with _profiling(profile, "documents") as request_profile:
+        job = ingestion_jobs.submit(
+            accepted,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            errors=errors,
+        )
+
+    if background:
+        return JSONResponse(
+            status_code=202,
+            content=IngestionJobResponse(
+                **ingestion_jobs.get(job.id)
+            ).model_dump(),
+        )
 
+    result = await ingestion_jobs.wait(job.id)
+    await _save_profile(request_profile, response)
+    if result["status"] == "failed":
+        raise HTTPException(status_code=400, detail=result["message"])
+
+    # Upload read, time queued for an ingest worker, then the job's stages
+    timings = timing.RequestTimings()
+    timings.add("read", read_seconds)
+    timings.add("queue", result["started_at"] - result["created_at"])
+    for stage, duration_ms in result["timings"].items():
+        timings.add(stage, duration_ms / 1000)
+    timings.add("total", time.perf_counter() - start_time)
+
+    if settings.server_timing_enabled:
+        response.headers["Server-Timing"] = timings.header()
     return DocumentUploadResponse(
-        message=message,
-        documents_indexed=documents_indexed,
-        total_chunks=total_chunks,
+        message=result["message"],
+        documents_indexed=result["documents_indexed"],
+        total_chunks=result["chunks_embedded"],
+        timings=timings.as_list() if debug else None,
     )
 
 
+@router.get(
+    "/jobs/{job_id}",
+    response_model=IngestionJobResponse,
+    responses={404: {"model": ErrorResponse}},
+    summary="Ingestion job status",
+    description="Report progress and result of a background upload.",
+)
+async def get_job(job_id: str) -> IngestionJobResponse:
+    """Return the status of an ingestion job."""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404, detail=f"Job '{job_id}' not found"
+        )
+    return IngestionJobResponse(**job)
+
+
 @router.get("/documents")
 async def list_documents():
     """List all indexed documents."""
-    documents = vector_store.list_documents()
+    documents = await cpu_pool.run(vector_store.list_documents)
     return {"documents": documents}
 
 
 @router.delete("/documents/{filename}")
 async def delete_document(filename: str):
     """Delete a document and its embeddings."""
-    success = vector_store.delete_document(filename)
+    success = await cpu_pool.run(vector_store.delete_document, filename)
     if not success:
         raise HTTPException(
             status_code=404, detail=f"Document '{filename}' not found"
@@ -141,37 +303,69 @@ async def delete_document(filename: str):
 @router.post(
     "/question",
     response_model=QuestionResponse,
-    responses={400: {"model": ErrorResponse}},
+    responses={
+        400: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
     summary="Ask a question",
     description="Ask a question about the uploaded documents.",
 )
 async def ask_question(
     request: QuestionRequest,
+    response: Response,
+    profile: bool = Query(
+        False, description="Profile this request (if profiling is enabled)."
+    ),
+    x_profile: str | None = Header(None),
+    x_admin_token: str | None = Header(None),
 ) -> QuestionResponse:
     """Answer a question using RAG pipeline."""
     start_time = time.time()
 
     logger.info(f"Question received: '{request.question[:80]}...'")
+    profile = _profile_requested(profile, x_profile, x_admin_token)
 
     try:
-        # Step 1: Retrieve relevant chunks from vector store
-        relevant_chunks = vector_store.query(request.question)
-
-        # Step 2: Generate answer using LLM with context
-        result = llm_service.generate_answer(
-            question=request.question,
-            context_chunks=relevant_chunks,
-            provider=request.provider.value if request.provider else None,
-        )
+        provider = request.provider.value if request.provider else None
+
+        with (
+            timing.collect() as timings,
+            _profiling(profile, "question") as request_profile,
+        ):
+            # The same question against an unchanged store skips everything
+            key = _answer_key(request, provider, vector_store.generation)
+            with timing.span("exact_cache") as lookup:
+                result = exact_answer_cache.get(key)
+                lookup.description = "miss" if result is None else "hit"
+            if result is None:
+                # Identical concurrent questions share one computation,
+                # which must be admitted before it runs; a coalesced
+                # caller only sees the time it waited
+                with timing.span("answer"):
+                    result = await single_flight.do(
+                        key,
+                        lambda: _admitted(_answer(request, provider)),
+                    )
 
         elapsed = time.time() - start_time
+        timings.add("total", elapsed)
         logger.info(f"Question answered in {elapsed:.2f}s")
+        await _save_profile(request_profile, response)
 
+        if settings.server_timing_enabled:
+            response.headers["Server-Timing"] = timings.header()
         return QuestionResponse(
             answer=result["answer"],
             references=result["references"],
+            context=result.get("context"),
+            timings=timings.as_list() if request.debug else None,
         )
 
+    except AdmissionRejected as e:
+        logger.warning(f"Question rejected: {e.detail}")
+        raise _rejection(e) from e
+
     except Exception as e:
         logger.error(f"Error answering question: {e}")
         raise HTTPException(
@@ -180,6 +374,305 @@ async def ask_question(
         ) from e
 
 
+def _check_admin(token: str | None) -> None:
+    # Admin access is refused outright until a token is configured
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=403, detail="Admin access requires ADMIN_TOKEN"
+        )
+    if not secrets.compare_digest(token or "", settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _profile_requested(
+    query: bool, header: str | None, admin_token: str | None
+) -> bool:
+    """Whether to profile a request that asked via ?profile or X-Profile."""
+    if not (query or (header or "").lower() in ("1", "true")):
+        return False
+    if not settings.profiling_enabled:
+        logger.warning("Profiling requested but PROFILING_ENABLED is off")
+        return False
+    _check_admin(admin_token)
+    return True
+
+
+def _profiling(enabled: bool, label: str):
+    return profiling.profiled(label) if enabled else nullcontext()
+
+
+async def _save_profile(
+    request_profile: profiling.RequestProfile | None, response: Response
+) -> None:
+    if request_profile is None:
+        return
+    profile_id = await cpu_pool.run(request_profile.save)
+    if profile_id is not None:
+        response.headers["X-Profile-Id"] = profile_id
+
+
+async def _admitted(work: Awaitable[dict]) -> dict:
+    """Run work once the admission controller grants a slot."""
+    queued_at = time.perf_counter()
+    try:
+        async with admission.slot():
+            timing.record("queue", time.perf_counter() - queued_at)
+            return await work
+    finally:
+        # Close the coroutine if it never started (rejected)
+        work.close()
+
+
+def _rejection(error: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=error.status_code,
+        detail=error.detail,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+async def _answer(request: QuestionRequest, provider: str | None) -> dict:
+    """Retrieve context and answer it, consulting the semantic cache."""
+    # Step 1: Retrieve relevant chunks from vector store
+    retrieval = await _retrieve(request)
+
+    # Step 2: Reuse a cached answer to an equivalent question, or
+    # generate one using LLM with context
+    result = _cache_lookup(retrieval, provider)
+    generated = result is None
+    if generated:
+        result = await llm_service.agenerate_answer(
+            question=request.question,
+            context_chunks=retrieval.chunks,
+            provider=provider,
+        )
+    _cache_store(request, retrieval, provider, result, semantic=generated)
+    return result
+
+
+@router.post(
+    "/question/stream",
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
+    summary="Ask a question (streaming)",
+    description=(
+        "Server-Sent Events stream: a 'references' event with the retrieved "
+        "chunks, 'token' events as the answer is generated, then 'done' "
+        "(or 'error')."
+    ),
+)
+async def ask_question_stream(request: QuestionRequest) -> StreamingResponse:
+    """Answer a question, streaming tokens as the LLM produces them."""
+    logger.info(f"Streaming question received: '{request.question[:80]}...'")
+
+    provider = request.provider.value if request.provider else None
+    cached = exact_answer_cache.get(
+        _answer_key(request, provider, vector_store.generation)
+    )
+    if cached is not None:
+        return StreamingResponse(
+            _sse(_replay_cached(cached)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    # Server-Timing can only cover what happens before the stream starts
+    with timing.collect() as timings:
+        try:
+            with timing.span("queue"):
+                await admission.acquire()
+        except AdmissionRejected as e:
+            logger.warning(f"Question rejected: {e.detail}")
+            raise _rejection(e) from e
+        admitted_at = time.perf_counter()
+
+        def release():
+            admission.release(time.perf_counter() - admitted_at)
+
+        try:
+            retrieval = await _retrieve(request)
+        except Exception as e:
+            release()
+            logger.error(f"Error retrieving context: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to process question: {str(e)}",
+            ) from e
+
+        cached = _cache_lookup(retrieval, provider)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if settings.server_timing_enabled:
+        headers["Server-Timing"] = timings.header()
+    if cached is not None:
+        events = _replay_cached(cached)
+    else:
+        events = _stream_and_cache(
+            request,
+            retrieval,
+            provider,
+            llm_service.astream_answer(
+                question=request.question,
+                context_chunks=retrieval.chunks,
+                provider=provider,
+            ),
+        )
+    # The slot is held until the stream ends, even if the client leaves
+    return StreamingResponse(
+        _sse(events, on_close=release),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+
+async def _sse(
+    events: AsyncIterator[dict],
+    on_close: Callable[[], None] | None = None,
+) -> AsyncIterator[str]:
+    """
+    Encode answer events as Server-Sent Events.
+
+    ``on_close`` runs however the stream ends, including when sending to a
+    disconnected client raises and the generator is closed mid-stream.
+    """
+    start_time = time.time()
+    try:
+        async for event in events:
+            yield _format_sse(event["event"], event["data"])
+        logger.info(
+            f"Question streamed in {time.time() - start_time:.2f}s"
+        )
+    except Exception as e:
+        logger.error(f"Error streaming answer: {e}")
+        yield _format_sse(
+            "error", {"detail": f"Failed to process question: {str(e)}"}
+        )
+    finally:
+        if on_close is not None:
+            on_close()
+
+
+def _format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@dataclass
+class Retrieval:
+    """Context retrieved for a question, plus what the cache keys on."""
+
+    chunks: list[dict]
+    embedding: list[float] | None
+    generation: int
+
+
+async def _retrieve(request: QuestionRequest) -> Retrieval:
+    """Embed the question and fetch its context chunks off the event loop."""
+    # Read before searching so a concurrent ingest invalidates the answer
+    generation = vector_store.generation
+    embedding = None
+    if settings.answer_cache_enabled:
+        with timing.span("embed"):
+            embedding = await vector_store.embedding_service.aembed_query(
+                request.question
+            )
+    # Includes the FAISS "search" span recorded on the pool thread
+    with timing.span("retrieve"):
+        chunks = await cpu_pool.run(
+            vector_store.query,
+            request.question,
+            ef_search=request.ef_search,
+            nprobe=request.nprobe,
+            query_embedding=embedding,
+        )
+    return Retrieval(chunks, embedding, generation)
+
+
+def _cache_lookup(retrieval: Retrieval, provider: str | None) -> dict | None:
+    if retrieval.embedding is None or not retrieval.chunks:
+        return None
+    with timing.span("semantic_cache") as lookup:
+        result = answer_cache.lookup(
+            retrieval.embedding,
+            [c["id"] for c in retrieval.chunks],
+            retrieval.generation,
+            provider=provider,
+        )
+        lookup.description = "miss" if result is None else "hit"
+    return result
+
+
+def _answer_key(
+    request: QuestionRequest, provider: str | None, generation: int
+) -> tuple:
+    # Search overrides change the retrieved context, so the answer too
+    return (
+        normalize_question(request.question),
+        provider,
+        request.ef_search,
+        request.nprobe,
+        generation,
+    )
+
+
+def _cache_store(
+    request: QuestionRequest,
+    retrieval: Retrieval,
+    provider: str | None,
+    result: dict,
+    semantic: bool = True,
+) -> None:
+    if not retrieval.chunks:
+        return
+    exact_answer_cache.put(
+        _answer_key(request, provider, retrieval.generation), result
+    )
+    if not semantic or retrieval.embedding is None:
+        return
+    answer_cache.store(
+        request.question,
+        retrieval.embedding,
+        [c["id"] for c in retrieval.chunks],
+        retrieval.generation,
+        result,
+        provider=provider,
+    )
+
+
+async def _replay_cached(result: dict) -> AsyncIterator[dict]:
+    """Answer events for a cached result, in the live stream's shape."""
+    references = result["references"]
+    yield {"event": "references", "data": {"references": references}}
+    yield {"event": "token", "data": {"text": result["answer"]}}
+    yield {"event": "done", "data": {"provider": None, "cached": True}}
+
+
+async def _stream_and_cache(
+    request: QuestionRequest,
+    retrieval: Retrieval,
+    provider: str | None,
+    events: AsyncIterator[dict],
+) -> AsyncIterator[dict]:
+    """Pass answer events through, caching the answer once it completes."""
+    references, tokens = [], []
+    async for event in events:
+        if event["event"] == "references":
+            references = event["data"]["references"]
+        elif event["event"] == "token":
+            tokens.append(event["data"]["text"])
+        elif event["event"] == "done":
+            _cache_store(
+                request,
+                retrieval,
+                provider,
+                {"answer": "".join(tokens), "references": references},
+            )
+        yield event
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
@@ -190,6 +683,101 @@ async def health_check() -> HealthResponse:
     """Health check endpoint."""
     try:
         stats = vector_store.get_collection_stats()
-        return HealthResponse(status="healthy", collection_stats=stats)
+        metrics = {
+            "embedding_batcher": (
+                vector_store.embedding_service.batcher_stats()
+            ),
+            "pools": {cpu_pool.name: cpu_pool.stats()},
+            "llm": llm_service.latency_stats(),
+            "llm_rate_limits": llm_service.rate_limit_stats(),
+            "context": llm_service.context_stats(),
+            "query_cache": vector_store.query_cache_stats(),
+            "single_flight": single_flight.stats(),
+            "admission": admission.stats(),
+            "answer_cache": {
+                "exact": exact_answer_cache.stats(),
+                "semantic": answer_cache.stats(),
+            },
+        }
+        providers = llm_service.provider_health()
+        # Degraded when every configured provider's circuit is open
+        all_open = bool(providers) and all(
+            p["state"] == "open" for p in providers.values()
+        )
+        return HealthResponse(
+            status="degraded" if all_open else "healthy",
+            collection_stats=stats,
+            llm_providers=providers,
+            metrics=metrics,
+        )
     except Exception:
         return HealthResponse(status="degraded", collection_stats=None)
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description=(
+        "Per-stage latency histograms, ingestion counters and service "
+        "gauges in the Prometheus text format."
+    ),
+)
+async def prometheus_metrics() -> Response:
+    """Expose metrics for Prometheus to scrape."""
+    body, media_type = await cpu_pool.run(metrics.render)
+    return Response(content=body, media_type=media_type)
+
+
+@router.get(
+    "/admin/profiles",
+    responses={403: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+    summary="List request profiles",
+    description="Profiles saved by requests sent with X-Profile: 1.",
+)
+async def list_profiles(x_admin_token: str | None = Header(None)):
+    """List stored profiles, newest first."""
+    _check_profiling_admin(x_admin_token)
+    return {"profiles": await cpu_pool.run(profiling.list_profiles)}
+
+
+@router.get(
+    "/admin/profiles/{profile_id}",
+    responses={403: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+    summary="Download a request profile",
+    description=(
+        "The raw pstats file (for snakeviz, pstats, etc.), or with "
+        "format=text the top functions as text."
+    ),
+)
+async def get_profile(
+    profile_id: str,
+    format: str = Query("prof", pattern="^(prof|text)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    x_admin_token: str | None = Header(None),
+):
+    """Return a stored profile."""
+    _check_profiling_admin(x_admin_token)
+    if format == "text":
+        text = await cpu_pool.run(
+            profiling.render_profile, profile_id, sort, limit
+        )
+        if text is not None:
+            return PlainTextResponse(text)
+    else:
+        path = profiling.profile_path(profile_id)
+        if path is not None:
+            return FileResponse(
+                path,
+                media_type="application/octet-stream",
+                filename=path.name,
+            )
+    raise HTTPException(
+        status_code=404, detail=f"Profile '{profile_id}' not found"
+    )
+
+
+def _check_profiling_admin(token: str | None) -> None:
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    _check_admin(token)
@@ -20,6 +20,16 @@ class Settings(BaseSettings):
 
     # Embedding Configuration
     embedding_model: str = "all-MiniLM-L6-v2"
+    # 'torch' or 'onnx' (requires optimum[onnxruntime])
+    embedding_backend: str = "torch"
+    embedding_onnx_dir: str = "./data/onnx_models"
+    embedding_onnx_quantize: bool = False
+    # Dynamic int8 quantization target: 'avx2', 'avx512', 'avx512_vnni' or 'arm64'
+    embedding_onnx_quantization: str = "avx2"
+    # Coalesce concurrent query embeddings into one model call
+    embedding_batch_enabled: bool = True
+    embedding_batch_max_size: int = 32
+    embedding_batch_max_wait_ms: float = 2.0
 
     # Chunking Configuration
     chunk_size: int = 1000
@@ -29,21 +39,142 @@ class Settings(BaseSettings):
     chroma_persist_dir: str = "./data/chroma_db"
     chroma_collection_name: str = "tractian_documents"
 
+    # Persistence Configuration
+    # 'wal': append-only log + periodic checkpoints; 'snapshot': full rewrite per change
+    vector_store_persistence: str = "wal"
+    wal_checkpoint_interval_seconds: float = 60.0
+    wal_checkpoint_max_mb: int = 64
+    # Memory-map the index and metadata on load; pages are faulted in on demand
+    vector_store_mmap: bool = True
+    # Chunk metadata backend: 'mmap' (binary snapshot) or 'sqlite' (indexed DB)
+    metadata_backend: str = "sqlite"
+
+    # ANN Index Configuration
+    # 'flat' (exact), 'hnsw', 'ivf' or 'ivfpq'; non-flat types are used once
+    # the store grows past ann_promotion_threshold chunks
+    vector_index_type: str = "flat"
+    ann_promotion_threshold: int = 50_000
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    # Share of deleted (tombstoned) vectors that triggers a rebuild of an
+    # HNSW or IVF index
+    hnsw_compaction_ratio: float = 0.2
+    ivf_nlist: int = 1024
+    ivf_nprobe: int = 16
+    ivfpq_m: int = 16
+    ivfpq_nbits: int = 8
+
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    # Send a Server-Timing header with per-stage durations
+    server_timing_enabled: bool = True
+    # Required as X-Admin-Token by /admin endpoints and profiling
+    # requests; while empty, both are refused
+    admin_token: str = ""
+
+    # Profiling: requests sent with X-Profile: 1 (or ?profile=true) run
+    # their blocking work under cProfile; profiles are kept in
+    # profiling_dir and served from /admin/profiles (needs admin_token)
+    profiling_enabled: bool = False
+    profiling_dir: str = "./data/profiles"
+    profiling_max_profiles: int = 50
 
     # Retrieval Configuration
     top_k_results: int = 3
 
+    # Exact-match Caches
+    # Keyed on the normalized question (+ provider for answers) and the
+    # vector store generation, so ingests and deletes never serve stale data
+    query_cache_max_entries: int = 2048
+    query_cache_ttl_seconds: float = 3600.0
+    answer_exact_cache_max_entries: int = 2048
+    answer_exact_cache_ttl_seconds: float = 3600.0
+
+    # Admission Control
+    # Questions computed concurrently, how many may wait for a slot, and
+    # how long they wait before a 503; a full queue is rejected with 429
+    question_max_concurrency: int = 64
+    question_max_queue: int = 256
+    question_queue_timeout_seconds: float = 10.0
+
+    # Semantic Answer Cache
+    # Reuse an answer when a prior question is this cosine-similar and
+    # retrieved the same chunks; cleared whenever the vector store changes
+    answer_cache_enabled: bool = True
+    answer_cache_similarity_threshold: float = 0.92
+    answer_cache_max_entries: int = 10_000
+    answer_cache_ttl_seconds: float = 86400.0
+
     # LLM Configuration
     llm_temperature: float = 0.1
     llm_max_tokens: int = 1024
+    # Prompt context: merge overlapping same-page chunks, then cut to
+    # context_max_tokens (0 = no budget)
+    context_max_tokens: int = 3000
+    context_merge_chunks: bool = True
+    # Connection pool shared by the async provider clients
+    llm_http_max_connections: int = 200
+    llm_http_max_keepalive_connections: int = 50
+    llm_http_timeout_seconds: float = 60.0
+    # Hedging: race the next provider once the current one passes its
+    # llm_hedge_percentile latency (adaptive after llm_hedge_min_samples)
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_default_delay_ms: float = 2000.0
+    llm_hedge_min_delay_ms: float = 200.0
+    llm_hedge_min_samples: int = 20
+    llm_hedge_window: int = 200
+    # Circuit breaker: skip a provider once its error rate over the last
+    # llm_breaker_window calls reaches llm_breaker_failure_rate; calls slower
+    # than llm_breaker_slow_call_ms count as failures
+    llm_breaker_enabled: bool = True
+    llm_breaker_window: int = 20
+    llm_breaker_min_calls: int = 5
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_slow_call_ms: float = 30000.0
+    llm_breaker_open_seconds: float = 30.0
+    # Client-side quotas per provider (0 = unlimited). Calls that would wait
+    # longer than llm_rate_limit_max_wait_seconds skip to the next provider
+    gemini_rpm: float = 0
+    gemini_tpm: float = 0
+    openai_rpm: float = 0
+    openai_tpm: float = 0
+    llm_rate_limit_max_wait_seconds: float = 5.0
+    # 429 retries per call, with full-jitter exponential backoff
+    llm_retry_max_attempts: int = 3
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 8.0
+    # Offline "stub" provider for load tests: answers after a seeded
+    # lognormal latency (mean/stddev), streams stub_llm_answer_tokens words
+    # at stub_llm_tokens_per_second (0 = instantly) and fails a share of
+    # calls with a 500 or 429. When enabled it is tried before real providers
+    stub_llm_enabled: bool = False
+    stub_llm_latency_ms: float = 200.0
+    stub_llm_latency_stddev_ms: float = 50.0
+    stub_llm_tokens_per_second: float = 0
+    stub_llm_answer_tokens: int = 64
+    stub_llm_failure_rate: float = 0.0
+    stub_llm_rate_limit_rate: float = 0.0
+    stub_llm_seed: int = 0
 
     # Upload Configuration
     upload_dir: str = "./data/uploads"
     max_file_size_mb: int = 50
 
+    # Ingestion Jobs Configuration
+    ingest_workers: int = 2
+    # Chunks embedded per batch; job progress is updated after each batch
+    ingest_embed_batch_size: int = 256
+    # How long finished jobs stay pollable via GET /jobs/{id}
+    ingest_job_retention_seconds: float = 3600.0
+
+    # Request Worker Pool
+    # Retrieval (query embedding + search) runs in a bounded pool off the
+    # event loop; LLM calls are awaited on async clients instead
+    cpu_pool_workers: int = 4
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
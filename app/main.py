@@ -11,8 +11,15 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
-from app.api.routes import router
+from app.api.routes import (
+    cpu_pool,
+    ingestion_jobs,
+    router,
+    vector_store,
+)
 from app.config import settings
+from app.services.metrics import HTTP_SECONDS
+from app.services.llm_service import close_http_client
 
 # Configure logging
 logger.remove()  # Remove default handler
@@ -45,8 +52,28 @@ async def lifespan(app: FastAPI):
     logger.info(f"Chunk Size: {settings.chunk_size}")
     logger.info(f"Chunk Overlap: {settings.chunk_overlap}")
     logger.info(f"Top-K Results: {settings.top_k_results}")
+    load_stats = vector_store.load_stats
+    logger.info(
+        f"Vector store loaded {load_stats.get('vectors', 0)} vectors "
+        f"(mmap={load_stats.get('mmap', False)}): "
+        f"index {load_stats.get('index_load_ms', 0)}ms, "
+        f"metadata {load_stats.get('metadata_load_ms', 0)}ms, "
+        f"WAL replay {load_stats.get('wal_replay_ms', 0)}ms "
+        f"({load_stats.get('wal_records', 0)} records)"
+    )
+    if settings.profiling_enabled and not settings.admin_token:
+        logger.warning(
+            "PROFILING_ENABLED is set without ADMIN_TOKEN; profiling "
+            "requests and /admin/profiles will be refused"
+        )
     logger.info("=" * 60)
     yield
+    # Let in-flight ingestion jobs finish before the final checkpoint
+    ingestion_jobs.shutdown(wait=True)
+    cpu_pool.shutdown()
+    await close_http_client()
+    # Flush pending WAL records into a final checkpoint
+    vector_store.close()
 
 
 # Create FastAPI application
@@ -81,6 +108,14 @@ async def log_requests(request: Request, call_next):
     response = await call_next(request)
     elapsed = time.time() - start_time
 
+    # Label by route template so path parameters don't explode cardinality
+    route = request.scope.get("route")
+    HTTP_SECONDS.labels(
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code,
+    ).observe(elapsed)
+
     logger.info(
         f"{request.method} {request.url.path} "
         f"- {response.status_code} ({elapsed:.3f}s)"
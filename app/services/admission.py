@@ -0,0 +1,146 @@
+"""
+Admission control for the question pipeline.
+Bounds concurrent work and the queue in front of it, rejecting early with a
+retry hint instead of letting requests pile up until clients time out.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted; maps to 429 or 503."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue.
+
+    Up to ``max_concurrent`` requests run at once and up to ``max_queue``
+    more wait for a slot. A request arriving to a full queue is rejected
+    immediately (429); one that waits longer than ``max_wait_seconds`` is
+    rejected as overloaded (503). Both carry a Retry-After estimate derived
+    from recent service times. Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int | None = None,
+        max_queue: int | None = None,
+        max_wait_seconds: float | None = None,
+    ):
+        self.max_concurrent = (
+            max_concurrent or settings.question_max_concurrency
+        )
+        self.max_queue = (
+            max_queue
+            if max_queue is not None
+            else settings.question_max_queue
+        )
+        self.max_wait_seconds = (
+            max_wait_seconds
+            if max_wait_seconds is not None
+            else settings.question_queue_timeout_seconds
+        )
+        self._semaphore: asyncio.Semaphore | None = None
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._wait_times: deque[float] = deque(maxlen=500)
+        self._service_times: deque[float] = deque(maxlen=500)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot for the duration of the block."""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected_full += 1
+            raise AdmissionRejected(
+                429, "Too many pending questions", self._retry_after()
+            )
+
+        self._waiting += 1
+        start = time.perf_counter()
+        try:
+            # Unlike wait_for, the timeout can't fire after the acquire
+            # has completed, so a timed-out wait never holds a permit
+            async with asyncio.timeout(self.max_wait_seconds):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self._rejected_timeout += 1
+            raise AdmissionRejected(
+                503, "Question pipeline overloaded", self._retry_after()
+            ) from None
+        finally:
+            self._waiting -= 1
+
+        self._wait_times.append(time.perf_counter() - start)
+        self._active += 1
+        self._admitted += 1
+
+    def release(self, service_seconds: float | None = None) -> None:
+        """Free a slot, recording how long the work held it."""
+        self._active -= 1
+        if service_seconds is not None:
+            self._service_times.append(service_seconds)
+        self._semaphore.release()
+
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        if self._service_times:
+            mean = sum(self._service_times) / len(self._service_times)
+        else:
+            mean = 1.0
+        backlog = (self._waiting + self._active) / self.max_concurrent
+        return max(1, math.ceil(mean * backlog))
+
+    def stats(self) -> dict:
+        """Queue depth, utilization and wait times, for autoscaling."""
+        waits = sorted(self._wait_times)
+        return {
+            "active": self._active,
+            "queue_depth": self._waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "utilization": round(self._active / self.max_concurrent, 3),
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_full,
+            "rejected_timeout": self._rejected_timeout,
+            "wait_ms_avg": (
+                round(sum(waits) / len(waits) * 1000, 1) if waits else None
+            ),
+            "wait_ms_p95": (
+                round(waits[int(len(waits) * 0.95)] * 1000, 1)
+                if waits
+                else None
+            ),
+        }
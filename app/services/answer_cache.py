@@ -0,0 +1,183 @@
+"""
+Semantic answer cache.
+Reuses LLM answers for rephrased questions by looking up prior questions in
+a small FAISS index of their embeddings.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed on question-embedding similarity.
+
+    A cached answer is returned only when a prior question is at least
+    ``threshold`` cosine-similar, the retrieval for the new question came
+    back with exactly the same chunk IDs, and the same provider (or no
+    specific provider) was requested. Entries are tagged with the vector
+    store generation they were computed against; any change to the store
+    drops the whole cache.
+    """
+
+    def __init__(
+        self,
+        threshold: float | None = None,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        candidates: int = 5,
+    ):
+        self._threshold = (
+            threshold
+            if threshold is not None
+            else settings.answer_cache_similarity_threshold
+        )
+        self._max_entries = max_entries or settings.answer_cache_max_entries
+        self._ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else settings.answer_cache_ttl_seconds
+        )
+        self._candidates = candidates
+        self._index: faiss.IndexIDMap2 | None = None
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        self._next_id = 0
+        self._generation: int | None = None
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        embedding: list[float],
+        chunk_ids: list[int],
+        generation: int,
+        provider: str | None = None,
+    ) -> dict | None:
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Args:
+            embedding: Question embedding.
+            chunk_ids: IDs of the chunks retrieved for the question.
+            generation: Current vector store generation.
+            provider: Provider explicitly requested, if any.
+
+        Returns:
+            The cached result dict, or None on a miss.
+        """
+        with self._lock:
+            if not self._sync_generation(generation) or not self._entries:
+                self._misses += 1
+                return None
+
+            scores, ids = self._index.search(
+                self._normalize(embedding),
+                min(self._candidates, len(self._entries)),
+            )
+            now = time.time()
+            key = tuple(chunk_ids)
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self._threshold:
+                    break
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if now - entry["created_at"] > self._ttl_seconds:
+                    self._evict(int(entry_id))
+                    continue
+                if (
+                    entry["chunk_ids"] == key
+                    and entry["provider"] == provider
+                ):
+                    self._entries.move_to_end(int(entry_id))
+                    self._hits += 1
+                    logger.info(
+                        f"Answer cache hit (similarity {score:.3f}) for "
+                        f"'{entry['question'][:50]}'"
+                    )
+                    return entry["result"]
+
+            self._misses += 1
+            return None
+
+    def store(
+        self,
+        question: str,
+        embedding: list[float],
+        chunk_ids: list[int],
+        generation: int,
+        result: dict,
+        provider: str | None = None,
+    ) -> None:
+        """Cache an answer computed against the given store generation."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            if not self._sync_generation(generation):
+                return  # Computed against a store that has since changed
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(
+                    faiss.IndexFlatIP(vector.shape[1])
+                )
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(
+                vector, np.array([entry_id], dtype=np.int64)
+            )
+            self._entries[entry_id] = {
+                "question": question,
+                "chunk_ids": tuple(chunk_ids),
+                "provider": provider,
+                "result": result,
+                "created_at": time.time(),
+            }
+            while len(self._entries) > self._max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (
+                    round(self._hits / lookups, 3) if lookups else None
+                ),
+            }
+
+    def _sync_generation(self, generation: int) -> bool:
+        """Drop entries from older generations; False if the caller's is."""
+        if self._generation is not None and generation < self._generation:
+            return False
+        if generation != self._generation:
+            if self._entries:
+                logger.info("Vector store changed, answer cache invalidated")
+            self._reset()
+            self._generation = generation
+        return True
+
+    def _reset(self) -> None:
+        self._index = None
+        self._entries.clear()
+
+    def _evict(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.array([embedding], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
@@ -0,0 +1,164 @@
+"""
+Circuit breaker for outbound provider calls.
+Tracks a rolling window of call outcomes and stops sending traffic to a
+provider whose error rate crosses a threshold, probing it again after a
+cool-down.
+"""
+
+import threading
+import time
+from collections import deque
+
+from loguru import logger
+
+from app.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised in place of a call that the breaker rejected."""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    Closed: calls flow, outcomes are recorded. Once at least ``min_calls``
+    are in the window and the failure rate (slow calls count as failures)
+    reaches ``failure_rate``, the breaker opens.
+
+    Open: calls are rejected until ``open_seconds`` have passed, then the
+    breaker goes half-open.
+
+    Half-open: a single probe call is let through; success closes the
+    breaker, failure reopens it. A probe that never reports back (e.g. it
+    was cancelled) is replaced after another ``open_seconds``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int | None = None,
+        min_calls: int | None = None,
+        failure_rate: float | None = None,
+        slow_call_seconds: float | None = None,
+        open_seconds: float | None = None,
+    ):
+        self.name = name
+        self._outcomes: deque[bool] = deque(
+            maxlen=window or settings.llm_breaker_window
+        )
+        self._min_calls = min_calls or settings.llm_breaker_min_calls
+        self._failure_rate = failure_rate or settings.llm_breaker_failure_rate
+        self._slow_call_seconds = (
+            slow_call_seconds or settings.llm_breaker_slow_call_ms / 1000
+        )
+        self._open_seconds = (
+            open_seconds
+            if open_seconds is not None
+            else settings.llm_breaker_open_seconds
+        )
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and (
+                self._probe_started is None
+                or now - self._probe_started >= self._open_seconds
+            ):
+                self._probe_started = now
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self, seconds: float) -> None:
+        """Record a completed call; slow calls count against the provider."""
+        if seconds >= self._slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._close()
+            else:
+                self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            if (
+                self._state == CLOSED
+                and len(self._outcomes) >= self._min_calls
+                and self._error_rate() >= self._failure_rate
+            ):
+                self._open()
+
+    def stats(self) -> dict:
+        """State, windowed error rate and a 0-1 health score."""
+        with self._lock:
+            self._maybe_half_open()
+            error_rate = self._error_rate()
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(
+                    self._opened_at + self._open_seconds - time.monotonic(), 1
+                )
+            score = 0.0 if self._state == OPEN else round(1 - error_rate, 3)
+            return {
+                "state": self._state,
+                "score": score,
+                "error_rate": round(error_rate, 3),
+                "calls": len(self._outcomes),
+                "rejected": self._rejected,
+                "retry_in_seconds": retry_in,
+            }
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _maybe_half_open(self) -> None:
+        if (
+            self._state == OPEN
+            and time.monotonic() - self._opened_at >= self._open_seconds
+        ):
+            self._state = HALF_OPEN
+            self._probe_started = None
+
+    def _open(self) -> None:
+        logger.warning(
+            f"Circuit for {self.name} opened "
+            f"(error rate {self._error_rate():.0%}); "
+            f"retrying in {self._open_seconds:.0f}s"
+        )
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+
+    def _close(self) -> None:
+        logger.info(f"Circuit for {self.name} closed")
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._probe_started = None
@@ -0,0 +1,193 @@
+"""
+Prompt context assembly.
+Turns retrieved chunks into the context block of the LLM prompt: chunks
+from the same page are stitched back together where their overlap repeats
+text, duplicates are dropped, and the result is cut to a token budget.
+"""
+
+import math
+import re
+from dataclasses import asdict, dataclass
+
+from app.config import settings
+
+CHARS_PER_TOKEN = 4
+
+# Shortest shared run treated as chunk overlap rather than coincidence
+_MIN_OVERLAP_CHARS = 16
+# Don't bother appending a truncated section smaller than this
+_MIN_SECTION_TOKENS = 32
+_GAP = "\n[...]\n"
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class AssembledContext:
+    """Prompt context plus how much it shrank compared to raw chunks."""
+
+    text: str
+    tokens: int
+    original_tokens: int
+    chunks_merged: int = 0
+    duplicates_dropped: int = 0
+    truncated: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+    def summary(self) -> dict:
+        """Token accounting, without the text itself."""
+        summary = asdict(self)
+        del summary["text"]
+        summary["tokens_saved"] = self.tokens_saved
+        return summary
+
+
+def _header(number: int, source: str, page) -> str:
+    return f"[Source {number}: {source}, Page {page}]"
+
+
+def _location(chunk: dict) -> tuple:
+    metadata = chunk["metadata"]
+    return metadata.get("source", "unknown"), metadata.get("page", "?")
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of ``left`` that prefixes ``right``."""
+    if min(len(left), len(right)) < _MIN_OVERLAP_CHARS:
+        return 0
+    probe = right[:_MIN_OVERLAP_CHARS]
+    start = max(0, len(left) - len(right))
+    # The earliest match is the longest suffix
+    index = left.find(probe, start)
+    while index != -1:
+        if right.startswith(left[index:]):
+            return len(left) - index
+        index = left.find(probe, index + 1)
+    return 0
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to about ``tokens`` tokens at a word boundary."""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > 0 else limit].rstrip() + " [...]"
+
+
+def assemble_context(
+    chunks: list[dict],
+    max_tokens: int | None = None,
+    merge: bool | None = None,
+) -> AssembledContext:
+    """
+    Build the prompt context for retrieved chunks.
+
+    Chunks are grouped by (source, page), ordered by their best retrieval
+    rank. Within a page they are put back in document order and, when
+    ``merge`` is on, adjacent chunks are joined on the text they share.
+    Chunks whose text is contained in another retrieved chunk are
+    dropped. Sections are then added until ``max_tokens`` is reached, the
+    last one truncated to fit.
+
+    Args:
+        chunks: Retrieved chunks with 'text' and 'metadata', best first.
+        max_tokens: Context token budget; 0 disables it. Defaults to
+            settings.context_max_tokens.
+        merge: Whether to merge same-page chunks. Defaults to
+            settings.context_merge_chunks.
+
+    Returns:
+        The assembled context and token accounting.
+    """
+    if max_tokens is None:
+        max_tokens = settings.context_max_tokens
+    if merge is None:
+        merge = settings.context_merge_chunks
+
+    # What concatenating every chunk in full would have cost
+    original_tokens = count_tokens(
+        "\n\n".join(
+            f"{_header(i, *_location(c))}\n{c['text']}"
+            for i, c in enumerate(chunks, 1)
+        )
+    )
+
+    # Drop exact and contained duplicates, keeping the better-ranked copy
+    # unless the later one contains it
+    kept: list[dict] = []
+    duplicates = 0
+    for chunk in chunks:
+        text = _normalize(chunk["text"])
+        if any(text in _normalize(k["text"]) for k in kept):
+            duplicates += 1
+            continue
+        before = len(kept)
+        kept = [k for k in kept if _normalize(k["text"]) not in text]
+        if len(kept) < before:
+            duplicates += before - len(kept)
+        kept.append(chunk)
+
+    sections: dict[tuple, list[dict]] = {}
+    for chunk in kept:
+        sections.setdefault(_location(chunk), []).append(chunk)
+
+    merged = 0
+    bodies = []
+    for key, group in sections.items():
+        if not merge:
+            bodies.append((key, [c["text"] for c in group]))
+            continue
+        group.sort(key=lambda c: c["metadata"].get("chunk_index", 0))
+        spans = [group[0]["text"]]
+        previous = group[0]["metadata"].get("chunk_index")
+        for chunk in group[1:]:
+            index = chunk["metadata"].get("chunk_index")
+            shared = _overlap(spans[-1], chunk["text"])
+            if shared:
+                spans[-1] += chunk["text"][shared:]
+                merged += 1
+            elif previous is not None and index == previous + 1:
+                spans[-1] += "\n" + chunk["text"]
+                merged += 1
+            else:
+                spans.append(chunk["text"])
+            previous = index
+        bodies.append((key, spans))
+
+    parts = []
+    used = 0
+    truncated = False
+    for number, ((source, page), spans) in enumerate(bodies, 1):
+        header = _header(number, source, page)
+        section = f"{header}\n{_GAP.join(spans)}"
+        cost = count_tokens(section + "\n\n")
+        if max_tokens and used + cost > max_tokens:
+            truncated = True
+            room = max_tokens - used - count_tokens(header + "\n\n")
+            if room >= _MIN_SECTION_TOKENS:
+                body = _truncate(_GAP.join(spans), room - 2)
+                parts.append(f"{header}\n{body}")
+            break
+        parts.append(section)
+        used += cost
+
+    text = "\n\n".join(parts)
+    return AssembledContext(
+        text=text,
+        tokens=count_tokens(text),
+        original_tokens=original_tokens,
+        chunks_merged=merged,
+        duplicates_dropped=duplicates,
+        truncated=truncated,
+    )
@@ -0,0 +1,652 @@
+"""
+Document store service.
+Holds chunk text and metadata keyed by FAISS vector ID. Supports a
+memory-mapped binary snapshot layout and an indexed SQLite database.
+"""
+
+import copy
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+
+class DocumentStore(ABC):
+    """Abstract base class for chunk record storage keyed by vector ID."""
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """Whether persisted records are present on disk."""
+        ...
+
+    @abstractmethod
+    def load(self) -> int:
+        """Open persisted records; returns the WAL sequence they cover."""
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def __contains__(self, vector_id: int) -> bool: ...
+
+    @abstractmethod
+    def get_many(self, vector_ids: list[int]) -> dict[int, dict]:
+        """Return records for the given IDs; missing IDs are omitted."""
+        ...
+
+    def get(self, vector_id: int) -> dict | None:
+        """Return the record for a vector ID, or None if absent."""
+        return self.get_many([vector_id]).get(vector_id)
+
+    @abstractmethod
+    def ids(self) -> np.ndarray:
+        """All live vector IDs."""
+        ...
+
+    @abstractmethod
+    def max_id(self) -> int:
+        """Largest live vector ID, or -1 when empty."""
+        ...
+
+    @abstractmethod
+    def sources(self) -> list[str]:
+        """Sorted names of documents with at least one chunk."""
+        ...
+
+    @abstractmethod
+    def ids_for_source(self, source: str) -> list[int]:
+        """Vector IDs of every chunk belonging to a document."""
+        ...
+
+    @abstractmethod
+    def add(self, documents: list[dict]) -> None:
+        """
+        Insert records; existing IDs are kept.
+
+        Each record carries 'id', 'vector_id', 'metadata' and a 'text_ref'
+        into the ChunkTextStore.
+        """
+        ...
+
+    @abstractmethod
+    def remove(self, vector_ids: list[int]) -> list[int]:
+        """Delete records by vector ID; returns the IDs actually removed."""
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget every record and delete persisted data."""
+        ...
+
+    def freeze(self) -> "DocumentStore":
+        """Point-in-time view to be written outside the vector store lock."""
+        return self
+
+    @abstractmethod
+    def write(self, wal_seq: int) -> str:
+        """Persist a snapshot covering ``wal_seq``; returns its generation."""
+        ...
+
+    def rebase(self, frozen: "DocumentStore", generation: str) -> None:
+        """Switch to a snapshot written from ``frozen``."""
+
+    def close(self) -> None:
+        """Release file handles."""
+
+
+def create_document_store(persist_dir: Path) -> DocumentStore:
+    """Build the metadata backend selected by ``settings.metadata_backend``."""
+    if settings.metadata_backend == "sqlite":
+        return SQLiteDocumentStore(persist_dir)
+    if settings.metadata_backend == "mmap":
+        return MappedDocumentStore(persist_dir)
+    raise ValueError(
+        f"Unknown metadata backend '{settings.metadata_backend}'. "
+        "Expected 'mmap' or 'sqlite'"
+    )
+
+
+class MappedDocumentStore(DocumentStore):
+    """
+    Chunk records keyed by vector ID, in memory-mapped snapshot files.
+
+    Records from the last snapshot stay in memory-mapped files and are
+    decoded only when accessed. Records added or removed since then are
+    kept in a small in-memory overlay until the next snapshot.
+
+    Snapshot layout (one generation per checkpoint):
+        metadata.manifest.json   generation, WAL sequence, source names
+        metadata-<gen>.ids       sorted int64 vector IDs
+        metadata-<gen>.offsets   uint64 record offsets into the blob (n+1)
+        metadata-<gen>.sources   int32 index into the source names (-1: none)
+        metadata-<gen>.bin       concatenated UTF-8 JSON records
+
+    Records reference their text in the ChunkTextStore rather than
+    embedding it, so the overlay stays small between snapshots.
+    """
+
+    MANIFEST = "metadata.manifest.json"
+
+    def __init__(self, persist_dir: Path):
+        self._dir = Path(persist_dir)
+        self._manifest_path = self._dir / self.MANIFEST
+        self._reset()
+
+    def _reset(self):
+        self._generation: str | None = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.uint64)
+        self._codes = np.empty(0, dtype=np.int32)
+        self._names: list[str] = []
+        self._blob: mmap.mmap | bytes = b""
+        self._added: dict[int, dict] = {}
+        self._removed: set[int] = set()
+        self._sources: dict[str, set[int]] | None = None
+        self._live_count = 0
+
+    # ── Loading ─────────────────────────────────────────────────────────
+
+    def exists(self) -> bool:
+        return self._manifest_path.exists()
+
+    def load(self) -> int:
+        with open(self._manifest_path, "r") as f:
+            manifest = json.load(f)
+
+        generation = manifest["generation"]
+        self._ids = self._map_array(generation, "ids", np.int64)
+        self._offsets = self._map_array(generation, "offsets", np.uint64)
+        self._codes = self._map_array(generation, "sources", np.int32)
+        self._names = manifest["sources"]
+        self._blob = self._map_blob(generation)
+        self._generation = generation
+        self._added = {}
+        self._removed = set()
+        self._sources = None
+        self._live_count = len(self._ids)
+        return manifest["wal_seq"]
+
+    def _path(self, generation: str, suffix: str) -> Path:
+        return self._dir / f"metadata-{generation}.{suffix}"
+
+    def _map_array(self, generation: str, suffix: str, dtype) -> np.ndarray:
+        path = self._path(generation, suffix)
+        if path.stat().st_size == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def _map_blob(self, generation: str) -> mmap.mmap | bytes:
+        path = self._path(generation, "bin")
+        if path.stat().st_size == 0:
+            return b""
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # ── Record access ───────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def __contains__(self, vector_id: int) -> bool:
+        if vector_id in self._added:
+            return True
+        if vector_id in self._removed:
+            return False
+        return self._base_position(vector_id) is not None
+
+    def _base_position(self, vector_id: int) -> int | None:
+        pos = int(np.searchsorted(self._ids, vector_id))
+        if pos < len(self._ids) and self._ids[pos] == vector_id:
+            return pos
+        return None
+
+    def _decode(self, pos: int) -> dict:
+        start, end = int(self._offsets[pos]), int(self._offsets[pos + 1])
+        doc = json.loads(self._blob[start:end])
+        doc["vector_id"] = int(self._ids[pos])
+        return doc
+
+    def get(self, vector_id: int) -> dict | None:
+        doc = self._added.get(vector_id)
+        if doc is not None:
+            return doc
+        if vector_id in self._removed:
+            return None
+        pos = self._base_position(vector_id)
+        return self._decode(pos) if pos is not None else None
+
+    def get_many(self, vector_ids: list[int]) -> dict[int, dict]:
+        found = {}
+        for vector_id in vector_ids:
+            doc = self.get(vector_id)
+            if doc is not None:
+                found[vector_id] = doc
+        return found
+
+    def ids(self) -> np.ndarray:
+        base = self._ids
+        if self._removed:
+            base = base[
+                ~np.isin(base, np.fromiter(self._removed, dtype=np.int64))
+            ]
+        return np.concatenate(
+            [base, np.fromiter(self._added, dtype=np.int64)]
+        )
+
+    def max_id(self) -> int:
+        candidates = [-1]
+        if len(self._ids):
+            candidates.append(int(self._ids[-1]))
+        if self._added:
+            candidates.append(max(self._added))
+        return max(candidates)
+
+    # ── Source index ────────────────────────────────────────────────────
+
+    def _source_index(self) -> dict[str, set[int]]:
+        """Lazily group vector IDs by source; maintained incrementally."""
+        if self._sources is None:
+            sources: dict[str, set[int]] = {}
+            if len(self._ids):
+                order = np.argsort(self._codes, kind="stable")
+                codes = np.asarray(self._codes)[order]
+                ids = np.asarray(self._ids)[order]
+                unique, starts = np.unique(codes, return_index=True)
+                for code, group in zip(unique, np.split(ids, starts[1:])):
+                    if code < 0:
+                        continue
+                    live = set(group.tolist()).difference(self._removed)
+                    if live:
+                        sources[self._names[code]] = live
+            for vector_id, doc in self._added.items():
+                source = doc["metadata"].get("source")
+                if source:
+                    sources.setdefault(source, set()).add(vector_id)
+            self._sources = sources
+        return self._sources
+
+    def sources(self) -> list[str]:
+        return sorted(self._source_index())
+
+    def ids_for_source(self, source: str) -> list[int]:
+        return list(self._source_index().get(source, ()))
+
+    # ── Mutation ────────────────────────────────────────────────────────
+
+    def add(self, documents: list[dict]) -> None:
+        for doc in documents:
+            vector_id = doc["vector_id"]
+            if vector_id in self:
+                continue
+            self._added[vector_id] = doc
+            self._removed.discard(vector_id)
+            self._live_count += 1
+            source = doc["metadata"].get("source")
+            if source and self._sources is not None:
+                self._sources.setdefault(source, set()).add(vector_id)
+
+    def remove(self, vector_ids: list[int]) -> list[int]:
+        removed = []
+        for vector_id in vector_ids:
+            if vector_id not in self:
+                continue
+            # Only decode the record when the source index needs updating
+            doc = self.get(vector_id) if self._sources is not None else None
+            self._added.pop(vector_id, None)
+            self._removed.add(vector_id)
+            self._live_count -= 1
+            removed.append(vector_id)
+            source = doc["metadata"].get("source") if doc else None
+            if source in (self._sources or {}):
+                ids = self._sources[source]
+                ids.discard(vector_id)
+                if not ids:
+                    del self._sources[source]
+        return removed
+
+    def clear(self) -> None:
+        self._reset()
+        self._manifest_path.unlink(missing_ok=True)
+        for path in self._dir.glob("metadata-*"):
+            path.unlink(missing_ok=True)
+
+    # ── Snapshots ───────────────────────────────────────────────────────
+
+    def freeze(self) -> "MappedDocumentStore":
+        frozen = copy.copy(self)
+        frozen._added = dict(self._added)
+        frozen._removed = set(self._removed)
+        frozen._sources = None
+        return frozen
+
+    def write(self, wal_seq: int) -> str:
+        """
+        Persist this store as a new snapshot generation.
+
+        Data files are written first and the manifest is swapped in last,
+        so a crash leaves either the old or the new generation intact.
+
+        Returns:
+            The new generation name.
+        """
+        generation = f"{wal_seq:020d}-{uuid.uuid4().hex[:8]}"
+
+        base_ids = np.asarray(self._ids)
+        keep = np.ones(len(base_ids), dtype=bool)
+        if self._removed:
+            keep = ~np.isin(
+                base_ids, np.fromiter(self._removed, dtype=np.int64)
+            )
+        names = list(self._names)
+        name_codes = {name: code for code, name in enumerate(names)}
+
+        def code_for(doc: dict) -> int:
+            source = doc["metadata"].get("source")
+            if not source:
+                return -1
+            if source not in name_codes:
+                name_codes[source] = len(names)
+                names.append(source)
+            return name_codes[source]
+
+        added_ids = sorted(self._added)
+        ids = np.concatenate(
+            [base_ids[keep], np.array(added_ids, dtype=np.int64)]
+        )
+        codes = np.concatenate(
+            [
+                np.asarray(self._codes)[keep],
+                np.array(
+                    [code_for(self._added[i]) for i in added_ids],
+                    dtype=np.int32,
+                ),
+            ]
+        )
+        order = np.argsort(ids, kind="stable")
+        base_positions = np.flatnonzero(keep)
+        num_base = len(base_positions)
+
+        offsets = np.zeros(len(ids) + 1, dtype=np.uint64)
+        with open(self._path(generation, "bin"), "wb") as f:
+            for out_pos, src in enumerate(order.tolist()):
+                if src < num_base:
+                    pos = int(base_positions[src])
+                    start = int(self._offsets[pos])
+                    end = int(self._offsets[pos + 1])
+                    record = self._blob[start:end]
+                else:
+                    doc = dict(self._added[added_ids[src - num_base]])
+                    doc.pop("vector_id")
+                    record = json.dumps(doc).encode("utf-8")
+                f.write(record)
+                offsets[out_pos + 1] = offsets[out_pos] + len(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for suffix, array in (
+            ("ids", ids[order]),
+            ("offsets", offsets),
+            ("sources", codes[order]),
+        ):
+            with open(self._path(generation, suffix), "wb") as f:
+                f.write(np.ascontiguousarray(array).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        tmp_manifest = self._manifest_path.with_name(self.MANIFEST + ".tmp")
+        with open(tmp_manifest, "w") as f:
+            json.dump(
+                {
+                    "generation": generation,
+                    "wal_seq": wal_seq,
+                    "sources": names,
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_manifest, self._manifest_path)
+
+        # Older generations are no longer referenced by the manifest
+        for path in self._dir.glob("metadata-*"):
+            if not path.name.startswith(f"metadata-{generation}."):
+                path.unlink(missing_ok=True)
+
+        logger.debug(
+            f"Wrote metadata snapshot {generation} ({len(ids)} records)"
+        )
+        return generation
+
+    def rebase(self, frozen: "MappedDocumentStore", generation: str) -> None:
+        """Changes made after ``frozen`` was taken are kept in the overlay."""
+        added = {
+            k: v for k, v in self._added.items() if k not in frozen._added
+        }
+        removed = self._removed - frozen._removed
+        sources = self._sources
+        live_count = self._live_count
+
+        self._generation = generation
+        self._ids = self._map_array(generation, "ids", np.int64)
+        self._offsets = self._map_array(generation, "offsets", np.uint64)
+        self._codes = self._map_array(generation, "sources", np.int32)
+        with open(self._manifest_path, "r") as f:
+            self._names = json.load(f)["sources"]
+        self._blob = self._map_blob(generation)
+        self._added = added
+        self._removed = removed
+        self._sources = sources
+        self._live_count = live_count
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """
+    Chunk records in an embedded SQLite database.
+
+    Rows are keyed by vector ID with indexes on source and page, so
+    listing, deleting and hydrating results are indexed lookups. Chunk
+    text lives in the ChunkTextStore; rows only hold its reference.
+    Writes are committed immediately; a snapshot only records which WAL
+    sequence the database is known to cover.
+    """
+
+    DB_NAME = "metadata.sqlite3"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chunks (
+            vector_id INTEGER PRIMARY KEY,
+            chunk_id TEXT NOT NULL,
+            source TEXT,
+            page INTEGER,
+            text_offset INTEGER NOT NULL,
+            text_length INTEGER NOT NULL,
+            metadata TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source);
+        CREATE INDEX IF NOT EXISTS idx_chunks_source_page
+            ON chunks (source, page);
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, persist_dir: Path):
+        self._path = Path(persist_dir) / self.DB_NAME
+        self._conn: sqlite3.Connection | None = None
+        self._count: int | None = None
+        # The connection is shared by request threads and the checkpointer
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self._path, check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self._SCHEMA)
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _read(self, sql: str, params=()) -> list[tuple]:
+        """Run a query; a database that doesn't exist yet reads as empty."""
+        with self._lock:
+            if self._conn is None and not self._path.exists():
+                return []
+            return self._connect().execute(sql, params).fetchall()
+
+    def exists(self) -> bool:
+        if not self._path.exists():
+            return False
+        return bool(self._read("SELECT 1 FROM state WHERE key = 'wal_seq'"))
+
+    def load(self) -> int:
+        rows = self._read("SELECT value FROM state WHERE key = 'wal_seq'")
+        return rows[0][0] if rows else 0
+
+    def __len__(self) -> int:
+        # Cached: checked on every query to detect an empty store
+        if self._count is None:
+            rows = self._read("SELECT COUNT(*) FROM chunks")
+            self._count = rows[0][0] if rows else 0
+        return self._count
+
+    def __contains__(self, vector_id: int) -> bool:
+        return bool(
+            self._read(
+                "SELECT 1 FROM chunks WHERE vector_id = ?", (vector_id,)
+            )
+        )
+
+    @staticmethod
+    def _batches(vector_ids: list[int], size: int = 500):
+        """Split IDs to stay under SQLite's bound-parameter limit."""
+        ids = [int(i) for i in vector_ids]
+        for start in range(0, len(ids), size):
+            batch = ids[start : start + size]
+            yield batch, ",".join("?" * len(batch))
+
+    def get_many(self, vector_ids: list[int]) -> dict[int, dict]:
+        found = {}
+        for batch, placeholders in self._batches(vector_ids):
+            rows = self._read(
+                "SELECT vector_id, chunk_id, text_offset, text_length, "
+                "metadata FROM chunks "
+                f"WHERE vector_id IN ({placeholders})",
+                batch,
+            )
+            for vector_id, chunk_id, offset, length, metadata in rows:
+                found[vector_id] = {
+                    "id": chunk_id,
+                    "vector_id": vector_id,
+                    "text_ref": [offset, length],
+                    "metadata": json.loads(metadata),
+                }
+        return found
+
+    def ids(self) -> np.ndarray:
+        rows = self._read("SELECT vector_id FROM chunks")
+        return np.array([r[0] for r in rows], dtype=np.int64)
+
+    def max_id(self) -> int:
+        rows = self._read("SELECT MAX(vector_id) FROM chunks")
+        return -1 if not rows or rows[0][0] is None else rows[0][0]
+
+    def sources(self) -> list[str]:
+        rows = self._read(
+            "SELECT DISTINCT source FROM chunks "
+            "WHERE source IS NOT NULL AND source != '' ORDER BY source"
+        )
+        return [r[0] for r in rows]
+
+    def ids_for_source(self, source: str) -> list[int]:
+        rows = self._read(
+            "SELECT vector_id FROM chunks WHERE source = ?", (source,)
+        )
+        return [r[0] for r in rows]
+
+    def add(self, documents: list[dict]) -> None:
+        rows = [
+            (
+                doc["vector_id"],
+                doc["id"],
+                doc["metadata"].get("source"),
+                doc["metadata"].get("page"),
+                doc["text_ref"][0],
+                doc["text_ref"][1],
+                json.dumps(doc["metadata"]),
+            )
+            for doc in documents
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                inserted = conn.executemany(
+                    "INSERT OR IGNORE INTO chunks (vector_id, chunk_id, "
+                    "source, page, text_offset, text_length, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                ).rowcount
+            if self._count is not None:
+                self._count += inserted
+
+    def remove(self, vector_ids: list[int]) -> list[int]:
+        removed = []
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                for batch, placeholders in self._batches(vector_ids):
+                    removed.extend(
+                        r[0]
+                        for r in conn.execute(
+                            "SELECT vector_id FROM chunks "
+                            f"WHERE vector_id IN ({placeholders})",
+                            batch,
+                        )
+                    )
+                    conn.execute(
+                        "DELETE FROM chunks "
+                        f"WHERE vector_id IN ({placeholders})",
+                        batch,
+                    )
+            if self._count is not None:
+                self._count -= len(removed)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.execute("DELETE FROM chunks")
+                conn.execute("DELETE FROM state")
+            self._count = 0
+
+    def write(self, wal_seq: int) -> str:
+        self._execute(
+            "INSERT OR REPLACE INTO state (key, value) VALUES ('wal_seq', ?)",
+            (wal_seq,),
+        )
+        return str(wal_seq)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
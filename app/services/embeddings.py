@@ -1,12 +1,206 @@
 """
 Embedding service.
-Generates vector embeddings from text using sentence-transformers.
+Generates vector embeddings from text using sentence-transformers, on
+either PyTorch or ONNX Runtime (optionally int8-quantized).
+Concurrent single-query embeddings are coalesced into batched encodes.
 """
 
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from loguru import logger
 
 from app.config import settings
+from app.services.metrics import observe_stage, stage_timer
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+
+def load_embedding_model(
+    backend: str | None = None, quantize: bool | None = None
+) -> SentenceTransformer:
+    """
+    Load the configured embedding model on the requested backend.
+
+    The ONNX backend exports the model once into ``embedding_onnx_dir``
+    and reuses the export on later starts. With ``quantize`` the export
+    is dynamically quantized to int8 for the configured CPU target.
+    Requires ``optimum[onnxruntime]``.
+
+    Args:
+        backend: 'torch' or 'onnx'. Defaults to settings.embedding_backend.
+        quantize: Use the int8 export.
+            Defaults to settings.embedding_onnx_quantize.
+
+    Returns:
+        SentenceTransformer instance (same encode API for all backends).
+    """
+    backend = backend or settings.embedding_backend
+    if quantize is None:
+        quantize = settings.embedding_onnx_quantize
+
+    if backend == "torch":
+        return SentenceTransformer(settings.embedding_model)
+    if backend != "onnx":
+        raise ValueError(
+            f"Unknown embedding backend '{backend}'. "
+            f"Expected one of {EMBEDDING_BACKENDS}"
+        )
+
+    export_dir = Path(settings.embedding_onnx_dir) / (
+        settings.embedding_model.replace("/", "__")
+    )
+    if not (export_dir / "onnx" / "model.onnx").exists():
+        logger.info(f"Exporting embedding model to ONNX: {export_dir}")
+        model = SentenceTransformer(settings.embedding_model, backend="onnx")
+        model.save_pretrained(str(export_dir))
+    else:
+        model = None
+
+    if not quantize:
+        return model or SentenceTransformer(str(export_dir), backend="onnx")
+
+    target = settings.embedding_onnx_quantization
+    file_name = f"model_qint8_{target}.onnx"
+    if not (export_dir / "onnx" / file_name).exists():
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info(f"Quantizing ONNX embedding model to int8 ({target})")
+        export_dynamic_quantized_onnx_model(
+            model or SentenceTransformer(str(export_dir), backend="onnx"),
+            quantization_config=target,
+            model_name_or_path=str(export_dir),
+        )
+    return SentenceTransformer(
+        str(export_dir),
+        backend="onnx",
+        model_kwargs={"file_name": f"onnx/{file_name}"},
+    )
+
+
+class QueryBatcher:
+    """
+    Micro-batcher for query embeddings.
+
+    Callers submit one text each; a worker thread takes the first pending
+    request, waits up to ``max_wait_ms`` for others to arrive (or until
+    ``max_batch_size`` is reached) and encodes them in a single call.
+    Works for both threads (``embed``) and coroutines (``aembed``).
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+    ):
+        self._encode = encode
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue[tuple[str, Future, float] | None] = (
+            queue.Queue()
+        )
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._max_batch_seen = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._worker = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text; the future resolves to its embedding."""
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str) -> list[float]:
+        """Blocking helper for thread callers."""
+        return self.submit(text).result()
+
+    async def aembed(self, text: str) -> list[float]:
+        """Awaitable helper for coroutine callers."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self) -> list[tuple[str, Future, float]] | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self._max_wait
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            try:
+                embeddings = self._encode([text for text, _, _ in batch])
+                observe_stage("embed_query", time.perf_counter() - started)
+                for (_, future, _), embedding in zip(batch, embeddings):
+                    future.set_result(embedding.tolist())
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                self._total_wait += sum(waits)
+                self._max_wait_seen = max(self._max_wait_seen, max(waits))
+
+    def stats(self) -> dict:
+        """Batch size and queue wait statistics since startup."""
+        with self._stats_lock:
+            batches = self._batches or 1
+            requests = self._requests or 1
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": round(self._requests / batches, 2),
+                "max_batch_size": self._max_batch_seen,
+                "avg_queue_wait_ms": round(
+                    self._total_wait / requests * 1000, 3
+                ),
+                "max_queue_wait_ms": round(self._max_wait_seen * 1000, 3),
+                "queue_depth": self._queue.qsize(),
+            }
+
+    def close(self):
+        """Stop the worker after pending requests are served."""
+        self._queue.put(None)
+        self._worker.join()
 
 
 class EmbeddingService:
@@ -14,6 +208,8 @@ class EmbeddingService:
 
     _instance: "EmbeddingService | None" = None
     _model: SentenceTransformer | None = None
+    _batcher: QueryBatcher | None = None
+    _batcher_lock = threading.Lock()
 
     def __new__(cls) -> "EmbeddingService":
         if cls._instance is None:
@@ -24,12 +220,27 @@ class EmbeddingService:
         """Lazy-load the embedding model."""
         if self._model is None:
             logger.info(
-                f"Loading embedding model: {settings.embedding_model}"
+                f"Loading embedding model: {settings.embedding_model} "
+                f"(backend={settings.embedding_backend})"
             )
-            self._model = SentenceTransformer(settings.embedding_model)
+            self._model = load_embedding_model()
             logger.info("Embedding model loaded successfully")
         return self._model
 
+    def _get_batcher(self) -> QueryBatcher:
+        """Lazy-start the query micro-batcher."""
+        with self._batcher_lock:
+            if self._batcher is None:
+                EmbeddingService._batcher = QueryBatcher(
+                    lambda texts: self._get_model().encode(
+                        texts, show_progress_bar=False, convert_to_numpy=True
+                    ),
+                    max_batch_size=settings.embedding_batch_max_size,
+                    max_wait_ms=settings.embedding_batch_max_wait_ms,
+                )
+        return self._batcher
+
+    @stage_timer("embed")
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
         """
         Generate embeddings for a list of texts.
@@ -51,12 +262,27 @@ class EmbeddingService:
         """
         Generate embedding for a single query text.
 
+        Concurrent calls are coalesced into one encode by the batcher.
+
         Args:
             query: Query string to embed.
 
         Returns:
             Embedding vector as list of floats.
         """
+        if settings.embedding_batch_enabled:
+            return self._get_batcher().embed(query)
         model = self._get_model()
-        embedding = model.encode([query], convert_to_numpy=True)
+        with stage_timer("embed_query"):
+            embedding = model.encode([query], convert_to_numpy=True)
         return embedding[0].tolist()
+
+    async def aembed_query(self, query: str) -> list[float]:
+        """Awaitable variant of embed_query for coroutine callers."""
+        if settings.embedding_batch_enabled:
+            return await self._get_batcher().aembed(query)
+        return await asyncio.to_thread(self.embed_query, query)
+
+    def batcher_stats(self) -> dict | None:
+        """Micro-batcher statistics, or None if it hasn't started."""
+        return self._batcher.stats() if self._batcher else None
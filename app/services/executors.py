@@ -0,0 +1,69 @@
+"""
+Bounded worker pools for blocking work.
+Keeps CPU-bound retrieval (query embedding, FAISS search) off the asyncio
+event loop. LLM calls don't need a pool: they are awaited on async clients.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.services import profiling
+
+
+class BlockingPool:
+    """
+    A named, fixed-size thread pool awaitable from coroutines.
+
+    Threads (rather than processes) are used because the embedding model
+    and FAISS release the GIL and must share in-process state.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=name
+        )
+        self._in_flight = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` on the pool and await its result.
+
+        The caller's context variables (e.g. request timings) are visible
+        to ``fn``, as with asyncio.to_thread, and a profiled caller's work
+        is profiled on the worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    context.run, profiling.call, fn, *args, **kwargs
+                ),
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+
+    def stats(self) -> dict:
+        """Pool size, calls running or queued, and calls completed."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
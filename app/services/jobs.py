@@ -0,0 +1,242 @@
+"""
+Ingestion job service.
+Runs PDF parsing, chunking and embedding on a worker pool so uploads return
+immediately, and tracks per-job progress for status polling.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from loguru import logger
+
+from app.config import settings
+from app.services import profiling, timing
+from app.services.metrics import DOCUMENTS_INDEXED
+
+
+@dataclass
+class IngestionJob:
+    """
+    Progress and outcome of one upload request.
+
+    ``status`` moves from queued to running to completed or failed.
+    """
+
+    id: str
+    files: list[str]
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    pages_extracted: int = 0
+    chunks_created: int = 0
+    chunks_embedded: int = 0
+    documents_indexed: int = 0
+    errors: list[str] = field(default_factory=list)
+    message: str | None = None
+    # Milliseconds per stage (pdf_extract, chunk, embed, ...)
+    timings: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+class IngestionJobManager:
+    """
+    Queues uploads onto a bounded thread pool and keeps their status.
+
+    Finished jobs are kept for ``retention_seconds`` so clients can poll
+    the result, then pruned on the next submission.
+    """
+
+    def __init__(
+        self,
+        pdf_processor,
+        vector_store,
+        max_workers: int | None = None,
+        retention_seconds: float | None = None,
+    ):
+        self.pdf_processor = pdf_processor
+        self.vector_store = vector_store
+        self._retention_seconds = (
+            retention_seconds
+            if retention_seconds is not None
+            else settings.ingest_job_retention_seconds
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ingest_workers,
+            thread_name_prefix="ingest",
+        )
+        self._jobs: dict[str, IngestionJob] = {}
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        files: list[tuple[str, bytes]],
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+        errors: list[str] | None = None,
+    ) -> IngestionJob:
+        """
+        Queue PDFs for ingestion.
+
+        Args:
+            files: ``(filename, content)`` pairs to index.
+            chunk_size: Optional override for chunk size.
+            chunk_overlap: Optional override for chunk overlap.
+            errors: Validation errors collected before submission, reported
+                alongside the job's own.
+
+        Returns:
+            The queued job.
+        """
+        job = IngestionJob(
+            id=uuid.uuid4().hex,
+            files=[filename for filename, _ in files],
+            errors=list(errors or []),
+        )
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            # Run in the submitter's context so a profiled upload stays so
+            self._futures[job.id] = self._executor.submit(
+                contextvars.copy_context().run,
+                self._run,
+                job,
+                files,
+                chunk_size,
+                chunk_overlap,
+            )
+        logger.info(f"Queued ingestion job {job.id} ({len(files)} files)")
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        """Snapshot of a job's state, or None if unknown or pruned."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return asdict(job) if job else None
+
+    async def wait(self, job_id: str) -> dict:
+        """Wait for a job to finish without blocking the event loop."""
+        with self._lock:
+            future = self._futures[job_id]
+        await asyncio.wrap_future(future)
+        return self.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs, optionally draining queued ones."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._retention_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.done and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            del self._futures[job_id]
+
+    def _update(self, job: IngestionJob, **changes) -> None:
+        with self._lock:
+            for name, value in changes.items():
+                setattr(job, name, value)
+
+    def _add_embedded(self, job: IngestionJob, count: int) -> None:
+        with self._lock:
+            job.chunks_embedded += count
+
+    def _run(
+        self,
+        job: IngestionJob,
+        files: list[tuple[str, bytes]],
+        chunk_size: int | None,
+        chunk_overlap: int | None,
+    ) -> None:
+        # Stage timers in this thread record into the job's timings
+        with timing.collect() as timings:
+            try:
+                profiling.call(
+                    self._ingest, job, files, chunk_size, chunk_overlap
+                )
+            except Exception as e:
+                # Per-file errors are handled in _ingest; anything else must
+                # still finish the job so it is reported and later pruned
+                logger.exception(f"Ingestion job {job.id} crashed: {e}")
+                with self._lock:
+                    job.status = "failed"
+                    job.finished_at = time.time()
+                    job.message = f"Ingestion failed: {e}"
+            finally:
+                self._update(job, timings=timings.totals())
+
+    def _ingest(
+        self,
+        job: IngestionJob,
+        files: list[tuple[str, bytes]],
+        chunk_size: int | None,
+        chunk_overlap: int | None,
+    ) -> None:
+        self._update(job, status="running", started_at=time.time())
+        total_chunks = 0
+        errors = []
+
+        for filename, content in files:
+            try:
+                pages = self.pdf_processor.extract_text_from_pdf(
+                    content, filename
+                )
+                self._update(
+                    job, pages_extracted=job.pages_extracted + len(pages)
+                )
+
+                chunks = self.pdf_processor.split_pages(
+                    pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+                )
+                if not chunks:
+                    errors.append(f"'{filename}': No text could be extracted.")
+                    continue
+                self._update(
+                    job, chunks_created=job.chunks_created + len(chunks)
+                )
+
+                num_chunks = self.vector_store.add_chunks(
+                    chunks,
+                    on_progress=lambda n: self._add_embedded(job, n),
+                )
+                total_chunks += num_chunks
+                self._update(job, documents_indexed=job.documents_indexed + 1)
+                DOCUMENTS_INDEXED.inc()
+                logger.info(f"Indexed '{filename}': {num_chunks} chunks")
+
+            except Exception as e:
+                logger.error(f"Error processing '{filename}': {e}")
+                errors.append(f"'{filename}': {str(e)}")
+
+        with self._lock:
+            job.errors.extend(errors)
+            job.finished_at = time.time()
+            if job.documents_indexed == 0:
+                job.status = "failed"
+                job.message = "No documents were successfully processed."
+                if job.errors:
+                    job.message += f" Errors: {'; '.join(job.errors)}"
+            else:
+                job.status = "completed"
+                job.message = "Documents processed successfully"
+                if job.errors:
+                    job.message += f" (with warnings: {'; '.join(job.errors)})"
+
+        logger.info(
+            f"Ingestion job {job.id} {job.status} in "
+            f"{job.finished_at - job.started_at:.2f}s: "
+            f"{job.documents_indexed} docs, {total_chunks} chunks"
+        )
@@ -1,13 +1,33 @@
 """
 LLM service with multi-provider support.
-Supports Google Gemini and OpenAI with automatic fallback.
+Supports Google Gemini and OpenAI with automatic fallback, plus a local
+stub provider for load tests.
 """
 
+import asyncio
+import math
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator
 
+import httpx
 from loguru import logger
 
 from app.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.context import AssembledContext, assemble_context
+from app.services import timing
+from app.services.metrics import CONTEXT_TOKENS, LLM_ERRORS, LLM_SECONDS
+from app.services.rate_limit import (
+    ProviderRateLimiter,
+    RateLimitExceeded,
+    backoff_delay,
+    estimate_tokens,
+    is_rate_limit_error,
+)
 
 
 SYSTEM_PROMPT = """You are a knowledgeable assistant that answers questions based ONLY on the provided context.
@@ -29,16 +49,52 @@ Question: {question}
 Provide a precise answer based on the context above. Include relevant quotes as references."""
 
 
-def _build_context(context_chunks: list[dict]) -> str:
-    """Build a context string from retrieved chunks."""
-    parts = []
-    for i, chunk in enumerate(context_chunks, 1):
-        source = chunk["metadata"].get("source", "unknown")
-        page = chunk["metadata"].get("page", "?")
-        parts.append(
-            f"[Source {i}: {source}, Page {page}]\n{chunk['text']}"
+NO_CONTEXT_ANSWER = (
+    "No relevant documents found to answer this question. "
+    "Please upload relevant documents first."
+)
+
+
+def _build_user_prompt(question: str, context: AssembledContext) -> str:
+    """Format the user prompt for a question and its assembled context."""
+    return USER_PROMPT_TEMPLATE.format(context=context.text, question=question)
+
+
+# ── Shared HTTP Pool ────────────────────────────────────────────────────────
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Connection pool shared by every provider's async client.
+
+    Keep-alive connections are reused across questions and providers,
+    so concurrent calls don't pay a TLS handshake each.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_http_max_connections,
+                max_keepalive_connections=(
+                    settings.llm_http_max_keepalive_connections
+                ),
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(
+                settings.llm_http_timeout_seconds, connect=10.0
+            ),
         )
-    return "\n\n".join(parts)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared connection pool."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 # ── Provider Implementations ────────────────────────────────────────────────
@@ -54,10 +110,34 @@ class LLMProvider(ABC):
         """Generate a response from the LLM."""
         ...
 
+    async def agenerate(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        Awaitable generate.
+
+        Providers without an async client run generate() in a thread.
+        """
+        return await asyncio.to_thread(
+            self.generate, system_prompt, user_prompt
+        )
+
+    async def astream(
+        self, system_prompt: str, user_prompt: str
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response as text deltas.
+
+        Providers without native streaming yield the full answer at once.
+        """
+        yield await self.agenerate(system_prompt, user_prompt)
+
     def is_available(self) -> bool:
         """Check if this provider is configured."""
         return True
 
+    def rate_limits(self) -> tuple[float, float]:
+        """Requests and tokens per minute allowed (0 = unlimited)."""
+        return 0, 0
+
 
 class GeminiProvider(LLMProvider):
     """Google Gemini LLM provider."""
@@ -66,10 +146,14 @@ class GeminiProvider(LLMProvider):
 
     def __init__(self):
         self._client = None
+        self._async_client = None
 
     def is_available(self) -> bool:
         return bool(settings.gemini_api_key)
 
+    def rate_limits(self) -> tuple[float, float]:
+        return settings.gemini_rpm, settings.gemini_tpm
+
     def _get_client(self):
         if self._client is None:
             from google import genai
@@ -77,21 +161,57 @@ class GeminiProvider(LLMProvider):
             self._client = genai.Client(api_key=settings.gemini_api_key)
         return self._client
 
-    def generate(self, system_prompt: str, user_prompt: str) -> str:
+    def _get_async_client(self):
+        if self._async_client is None:
+            from google import genai
+
+            self._async_client = genai.Client(
+                api_key=settings.gemini_api_key,
+                http_options=genai.types.HttpOptions(
+                    httpx_async_client=get_http_client()
+                ),
+            ).aio
+        return self._async_client
+
+    def _config(self, system_prompt: str):
         from google import genai
 
+        return genai.types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            temperature=settings.llm_temperature,
+            max_output_tokens=settings.llm_max_tokens,
+        )
+
+    def generate(self, system_prompt: str, user_prompt: str) -> str:
         client = self._get_client()
         response = client.models.generate_content(
             model=settings.gemini_model,
             contents=user_prompt,
-            config=genai.types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=settings.llm_temperature,
-                max_output_tokens=settings.llm_max_tokens,
-            ),
+            config=self._config(system_prompt),
         )
         return response.text.strip()
 
+    async def agenerate(self, system_prompt: str, user_prompt: str) -> str:
+        client = self._get_async_client()
+        response = await client.models.generate_content(
+            model=settings.gemini_model,
+            contents=user_prompt,
+            config=self._config(system_prompt),
+        )
+        return response.text.strip()
+
+    async def astream(
+        self, system_prompt: str, user_prompt: str
+    ) -> AsyncIterator[str]:
+        client = self._get_async_client()
+        async for chunk in await client.models.generate_content_stream(
+            model=settings.gemini_model,
+            contents=user_prompt,
+            config=self._config(system_prompt),
+        ):
+            if chunk.text:
+                yield chunk.text
+
 
 class OpenAIProvider(LLMProvider):
     """OpenAI GPT LLM provider."""
@@ -100,10 +220,14 @@ class OpenAIProvider(LLMProvider):
 
     def __init__(self):
         self._client = None
+        self._async_client = None
 
     def is_available(self) -> bool:
         return bool(settings.openai_api_key)
 
+    def rate_limits(self) -> tuple[float, float]:
+        return settings.openai_rpm, settings.openai_tpm
+
     def _get_client(self):
         if self._client is None:
             from openai import OpenAI
@@ -111,19 +235,177 @@ class OpenAIProvider(LLMProvider):
             self._client = OpenAI(api_key=settings.openai_api_key)
         return self._client
 
-    def generate(self, system_prompt: str, user_prompt: str) -> str:
-        client = self._get_client()
-        response = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
+    def _get_async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+
+            self._async_client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                http_client=get_http_client(),
+            )
+        return self._async_client
+
+    def _request(self, system_prompt: str, user_prompt: str) -> dict:
+        return {
+            "model": settings.openai_model,
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            temperature=settings.llm_temperature,
-            max_tokens=settings.llm_max_tokens,
+            "temperature": settings.llm_temperature,
+            "max_tokens": settings.llm_max_tokens,
+        }
+
+    def generate(self, system_prompt: str, user_prompt: str) -> str:
+        client = self._get_client()
+        response = client.chat.completions.create(
+            **self._request(system_prompt, user_prompt)
+        )
+        return response.choices[0].message.content.strip()
+
+    async def agenerate(self, system_prompt: str, user_prompt: str) -> str:
+        client = self._get_async_client()
+        response = await client.chat.completions.create(
+            **self._request(system_prompt, user_prompt)
         )
         return response.choices[0].message.content.strip()
 
+    async def astream(
+        self, system_prompt: str, user_prompt: str
+    ) -> AsyncIterator[str]:
+        client = self._get_async_client()
+        response = await client.chat.completions.create(
+            **self._request(system_prompt, user_prompt), stream=True
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubProviderError(RuntimeError):
+    """Failure injected by StubProvider; 429s look like provider quotas."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Stub LLM injected error {status_code}")
+        self.status_code = status_code
+
+
+class StubProvider(LLMProvider):
+    """
+    Local provider with simulated latency, for offline load tests.
+
+    Each call draws its time to first token and outcome from a random
+    generator seeded with ``stub_llm_seed``, so a run with the same
+    settings and call order is reproducible. The answer is built from the
+    prompt's own words and streamed one word per token.
+    """
+
+    name = "stub"
+
+    def __init__(self):
+        self._rng = random.Random(settings.stub_llm_seed)
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return settings.stub_llm_enabled
+
+    def _plan(self) -> tuple[float, int | None]:
+        """Time to first token (seconds) and injected error status, if any."""
+        mean = settings.stub_llm_latency_ms / 1000
+        stddev = settings.stub_llm_latency_stddev_ms / 1000
+        with self._lock:
+            if mean > 0 and stddev > 0:
+                # Lognormal with the configured mean and stddev: skewed
+                # towards a long tail, like real completion latencies
+                sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+                mu = math.log(mean) - sigma**2 / 2
+                latency = self._rng.lognormvariate(mu, sigma)
+            else:
+                latency = max(mean, 0.0)
+            roll = self._rng.random()
+        if roll < settings.stub_llm_rate_limit_rate:
+            return latency, 429
+        if roll < (
+            settings.stub_llm_rate_limit_rate + settings.stub_llm_failure_rate
+        ):
+            return latency, 500
+        return latency, None
+
+    @staticmethod
+    def _tokens(user_prompt: str) -> list[str]:
+        words = user_prompt.split() or ["stub"]
+        count = max(settings.stub_llm_answer_tokens, 1)
+        return [
+            words[i % len(words)] if i == 0 else f" {words[i % len(words)]}"
+            for i in range(count)
+        ]
+
+    @staticmethod
+    def _token_interval() -> float:
+        tps = settings.stub_llm_tokens_per_second
+        return 1 / tps if tps > 0 else 0.0
+
+    def generate(self, system_prompt: str, user_prompt: str) -> str:
+        return asyncio.run(self.agenerate(system_prompt, user_prompt))
+
+    async def agenerate(self, system_prompt: str, user_prompt: str) -> str:
+        return "".join(
+            [t async for t in self.astream(system_prompt, user_prompt)]
+        )
+
+    async def astream(
+        self, system_prompt: str, user_prompt: str
+    ) -> AsyncIterator[str]:
+        latency, error = self._plan()
+        await asyncio.sleep(latency)
+        if error:
+            raise StubProviderError(error)
+        interval = self._token_interval()
+        for i, token in enumerate(self._tokens(user_prompt)):
+            if i and interval:
+                await asyncio.sleep(interval)
+            yield token
+
+
+# ── Latency Tracking ────────────────────────────────────────────────────────
+
+
+class LatencyTracker:
+    """
+    Rolling window of a provider's call latencies.
+
+    Successful calls record their latency; calls cancelled by a hedge
+    record their elapsed time as a lower bound.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float | None:
+        """Latency at the given percentile (0-100), or None if empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[rank]
+
+    def stats(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
 
 # ── Main LLM Service ────────────────────────────────────────────────────────
 
@@ -133,16 +415,31 @@ class LLMService:
     Multi-provider LLM service with fallback.
 
     Tries the primary provider first. If it fails, falls back to the
-    secondary provider automatically.
+    secondary provider automatically. With hedging enabled, a provider
+    that is merely slow is raced against the next one once it exceeds its
+    own tail latency. Each provider sits behind a circuit breaker so one
+    that keeps failing is skipped instantly instead of timing out first,
+    and behind a client-side rate limiter so bursts queue briefly under
+    its quota instead of drawing 429s; those that still do are retried
+    with jittered exponential backoff.
     """
 
     def __init__(self):
         self._providers: list[LLMProvider] = []
+        self._latency: dict[str, LatencyTracker] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._limiters: dict[str, ProviderRateLimiter] = {}
+        self._context_requests = 0
+        self._context_tokens = 0
+        self._context_tokens_saved = 0
+        self._hedges_fired = 0
+        self._hedges_won = 0
         self._init_providers()
 
     def _init_providers(self):
         """Initialize available providers in priority order."""
         candidates = [
+            StubProvider(),
             GeminiProvider(),
             OpenAIProvider(),
         ]
@@ -162,6 +459,28 @@ class LLMService:
         question: str,
         context_chunks: list[dict],
         provider: str | None = None,
+    ) -> dict:
+        """
+        Blocking agenerate_answer, for callers without an event loop.
+
+        Args:
+            question: User's question.
+            context_chunks: Retrieved chunks from vector store.
+            provider: Optional provider name ('gemini' or 'openai').
+                      If set, only that provider is used (no fallback).
+
+        Returns:
+            Dict with 'answer' and 'references' keys.
+        """
+        return asyncio.run(
+            self.agenerate_answer(question, context_chunks, provider)
+        )
+
+    async def agenerate_answer(
+        self,
+        question: str,
+        context_chunks: list[dict],
+        provider: str | None = None,
     ) -> dict:
         """
         Generate an answer using available LLM providers with fallback.
@@ -176,64 +495,366 @@ class LLMService:
             Dict with 'answer' and 'references' keys.
         """
         if not context_chunks:
+            return {"answer": NO_CONTEXT_ANSWER, "references": []}
+
+        providers = self._select_providers(provider)
+        context = self._assemble(context_chunks)
+        user_prompt = _build_user_prompt(question, context)
+        references = [c["text"] for c in context_chunks]
+
+        def result(answer: str) -> dict:
             return {
-                "answer": (
-                    "No relevant documents found to answer this question. "
-                    "Please upload relevant documents first."
-                ),
-                "references": [],
+                "answer": answer,
+                "references": references,
+                "context": context.summary(),
             }
 
-        if not self._providers:
-            raise RuntimeError(
-                "No LLM providers configured. "
-                "Set GEMINI_API_KEY or OPENAI_API_KEY in .env"
-            )
+        if settings.llm_hedge_enabled and len(providers) > 1:
+            return result(await self._ahedged(providers, user_prompt))
 
-        # Determine which providers to try
-        if provider:
-            providers = [
-                p for p in self._providers if p.name == provider
-            ]
-            if not providers:
-                raise RuntimeError(
-                    f"Provider '{provider}' is not available. "
-                    f"Check that its API key is set in .env"
-                )
-        else:
-            providers = self._providers
+        last_error = None
+        for llm in providers:
+            if not self._admit(llm):
+                last_error = CircuitOpenError(f"{llm.name} circuit open")
+                continue
+            try:
+                logger.info(f"Trying LLM provider: {llm.name}")
+                answer = await self._atimed(llm, user_prompt)
+                logger.info(f"Answer generated via {llm.name}")
+                return result(answer)
 
-        # Build prompt
-        context = _build_context(context_chunks)
-        user_prompt = USER_PROMPT_TEMPLATE.format(
-            context=context, question=question
+            except Exception as e:
+                logger.warning(f"Provider {llm.name} failed: {e}")
+                last_error = e
+
+        raise RuntimeError(
+            f"All LLM providers failed. Last error: {last_error}"
         )
 
-        # Try each provider with fallback
-        last_error = None
-        for provider in providers:
+    async def _atimed(self, llm: LLMProvider, user_prompt: str) -> str:
+        """
+        Call a provider, recording its outcome and latency.
+
+        Waits for the provider's rate limiter first and retries 429s with
+        backoff. RateLimitExceeded (quota too far out) propagates without
+        counting against the circuit breaker.
+        """
+        limiter = self._limiter(llm)
+        tokens = estimate_tokens(SYSTEM_PROMPT, user_prompt)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            start = time.perf_counter()
             try:
-                logger.info(
-                    f"Trying LLM provider: {provider.name}"
+                with timing.span("llm", llm.name):
+                    answer = await llm.agenerate(SYSTEM_PROMPT, user_prompt)
+            except Exception as e:
+                delay = self._retry_delay(llm, e, attempt)
+                if delay is None:
+                    self._record_failure(llm)
+                    raise
+                with timing.span("backoff", llm.name):
+                    await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._record_success(llm, time.perf_counter() - start)
+            return answer
+
+    def _retry_delay(
+        self, llm: LLMProvider, error: Exception, attempt: int
+    ) -> float | None:
+        """Backoff before retrying a 429, or None if it shouldn't be."""
+        if (
+            not is_rate_limit_error(error)
+            or attempt >= settings.llm_retry_max_attempts
+        ):
+            return None
+        delay = backoff_delay(attempt, error)
+        self._limiter(llm).record_retry()
+        logger.warning(
+            f"Provider {llm.name} rate limited, retrying in {delay:.2f}s "
+            f"(attempt {attempt + 1}/{settings.llm_retry_max_attempts})"
+        )
+        return delay
+
+    def _record_success(self, llm: LLMProvider, seconds: float) -> None:
+        self._tracker(llm.name).record(seconds)
+        self._breaker(llm.name).record_success(seconds)
+        LLM_SECONDS.labels(provider=llm.name).observe(seconds)
+
+    def _record_failure(self, llm: LLMProvider) -> None:
+        self._breaker(llm.name).record_failure()
+        LLM_ERRORS.labels(provider=llm.name).inc()
+
+    async def _ahedged(
+        self, providers: list[LLMProvider], user_prompt: str
+    ) -> str:
+        """
+        Race providers in priority order, taking the first answer.
+
+        The next provider is started when the latest one fails or has been
+        running longer than its hedge delay; losers are cancelled.
+        """
+        tasks: dict[asyncio.Task, LLMProvider] = {}
+        started: dict[asyncio.Task, float] = {}
+        remaining = list(providers)
+        last_error = None
+
+        def launch() -> LLMProvider | None:
+            # Skip providers whose circuit is open
+            while remaining:
+                llm = remaining.pop(0)
+                if self._admit(llm):
+                    logger.info(f"Trying LLM provider: {llm.name}")
+                    task = asyncio.create_task(self._atimed(llm, user_prompt))
+                    tasks[task] = llm
+                    started[task] = time.perf_counter()
+                    return llm
+            return None
+
+        primary = current = launch()
+        try:
+            while tasks:
+                delay = self.hedge_delay(current.name) if remaining else None
+                done, _ = await asyncio.wait(
+                    tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED
                 )
-                answer = provider.generate(SYSTEM_PROMPT, user_prompt)
-                references = [c["text"] for c in context_chunks]
 
-                logger.info(
-                    f"Answer generated via {provider.name}"
+                if not done:
+                    hedge = launch()
+                    if hedge is not None:
+                        self._hedges_fired += 1
+                        logger.info(
+                            f"Provider {current.name} exceeded {delay:.2f}s, "
+                            f"hedging with {hedge.name}"
+                        )
+                        current = hedge
+                    continue
+
+                for task in done:
+                    llm = tasks.pop(task)
+                    if task.exception() is None:
+                        if llm is not primary:
+                            self._hedges_won += 1
+                        logger.info(f"Answer generated via {llm.name}")
+                        return task.result()
+                    logger.warning(
+                        f"Provider {llm.name} failed: {task.exception()}"
+                    )
+                    last_error = task.exception()
+
+                # Fall back immediately instead of waiting out the delay
+                if not tasks:
+                    current = launch()
+        finally:
+            for task, llm in tasks.items():
+                task.cancel()
+                # The loser would have taken at least this long; without
+                # the sample, hedged-away slow calls would drag the
+                # percentile, and so the hedge delay, ever lower
+                self._tracker(llm.name).record(
+                    time.perf_counter() - started[task]
                 )
-                return {
-                    "answer": answer,
-                    "references": references,
+
+        if last_error is None:
+            last_error = CircuitOpenError("all provider circuits open")
+        raise RuntimeError(
+            f"All LLM providers failed. Last error: {last_error}"
+        )
+
+    def _tracker(self, name: str) -> LatencyTracker:
+        if name not in self._latency:
+            self._latency[name] = LatencyTracker(settings.llm_hedge_window)
+        return self._latency[name]
+
+    def hedge_delay(self, name: str) -> float:
+        """
+        Seconds to wait on a provider before hedging with the next one.
+
+        Uses the provider's observed latency percentile once enough samples
+        exist, otherwise the configured default.
+        """
+        tracker = self._tracker(name)
+        if len(tracker) < settings.llm_hedge_min_samples:
+            return settings.llm_hedge_default_delay_ms / 1000
+        delay = tracker.percentile(settings.llm_hedge_percentile)
+        return max(delay, settings.llm_hedge_min_delay_ms / 1000)
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(name)
+        return self._breakers[name]
+
+    def _admit(self, llm: LLMProvider) -> bool:
+        """Whether the provider's circuit lets a call through now."""
+        if not settings.llm_breaker_enabled:
+            return True
+        if self._breaker(llm.name).allow():
+            return True
+        logger.info(f"Skipping LLM provider {llm.name}: circuit open")
+        return False
+
+    def _limiter(self, llm: LLMProvider) -> ProviderRateLimiter:
+        if llm.name not in self._limiters:
+            rpm, tpm = llm.rate_limits()
+            self._limiters[llm.name] = ProviderRateLimiter(llm.name, rpm, tpm)
+        return self._limiters[llm.name]
+
+    def rate_limit_stats(self) -> dict:
+        """Quota headroom, throttling and retry counters per provider."""
+        return {p.name: self._limiter(p).stats() for p in self._providers}
+
+    def provider_health(self) -> dict:
+        """Circuit state and health score for each configured provider."""
+        return {
+            p.name: self._breaker(p.name).stats() for p in self._providers
+        }
+
+    def latency_stats(self) -> dict:
+        """Per-provider latency percentiles and hedging counters."""
+        return {
+            "providers": {
+                name: tracker.stats()
+                for name, tracker in self._latency.items()
+            },
+            "hedges_fired": self._hedges_fired,
+            "hedges_won": self._hedges_won,
+        }
+
+    async def astream_answer(
+        self,
+        question: str,
+        context_chunks: list[dict],
+        provider: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream an answer as events, references first.
+
+        Falls back to the next provider only if one fails before emitting
+        any token; once text has been streamed, errors are raised.
+
+        Args:
+            question: User's question.
+            context_chunks: Retrieved chunks from vector store.
+            provider: Optional provider name ('gemini' or 'openai').
+
+        Yields:
+            Dicts with 'event' ('references', 'token' or 'done') and 'data'.
+        """
+        references = [c["text"] for c in context_chunks]
+        yield {"event": "references", "data": {"references": references}}
+
+        if not context_chunks:
+            yield {"event": "token", "data": {"text": NO_CONTEXT_ANSWER}}
+            yield {"event": "done", "data": {"provider": None}}
+            return
+
+        providers = self._select_providers(provider)
+        context = self._assemble(context_chunks)
+        user_prompt = _build_user_prompt(question, context)
+        tokens = estimate_tokens(SYSTEM_PROMPT, user_prompt)
+
+        last_error = None
+        for llm in providers:
+            if not self._admit(llm):
+                last_error = CircuitOpenError(f"{llm.name} circuit open")
+                continue
+            started = False
+            attempt = 0
+            try:
+                logger.info(f"Streaming from LLM provider: {llm.name}")
+                while not started:
+                    await self._limiter(llm).acquire(tokens)
+                    start = time.perf_counter()
+                    try:
+                        async for text in llm.astream(
+                            SYSTEM_PROMPT, user_prompt
+                        ):
+                            if not started:
+                                # Time to first token is the latency
+                                started = True
+                                self._record_success(
+                                    llm, time.perf_counter() - start
+                                )
+                            yield {"event": "token", "data": {"text": text}}
+                    except Exception as e:
+                        # Only retry 429s that arrive before any text
+                        delay = (
+                            None
+                            if started
+                            else self._retry_delay(llm, e, attempt)
+                        )
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+                        attempt += 1
+                    else:
+                        started = True
+                logger.info(f"Answer streamed via {llm.name}")
+                yield {
+                    "event": "done",
+                    "data": {
+                        "provider": llm.name,
+                        "context": context.summary(),
+                    },
                 }
+                return
+
+            except RateLimitExceeded as e:
+                logger.warning(f"Provider {llm.name} skipped: {e}")
+                last_error = e
 
             except Exception as e:
-                logger.warning(
-                    f"Provider {provider.name} failed: {e}"
-                )
+                self._record_failure(llm)
+                if started:
+                    raise
+                logger.warning(f"Provider {llm.name} failed: {e}")
                 last_error = e
-                continue
 
         raise RuntimeError(
             f"All LLM providers failed. Last error: {last_error}"
         )
+
+    def _assemble(self, context_chunks: list[dict]) -> AssembledContext:
+        """Build the prompt context, tracking the tokens it saved."""
+        with timing.span("context"):
+            context = assemble_context(context_chunks)
+        self._context_requests += 1
+        self._context_tokens += context.tokens
+        self._context_tokens_saved += context.tokens_saved
+        CONTEXT_TOKENS.labels(kind="sent").inc(context.tokens)
+        CONTEXT_TOKENS.labels(kind="saved").inc(context.tokens_saved)
+        logger.info(
+            f"Context: {context.tokens} tokens from {len(context_chunks)} "
+            f"chunks ({context.tokens_saved} saved, "
+            f"{context.chunks_merged} merged, "
+            f"{context.duplicates_dropped} duplicates dropped)"
+        )
+        return context
+
+    def context_stats(self) -> dict:
+        """Prompt context tokens sent and saved by assembly, in total."""
+        return {
+            "requests": self._context_requests,
+            "tokens": self._context_tokens,
+            "tokens_saved": self._context_tokens_saved,
+        }
+
+    def _select_providers(self, provider: str | None) -> list[LLMProvider]:
+        """Providers to try, in order, for an optional requested name."""
+        if not self._providers:
+            raise RuntimeError(
+                "No LLM providers configured. "
+                "Set GEMINI_API_KEY or OPENAI_API_KEY in .env"
+            )
+
+        if not provider:
+            return self._providers
+
+        providers = [p for p in self._providers if p.name == provider]
+        if not providers:
+            raise RuntimeError(
+                f"Provider '{provider}' is not available. "
+                f"Check that its API key is set in .env"
+            )
+        return providers
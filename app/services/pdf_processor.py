@@ -12,6 +12,7 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from loguru import logger
 
 from app.config import settings
+from app.services.metrics import stage_timer
 
 
 @dataclass
@@ -39,6 +40,7 @@ class PDFProcessor:
             separators=["\n\n", "\n", ". ", " ", ""],
         )
 
+    @stage_timer("pdf_extract")
     def extract_text_from_pdf(
         self, file_content: bytes, filename: str
     ) -> list[dict]:
@@ -79,6 +81,7 @@ class PDFProcessor:
 
         return pages
 
+    @stage_timer("chunk")
     def chunk_text(self, pages: list[dict]) -> list[DocumentChunk]:
         """
         Split extracted pages into smaller chunks for embedding.
@@ -110,6 +113,36 @@ class PDFProcessor:
         )
         return chunks
 
+    def split_pages(
+        self,
+        pages: list[dict],
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+    ) -> list[DocumentChunk]:
+        """
+        Chunk extracted pages, optionally with custom chunking parameters.
+
+        Args:
+            pages: List of page dicts from extract_text_from_pdf.
+            chunk_size: Optional override for chunk size.
+            chunk_overlap: Optional override for chunk overlap.
+
+        Returns:
+            List of DocumentChunk objects.
+        """
+        if chunk_size is None and chunk_overlap is None:
+            return self.chunk_text(pages)
+
+        # Custom chunking parameters use a temporary processor
+        size = chunk_size if chunk_size is not None else self.chunk_size
+        overlap = (
+            chunk_overlap if chunk_overlap is not None else self.chunk_overlap
+        )
+        logger.info(f"Using custom chunking: size={size}, overlap={overlap}")
+        return PDFProcessor(chunk_size=size, chunk_overlap=overlap).chunk_text(
+            pages
+        )
+
     def process_pdf(
         self,
         file_content: bytes,
@@ -130,38 +163,6 @@ class PDFProcessor:
             List of DocumentChunk objects ready for embedding.
         """
         pages = self.extract_text_from_pdf(file_content, filename)
-
-        # If custom chunking parameters are provided, use a temporary splitter
-        if chunk_size is not None or chunk_overlap is not None:
-            size = chunk_size if chunk_size is not None else self.chunk_size
-            overlap = (
-                chunk_overlap
-                if chunk_overlap is not None
-                else self.chunk_overlap
-            )
-            logger.info(
-                f"Using custom chunking: size={size}, overlap={overlap}"
-            )
-            temp_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=size,
-                chunk_overlap=overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""],
-            )
-            chunks = []
-            for page_data in pages:
-                text = page_data["text"]
-                page_chunks = temp_splitter.split_text(text)
-                for i, chunk_text in enumerate(page_chunks):
-                    chunk = DocumentChunk(
-                        text=chunk_text,
-                        metadata={
-                            "source": page_data["source"],
-                            "page": page_data["page"],
-                            "chunk_index": i,
-                        },
-                    )
-                    chunks.append(chunk)
-            return chunks
-
-        return self.chunk_text(pages)
+        return self.split_pages(
+            pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
@@ -0,0 +1,149 @@
+"""
+On-demand request profiling.
+A profiled request runs its blocking work (PDF parsing, chunking,
+embedding, FAISS search) under cProfile on whichever worker threads it
+lands on; the merged profile is written to disk for later download.
+"""
+
+import cProfile
+import io
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable
+
+from loguru import logger
+
+from app.config import settings
+
+_active: ContextVar["RequestProfile | None"] = ContextVar(
+    "request_profile", default=None
+)
+
+
+class RequestProfile:
+    """cProfile runs collected from the threads that served one request."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started_at = time.time()
+        self._profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active cProfile per process
+            logger.warning(f"Skipping profiling of {fn.__name__}: {e}")
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def save(self) -> str | None:
+        """
+        Merge the collected runs into one pstats file.
+
+        Returns:
+            The profile ID, or None if no work was profiled (e.g. the
+            request was answered from a cache).
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+
+        directory = Path(settings.profiling_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^a-z0-9]+", "-", self.label.lower()).strip("-")
+        profile_id = (
+            f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(self.started_at))}"
+            f"-{slug}-{uuid.uuid4().hex[:8]}"
+        )
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(directory / f"{profile_id}.prof")
+        _prune(directory)
+        logger.info(f"Saved profile {profile_id} ({len(profiles)} runs)")
+        return profile_id
+
+
+@contextmanager
+def profiled(label: str):
+    """Profile blocking work started from this context (see call)."""
+    profile = RequestProfile(label)
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+
+
+def call(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call fn, under the current request's profiler if there is one."""
+    profile = _active.get()
+    if profile is None:
+        return fn(*args, **kwargs)
+    return profile.run(fn, *args, **kwargs)
+
+
+def _prune(directory: Path) -> None:
+    """Keep only the newest ``profiling_max_profiles`` files."""
+    files = sorted(
+        directory.glob("*.prof"), key=lambda p: p.stat().st_mtime
+    )
+    for path in files[: max(0, len(files) - settings.profiling_max_profiles)]:
+        path.unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Stored profiles, newest first."""
+    directory = Path(settings.profiling_dir)
+    if not directory.exists():
+        return []
+    files = sorted(
+        directory.glob("*.prof"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    return [
+        {
+            "id": path.stem,
+            "created_at": path.stat().st_mtime,
+            "size_bytes": path.stat().st_size,
+        }
+        for path in files
+    ]
+
+
+def profile_path(profile_id: str) -> Path | None:
+    """File of a stored profile, or None if unknown."""
+    # IDs are generated file stems; reject anything else (e.g. "../")
+    if not re.fullmatch(r"[A-Za-z0-9-]+", profile_id):
+        return None
+    path = Path(settings.profiling_dir) / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def render_profile(
+    profile_id: str, sort: str = "cumulative", limit: int = 50
+) -> str | None:
+    """Top functions of a stored profile as pstats text."""
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
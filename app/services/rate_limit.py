@@ -0,0 +1,176 @@
+"""
+Client-side rate limiting and retry backoff for LLM providers.
+Token buckets keep request and token throughput under each provider's
+quota; quota errors that still slip through are retried with jittered
+exponential backoff.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+from app.config import settings
+from app.services import timing
+from app.services.context import count_tokens
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a call would have to wait longer than allowed."""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute`` tokens a minute.
+
+    Callers reserve tokens up front and sleep for the returned delay, so
+    concurrent callers queue fairly instead of polling. A bucket with a
+    non-positive rate never limits.
+    """
+
+    def __init__(self, per_minute: float, burst: float | None = None):
+        self.per_minute = per_minute
+        self._rate = per_minute / 60.0
+        self._capacity = burst or per_minute
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float, max_wait: float) -> float | None:
+        """
+        Reserve tokens.
+
+        Returns:
+            Seconds to wait before using them, or None (nothing reserved)
+            if that would exceed ``max_wait``.
+        """
+        if self._rate <= 0:
+            return 0.0
+        amount = min(amount, self._capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._updated) * self._rate,
+            )
+            self._updated = now
+            wait = max(0.0, (amount - self._tokens) / self._rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def refund(self, amount: float) -> None:
+        if self._rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self._capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return min(self._capacity, self._tokens + elapsed * self._rate)
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider."""
+
+    def __init__(self, name: str, rpm: float, tpm: float):
+        self.name = name
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._throttled = 0
+        self._throttle_seconds = 0.0
+        self._rejected = 0
+        self._retries = 0
+
+    def _reserve(self, tokens: int) -> float:
+        max_wait = settings.llm_rate_limit_max_wait_seconds
+        request_wait = self._requests.reserve(1, max_wait)
+        if request_wait is None:
+            self._rejected += 1
+            raise RateLimitExceeded(f"{self.name} request quota exhausted")
+        token_wait = self._tokens.reserve(tokens, max_wait)
+        if token_wait is None:
+            self._requests.refund(1)
+            self._rejected += 1
+            raise RateLimitExceeded(f"{self.name} token quota exhausted")
+        wait = max(request_wait, token_wait)
+        if wait > 0:
+            self._throttled += 1
+            self._throttle_seconds += wait
+        return wait
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait until a call of roughly ``tokens`` tokens fits the quota.
+
+        Raises:
+            RateLimitExceeded: If that would take longer than
+                ``llm_rate_limit_max_wait_seconds``.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            with timing.span("rate_limit", self.name):
+                await asyncio.sleep(wait)
+
+    def record_retry(self) -> None:
+        self._retries += 1
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self._requests.per_minute,
+            "tpm": self._tokens.per_minute,
+            "requests_available": round(self._requests.available, 1),
+            "tokens_available": round(self._tokens.available),
+            "throttled": self._throttled,
+            "throttle_seconds": round(self._throttle_seconds, 3),
+            "rejected": self._rejected,
+            "retries": self._retries,
+        }
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Tokens a call may consume: its prompt plus the completion limit."""
+    return sum(count_tokens(text) for text in texts) + settings.llm_max_tokens
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Whether a provider exception is a quota/429 response.
+
+    Looks at the status the SDK exceptions carry (``status_code`` on
+    OpenAI and httpx responses, ``code``/``status`` on Gemini), never at
+    the message text.
+    """
+    response = getattr(error, "response", None)
+    for source in (error, response):
+        for attr in ("status_code", "code", "status"):
+            if getattr(source, attr, None) in (429, "RESOURCE_EXHAUSTED"):
+                return True
+    return False
+
+
+def backoff_delay(attempt: int, error: Exception | None = None) -> float:
+    """
+    Delay before retry number ``attempt`` (0-based).
+
+    Honours a Retry-After header when the error carries one, otherwise
+    uses full-jitter exponential backoff.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after") if headers else None
+    if retry_after is not None:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            pass
+        else:
+            return min(delay, settings.llm_retry_max_delay_seconds)
+    ceiling = min(
+        settings.llm_retry_max_delay_seconds,
+        settings.llm_retry_base_delay_seconds * 2**attempt,
+    )
+    return random.uniform(0, ceiling)
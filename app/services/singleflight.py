@@ -0,0 +1,52 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight computation
+instead of each repeating it.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key.
+
+    The first caller for a key starts the computation as its own task;
+    callers arriving while it runs await the same task and receive the same
+    result or exception. The task is shielded, so one caller disconnecting
+    doesn't cancel it for the others. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return ``await fn()``, sharing it with concurrent same-key calls."""
+        self._calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self._calls,
+            "coalesced": self._coalesced,
+        }
@@ -0,0 +1,101 @@
+"""
+Chunk text store.
+Keeps chunk texts on disk in append-only, offset-addressed files (one per
+source document) that are memory-mapped for reads, so only the texts of
+returned hits are ever paged in.
+"""
+
+import hashlib
+import mmap
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+
+
+class ChunkTextStore:
+    """
+    Append-only text files addressed by ``[offset, length]`` references.
+
+    Texts are grouped into one file per source document, so deleting a
+    document reclaims its space by unlinking a single file and no
+    compaction is ever needed.
+    """
+
+    def __init__(self, root: Path, max_open_maps: int = 64):
+        self._root = Path(root)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._max_open_maps = max_open_maps
+        self._maps: OrderedDict[Path, mmap.mmap] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, source: str | None) -> Path:
+        if not source:
+            return self._root / "_.bin"
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        return self._root / f"{digest}.bin"
+
+    def append(self, source: str | None, texts: list[str]) -> list[list[int]]:
+        """
+        Durably append texts for one source document.
+
+        Returns:
+            ``[offset, length]`` reference for each text, in order.
+        """
+        encoded = [text.encode("utf-8") for text in texts]
+        path = self._path(source)
+        with self._lock, open(path, "ab") as f:
+            offset = f.tell()
+            refs = []
+            for data in encoded:
+                refs.append([offset, len(data)])
+                offset += len(data)
+            f.write(b"".join(encoded))
+            f.flush()
+            os.fsync(f.fileno())
+        return refs
+
+    def read(self, source: str | None, ref: list[int]) -> str:
+        """Read a single text by reference."""
+        offset, length = ref
+        path = self._path(source)
+        with self._lock:
+            mapped = self._maps.get(path)
+            if mapped is None or offset + length > len(mapped):
+                # Map (or remap after appends) on demand
+                if mapped is not None:
+                    mapped.close()
+                with open(path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[path] = mapped
+                while len(self._maps) > self._max_open_maps:
+                    self._maps.popitem(last=False)[1].close()
+            self._maps.move_to_end(path)
+            return mapped[offset : offset + length].decode("utf-8")
+
+    def drop(self, source: str | None) -> None:
+        """Delete every text stored for a source document."""
+        path = self._path(source)
+        with self._lock:
+            mapped = self._maps.pop(path, None)
+            if mapped is not None:
+                mapped.close()
+            path.unlink(missing_ok=True)
+        logger.debug(f"Dropped chunk texts for '{source}'")
+
+    def clear(self) -> None:
+        """Delete all stored texts."""
+        self.close()
+        with self._lock:
+            shutil.rmtree(self._root, ignore_errors=True)
+            self._root.mkdir(parents=True, exist_ok=True)
+
+    def close(self) -> None:
+        """Unmap all open files."""
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
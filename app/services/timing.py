@@ -0,0 +1,120 @@
+"""
+Request-scoped timing spans.
+Code on the request path records named spans into the timings of the
+request it runs for; routes turn them into a Server-Timing header and an
+optional debug breakdown. Outside a request recording is a no-op.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+_current: ContextVar["RequestTimings | None"] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@dataclass
+class Span:
+    """One timed step; ``description`` may be set while it runs."""
+
+    name: str
+    description: str | None = None
+    duration_ms: float = 0.0
+
+
+class RequestTimings:
+    """Spans recorded while serving one request, in completion order."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def add(
+        self, name: str, seconds: float, description: str | None = None
+    ) -> None:
+        self.spans.append(
+            Span(name, description, round(seconds * 1000, 3))
+        )
+
+    def totals(self) -> dict[str, float]:
+        """Milliseconds per span name, summed over repeats."""
+        totals: dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = round(
+                totals.get(span.name, 0.0) + span.duration_ms, 3
+            )
+        return totals
+
+    def as_list(self) -> list[dict]:
+        return [asdict(s) for s in self.spans]
+
+    def header(self) -> str:
+        """Spans formatted as a Server-Timing header value."""
+        return server_timing(
+            (s.name, s.duration_ms, s.description) for s in self.spans
+        )
+
+
+def server_timing(entries) -> str:
+    """Format ``(name, ms, description)`` entries as Server-Timing."""
+    parts = []
+    for name, duration_ms, description in entries:
+        part = f"{name};dur={duration_ms:.1f}"
+        if description:
+            escaped = description.replace("\\", "").replace('"', "'")
+            part += f';desc="{escaped}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+@contextmanager
+def collect():
+    """Record spans from this context (and tasks/threads it starts)."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record(
+    name: str, seconds: float, description: str | None = None
+) -> None:
+    """Add a span measured elsewhere to the current request, if any."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, description)
+
+
+@contextmanager
+def span(name: str, description: str | None = None):
+    """
+    Time the block as a span of the current request.
+
+    Failures are noted in the description, e.g. ``"gemini RuntimeError"``.
+    """
+    timings = _current.get()
+    current = Span(name, description)
+    if timings is None:
+        yield current
+        return
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        outcome = (
+            "cancelled"
+            if isinstance(e, asyncio.CancelledError)
+            else type(e).__name__
+        )
+        current.description = " ".join(
+            filter(None, [current.description, outcome])
+        )
+        raise
+    finally:
+        timings.add(
+            current.name, time.perf_counter() - start, current.description
+        )
@@ -1,75 +1,728 @@
 """
 Vector store service.
 Manages FAISS index for storing and retrieving document embeddings.
-Uses a persistent JSON metadata store alongside the FAISS index.
+Chunk metadata lives in a memory-mapped document store alongside the FAISS
+index, with an optional append-only write-ahead log so ingests don't
+rewrite snapshots.
 """
 
+import copy
 import json
+import os
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable
 
 import faiss
 import numpy as np
 from loguru import logger
 
 from app.config import settings
+from app.services.document_store import (
+    MappedDocumentStore,
+    SQLiteDocumentStore,
+    create_document_store,
+)
+from app.services.cache import LRUCache, normalize_question
 from app.services.embeddings import EmbeddingService
+from app.services.metrics import CHUNKS_INDEXED, stage_timer
+from app.services.text_store import ChunkTextStore
+from app.services.wal import WriteAheadLog
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq")
+
+
+def build_index(index_type: str, vectors: np.ndarray) -> faiss.IndexIDMap2:
+    """
+    Create an empty ID-mapped index of the given type, trained if needed.
+
+    Args:
+        index_type: One of INDEX_TYPES.
+        vectors: Normalized float32 vectors used for training (IVF types).
+
+    Returns:
+        Index ready for ``add_with_ids``.
+    """
+    dimension = vectors.shape[1]
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "flat":
+        base = faiss.IndexFlatIP(dimension)
+    elif index_type == "hnsw":
+        base = faiss.index_factory(dimension, f"HNSW{settings.hnsw_m}", metric)
+        base.hnsw.efConstruction = settings.hnsw_ef_construction
+    elif index_type in ("ivf", "ivfpq"):
+        # Keep ~39+ training points per centroid, as FAISS recommends
+        nlist = max(1, min(settings.ivf_nlist, len(vectors) // 39))
+        encoding = (
+            f"PQ{settings.ivfpq_m}x{settings.ivfpq_nbits}"
+            if index_type == "ivfpq"
+            else "Flat"
+        )
+        base = faiss.index_factory(
+            dimension, f"IVF{nlist},{encoding}", metric
+        )
+        base.train(vectors)
+        # Lets IndexIDMap2.reconstruct look vectors up by internal ID
+        base.make_direct_map()
+    else:
+        raise ValueError(
+            f"Unknown vector index type '{index_type}'. "
+            f"Expected one of {INDEX_TYPES}"
+        )
+    return faiss.IndexIDMap2(base)
+
+
+class _ReadWriteLock:
+    """
+    Shared lock for searches, exclusive for in-place index mutations.
+
+    Waiting writers block new readers, so a steady stream of searches
+    can't starve an ingest.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
 
 
 class VectorStoreService:
     """Manages document embeddings using FAISS."""
 
-    def __init__(self):
-        self.embedding_service = EmbeddingService()
-        self._index: faiss.IndexFlatIP | None = None
-        self._documents: list[dict] = []
-        self._persist_dir = Path(settings.chroma_persist_dir)
+    def __init__(
+        self,
+        persist_dir: str | Path | None = None,
+        embedding_service: EmbeddingService | None = None,
+    ):
+        self.embedding_service = embedding_service or EmbeddingService()
+        # Vectors are stored under stable int64 IDs so chunks can be
+        # removed individually without rebuilding the index.
+        self._index: faiss.IndexIDMap2 | None = None
+        self._index_mmapped = False
+        self._next_id = 0
+        # HNSW can't remove vectors; deleted IDs are masked out at search
+        self._tombstones: set[int] = set()
+        self._tombstone_selector: faiss.IDSelector | None = None
+        self._persist_dir = Path(persist_dir or settings.chroma_persist_dir)
         self._persist_dir.mkdir(parents=True, exist_ok=True)
         self._index_path = self._persist_dir / "faiss.index"
-        self._meta_path = self._persist_dir / "metadata.json"
+        self._legacy_meta_path = self._persist_dir / "metadata.json"
+        # Present only while the index and metadata on disk are exactly
+        # the last checkpoint, so loads can skip the reconcile scan
+        self._marker_path = self._persist_dir / "checkpoint.json"
+        self._mutations = 0
+        self._documents = create_document_store(self._persist_dir)
+        self._texts = ChunkTextStore(self._persist_dir / "texts")
+        self.load_stats: dict = {}
+        # Bumped on every content change so caches can tell stale entries
+        self.generation = 0
+        self._query_cache = LRUCache(
+            settings.query_cache_max_entries, settings.query_cache_ttl_seconds
+        )
+
+        # _checkpoint_lock is always acquired before _lock, and _lock
+        # before _index_rw. Searches run under _index_rw alone; code that
+        # mutates self._index in place also takes it for writing.
+        self._lock = threading.RLock()
+        self._index_rw = _ReadWriteLock()
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint_seq = 0
+        self._wal: WriteAheadLog | None = None
+        if settings.vector_store_persistence == "wal":
+            self._wal = WriteAheadLog(self._persist_dir / "wal")
+        self._rebuilder: threading.Thread | None = None
+
         self._load()
 
+        self._stop_event = threading.Event()
+        self._checkpoint_wake = threading.Event()
+        self._checkpointer: threading.Thread | None = None
+        if self._wal is not None:
+            self._checkpointer = threading.Thread(
+                target=self._checkpoint_loop,
+                name="vector-store-checkpointer",
+                daemon=True,
+            )
+            self._checkpointer.start()
+
+        with self._lock:
+            self._maybe_promote()
+
+    # ── Persistence ─────────────────────────────────────────────────────
+
     def _load(self):
-        """Load persisted index and metadata from disk."""
-        if self._index_path.exists() and self._meta_path.exists():
+        """Load the persisted snapshot, then replay the WAL on top of it."""
+        self._clear_state()
+        stats = {}
+        started = time.perf_counter()
+
+        if self._index_path.exists() and self._has_metadata():
             try:
-                self._index = faiss.read_index(str(self._index_path))
-                with open(self._meta_path, "r") as f:
-                    self._documents = json.load(f)
+                # Memory-mapped indexes are read-only until first write
+                io_flags = (
+                    faiss.IO_FLAG_MMAP_IFC if settings.vector_store_mmap else 0
+                )
+                index = faiss.read_index(str(self._index_path), io_flags)
+                self._index_mmapped = bool(io_flags)
+                stats["index_load_ms"] = self._elapsed_ms(started)
+
+                started = time.perf_counter()
+                self._load_metadata(index)
+                stats["metadata_load_ms"] = self._elapsed_ms(started)
+
+                if not isinstance(index, faiss.IndexIDMap2):
+                    index = self._migrate_legacy(index)
+                    self._index_mmapped = False
+
+                self._index = index
                 logger.info(
                     f"Loaded FAISS index with {self._index.ntotal} vectors"
                 )
             except Exception as e:
                 logger.warning(f"Failed to load persisted index: {e}")
-                self._index = None
-                self._documents = []
+                self._clear_state()
+                self._documents.close()
+                self._documents = create_document_store(self._persist_dir)
+
+        if self._wal is not None:
+            started = time.perf_counter()
+            stats["wal_records"] = self._replay_wal()
+            stats["wal_replay_ms"] = self._elapsed_ms(started)
+
+        marker = None if stats.get("wal_records") else self._read_marker()
+        if marker is None:
+            self._reconcile()
         else:
-            self._index = None
-            self._documents = []
+            self._next_id = marker["next_id"]
+        stats["reconciled"] = marker is None
+        stats["vectors"] = self._index.ntotal if self._index else 0
+        stats["mmap"] = self._index_mmapped
+        self.load_stats = stats
+
+    def _has_metadata(self) -> bool:
+        return (
+            self._documents.exists()
+            or MappedDocumentStore(self._persist_dir).exists()
+            or self._legacy_meta_path.exists()
+        )
+
+    def _load_metadata(self, index: faiss.Index):
+        """Open the metadata snapshot, importing older formats if needed."""
+        if self._documents.exists():
+            self._checkpoint_seq = self._documents.load()
+            return
+
+        mapped = MappedDocumentStore(self._persist_dir)
+        if isinstance(self._documents, SQLiteDocumentStore) and mapped.exists():
+            self._checkpoint_seq = mapped.load()
+            ids = mapped.ids()
+            for start in range(0, len(ids), 10_000):
+                batch = ids[start : start + 10_000].tolist()
+                self._register(list(mapped.get_many(batch).values()))
+            self._documents.write(self._checkpoint_seq)
+            mapped.clear()
+            logger.info(f"Imported {len(ids)} chunk records into SQLite")
+            return
+
+        self._load_legacy_metadata(index)
+
+    def _read_marker(self) -> dict | None:
+        """The checkpoint marker, if it matches the loaded snapshot."""
+        if self._index is None:
+            return None
+        try:
+            marker = json.loads(self._marker_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if (
+            marker.get("seq") != self._checkpoint_seq
+            or marker.get("vectors") != self._index.ntotal
+        ):
+            return None
+        return marker
+
+    def _mark_dirty(self):
+        """
+        Invalidate the checkpoint marker before changing persisted state.
+
+        Must be called while holding ``_lock``.
+        """
+        self._mutations += 1
+        self._marker_path.unlink(missing_ok=True)
+
+    def _reconcile(self):
+        """
+        Align index and metadata after recovery.
+
+        A crash between a metadata commit and the matching index change can
+        leave vectors without records (dropped) or records without vectors
+        (forgotten). Also makes sure new IDs never reuse a stored vector ID.
+        """
+        if self._index is None:
+            if len(self._documents):
+                logger.warning("Dropping chunk records with no index")
+                self._documents.clear()
+            self._next_id = 0
+            return
+        indexed = faiss.vector_to_array(self._index.id_map)
+        live = self._documents.ids()
+        orphans = np.setdiff1d(live, indexed)
+        if len(orphans):
+            self._documents.remove(orphans.tolist())
+            logger.warning(f"Dropped {len(orphans)} records without vectors")
+        stray = np.setdiff1d(indexed, live)
+        if len(stray):
+            self._drop_vectors(self._index, stray.tolist())
+        self._next_id = (
+            max(self._documents.max_id(), int(indexed.max(initial=-1))) + 1
+        )
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    def _load_legacy_metadata(self, index: faiss.Index):
+        """Import a pre-binary ``metadata.json`` snapshot."""
+        with open(self._legacy_meta_path, "r") as f:
+            snapshot = json.load(f)
+
+        # The oldest snapshots are a bare list addressed by index position
+        if isinstance(snapshot, list):
+            snapshot = {"wal_seq": 0, "documents": snapshot}
+        documents = snapshot["documents"]
+        if not isinstance(index, faiss.IndexIDMap2):
+            for position, doc in enumerate(documents):
+                doc["vector_id"] = position
+        self._register(documents)
+        self._checkpoint_seq = snapshot["wal_seq"]
+
+    def _replay_wal(self) -> int:
+        """Re-apply logged mutations newer than the loaded snapshot."""
+        indexed: set[int] | None = None
+        replayed = 0
+        for record in self._wal.replay(after_seq=self._checkpoint_seq):
+            if record.op == "add":
+                self._ensure_index(record.vectors.shape[1])
+                self._make_writable()
+                if indexed is None:
+                    indexed = set(
+                        faiss.vector_to_array(self._index.id_map).tolist()
+                    )
+                # A crash mid-checkpoint can leave vectors in the snapshot
+                # index that the metadata doesn't know about yet.
+                documents = record.payload["documents"]
+                fresh = [
+                    i
+                    for i, doc in enumerate(documents)
+                    if doc["vector_id"] not in indexed
+                ]
+                if fresh:
+                    ids = np.array(
+                        [documents[i]["vector_id"] for i in fresh],
+                        dtype=np.int64,
+                    )
+                    with self._index_rw.write():
+                        self._index.add_with_ids(record.vectors[fresh], ids)
+                    indexed.update(ids.tolist())
+                self._register(documents)
+            elif record.op == "delete":
+                removed = self._remove_ids(record.payload["vector_ids"])
+                if indexed is not None:
+                    indexed.difference_update(removed)
+            replayed += 1
+
+        if replayed:
+            logger.info(
+                f"Replayed {replayed} WAL records "
+                f"(now {self._index.ntotal if self._index else 0} vectors)"
+            )
+        return replayed
 
-    def _save(self):
-        """Persist index and metadata to disk."""
-        if self._index is not None:
-            faiss.write_index(self._index, str(self._index_path))
-            with open(self._meta_path, "w") as f:
-                json.dump(self._documents, f)
-            logger.debug("FAISS index persisted to disk")
+    def _migrate_legacy(self, index: faiss.Index) -> faiss.IndexIDMap2:
+        """
+        Wrap a positional (pre-ID) index in an ID map.
+
+        Older stores addressed chunks by their position in the index, so
+        the position becomes the vector ID. Stored vectors are reused as-is.
+        """
+        vectors = index.reconstruct_n(0, index.ntotal)
+        id_index = faiss.IndexIDMap2(faiss.IndexFlatIP(index.d))
+        id_index.add_with_ids(
+            vectors, np.arange(index.ntotal, dtype=np.int64)
+        )
+        logger.info(
+            f"Migrated legacy FAISS index ({index.ntotal} vectors) to ID map"
+        )
+        return id_index
+
+    def _persist(
+        self, op: str, payload: dict, vectors: np.ndarray | None = None
+    ):
+        """Record a mutation. Must be called while holding ``_lock``."""
+        if self._wal is None:
+            return
+        with stage_timer("wal_append"):
+            self._wal.append(op, payload, vectors)
+        if self._wal.size_bytes() > settings.wal_checkpoint_max_mb * 2**20:
+            self._checkpoint_wake.set()
+
+    @stage_timer("checkpoint")
+    def checkpoint(self):
+        """
+        Write a full snapshot and drop the WAL segments it covers.
+
+        The index is serialized under the store lock; file writes happen
+        outside it so queries and ingests aren't blocked on disk I/O.
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                if self._index is None:
+                    return
+                index_data = faiss.serialize_index(self._index)
+                documents = self._documents.freeze()
+                seq = self._wal.seq if self._wal else 0
+                segments = self._wal.rotate() if self._wal else []
+                mutations = self._mutations
+                marker = {
+                    "seq": seq,
+                    "vectors": self._index.ntotal,
+                    "next_id": self._next_id,
+                }
+                self._marker_path.unlink(missing_ok=True)
+
+            self._atomic_write(self._index_path, index_data.tobytes())
+            generation = documents.write(seq)
+            with self._lock:
+                self._documents.rebase(documents, generation)
+                # Changes made while writing aren't in this snapshot
+                if self._mutations == mutations:
+                    self._atomic_write(
+                        self._marker_path, json.dumps(marker).encode()
+                    )
+            self._legacy_meta_path.unlink(missing_ok=True)
+            if self._wal is not None:
+                self._wal.discard(segments)
+            self._checkpoint_seq = seq
+            logger.debug(f"FAISS index checkpointed to disk (seq={seq})")
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        """Write a file via a temporary sibling and an atomic rename."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _checkpoint_loop(self):
+        """Background thread: checkpoint periodically or when the WAL grows."""
+        while not self._stop_event.is_set():
+            self._checkpoint_wake.wait(settings.wal_checkpoint_interval_seconds)
+            self._checkpoint_wake.clear()
+            if self._stop_event.is_set():
+                break
+            if self._wal.seq > self._checkpoint_seq:
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    logger.error(f"Background checkpoint failed: {e}")
+
+    def close(self):
+        """Stop background checkpointing and flush pending WAL records."""
+        if self._rebuilder is not None:
+            self._rebuilder.join()
+        if self._checkpointer is not None:
+            self._stop_event.set()
+            self._checkpoint_wake.set()
+            self._checkpointer.join()
+            self._checkpointer = None
+        if self._wal is not None:
+            if self._wal.seq > self._checkpoint_seq:
+                self.checkpoint()
+            self._wal.close()
+        self._documents.close()
+        self._texts.close()
+
+    # ── Index bookkeeping ───────────────────────────────────────────────
+
+    def _clear_state(self):
+        self._index = None
+        self._index_mmapped = False
+        self._next_id = 0
+        self._tombstones = set()
+        self._tombstone_selector = None
+
+    def _register(self, documents: list[dict]):
+        """Track document records and advance the ID allocator."""
+        # Records from older formats carry their text inline
+        inline = [
+            doc
+            for doc in documents
+            if "text_ref" not in doc and doc["vector_id"] not in self._documents
+        ]
+        if inline:
+            documents = [doc for doc in documents if "text_ref" in doc]
+            for doc in inline:
+                doc = dict(doc)
+                text = doc.pop("text")
+                doc["text_ref"] = self._texts.append(
+                    doc["metadata"].get("source"), [text]
+                )[0]
+                documents.append(doc)
+        self._documents.add(documents)
+        for doc in documents:
+            self._next_id = max(self._next_id, doc["vector_id"] + 1)
+
+    def _append_texts(
+        self, texts: list[str], metadatas: list[dict]
+    ) -> list[list[int]]:
+        """Append chunk texts grouped by source; returns refs in input order."""
+        by_source: dict[str | None, list[int]] = {}
+        for position, meta in enumerate(metadatas):
+            by_source.setdefault(meta.get("source"), []).append(position)
+
+        refs: list[list[int]] = [None] * len(texts)
+        for source, positions in by_source.items():
+            source_refs = self._texts.append(
+                source, [texts[p] for p in positions]
+            )
+            for position, ref in zip(positions, source_refs):
+                refs[position] = ref
+        return refs
+
+    def _chunk_text(self, doc: dict) -> str:
+        """Read a record's text from disk (inline for pre-blob records)."""
+        if "text_ref" in doc:
+            source = doc["metadata"].get("source")
+            return self._texts.read(source, doc["text_ref"])
+        return doc["text"]
+
+    def _make_writable(self):
+        """Copy a memory-mapped index into owned memory before mutating it."""
+        if self._index_mmapped:
+            self._index = faiss.deserialize_index(
+                faiss.serialize_index(self._index)
+            )
+            self._index_mmapped = False
+            logger.debug("Materialized memory-mapped FAISS index")
+
+    def _remove_ids(self, vector_ids: list[int]) -> list[int]:
+        """Remove vectors and their metadata by ID; returns removed IDs."""
+        if self._index is None:
+            return []
+        removed = self._documents.remove(vector_ids)
+        if not removed:
+            return []
+        self._drop_vectors(self._index, removed)
+
+        if (
+            len(self._tombstones)
+            > settings.hnsw_compaction_ratio * self._index.ntotal
+        ):
+            self._start_rebuild("compaction")
+        return removed
+
+    def _drop_vectors(self, index: faiss.IndexIDMap2, vector_ids) -> None:
+        """
+        Remove vectors from an index, tombstoning them on ANN indexes.
+
+        HNSW can't remove vectors, and IVF removal leaves its internal IDs
+        out of step with IndexIDMap2's compacted id_map, so both filter
+        tombstoned IDs at search time until a compaction rebuild.
+        """
+        if not isinstance(
+            faiss.downcast_index(index.index), faiss.IndexFlat
+        ):
+            self._tombstones.update(int(i) for i in vector_ids)
+            self._tombstone_selector = None
+        else:
+            if index is self._index:
+                self._make_writable()
+                index = self._index
+            with self._index_rw.write():
+                index.remove_ids(
+                    faiss.IDSelectorBatch(
+                        np.array(vector_ids, dtype=np.int64)
+                    )
+                )
+
+    def _index_type(self) -> str:
+        """Name of the backend currently serving queries."""
+        # _rebuild swaps and frees the index from another thread
+        with self._lock:
+            if self._index is None:
+                return "flat"
+            base = faiss.downcast_index(self._index.index)
+            if isinstance(base, faiss.IndexHNSW):
+                return "hnsw"
+            if isinstance(base, faiss.IndexIVFPQ):
+                return "ivfpq"
+            if isinstance(base, faiss.IndexIVF):
+                return "ivf"
+            return "flat"
+
+    def _search_params(
+        self, ef_search: int | None, nprobe: int | None
+    ) -> faiss.SearchParameters | None:
+        """Per-query search knobs for the active backend."""
+        index_type = self._index_type()
+        if index_type == "hnsw":
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = ef_search or settings.hnsw_ef_search
+        elif index_type in ("ivf", "ivfpq"):
+            params = faiss.SearchParametersIVF()
+            params.nprobe = nprobe or settings.ivf_nprobe
+        elif self._tombstones:
+            params = faiss.SearchParameters()
+        else:
+            return None
+
+        if self._tombstones:
+            if self._tombstone_selector is None:
+                self._tombstone_selector = faiss.IDSelectorNot(
+                    faiss.IDSelectorBatch(
+                        np.fromiter(self._tombstones, dtype=np.int64)
+                    )
+                )
+            params.sel = self._tombstone_selector
+        return params
+
+    # ── ANN promotion ───────────────────────────────────────────────────
+
+    def _maybe_promote(self):
+        """Switch from exact to ANN search once the store is large enough."""
+        if (
+            settings.vector_index_type != "flat"
+            and self._index is not None
+            and self._index_type() == "flat"
+            and len(self._documents) >= settings.ann_promotion_threshold
+        ):
+            self._start_rebuild("promotion")
+
+    def _start_rebuild(self, reason: str):
+        """Rebuild the index in a background thread. Hold ``_lock``."""
+        if self._rebuilder is not None and self._rebuilder.is_alive():
+            return
+        self._rebuilder = threading.Thread(
+            target=self._rebuild,
+            args=(reason,),
+            name="vector-store-rebuild",
+            daemon=True,
+        )
+        self._rebuilder.start()
+
+    def _rebuild(self, reason: str):
+        """
+        Build the configured index from stored vectors and swap it in.
+
+        Vectors are copied under the lock, the new index is built without
+        it, then changes made in the meantime are reconciled before the swap.
+        """
+        try:
+            with self._lock:
+                if self._index is None:
+                    return
+                ids = faiss.vector_to_array(self._index.id_map)
+                vectors = self._index.index.reconstruct_n(
+                    0, self._index.ntotal
+                )
+                live = np.isin(ids, self._documents.ids())
+                ids, vectors = ids[live], vectors[live]
+
+            index_type = (
+                settings.vector_index_type
+                if len(ids) >= settings.ann_promotion_threshold
+                else "flat"
+            )
+            logger.info(
+                f"Building {index_type} index over {len(ids)} vectors "
+                f"({reason})"
+            )
+            index = build_index(index_type, vectors)
+            index.add_with_ids(vectors, ids)
+
+            with self._lock:
+                if self._index is None:
+                    return
+                current = self._documents.ids()
+                added = np.setdiff1d(current, ids)
+                stale = np.setdiff1d(ids, current)
+                if len(added):
+                    index.add_with_ids(
+                        np.vstack(
+                            [self._index.reconstruct(int(i)) for i in added]
+                        ),
+                        added,
+                    )
+                self._index = index
+                self._tombstones = set()
+                self._tombstone_selector = None
+                if len(stale):
+                    self._drop_vectors(index, stale.tolist())
+
+            logger.info(f"Switched to {index_type} index ({reason})")
+            self.checkpoint()
+        except Exception as e:
+            logger.error(f"Index rebuild ({reason}) failed: {e}")
 
     def _ensure_index(self, dimension: int):
         """Create index if it doesn't exist."""
         if self._index is None:
             # Using IndexFlatIP (inner product) with normalized vectors = cosine similarity
-            self._index = faiss.IndexFlatIP(dimension)
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
             logger.info(
                 f"Created new FAISS index with dimension {dimension}"
             )
 
-    def add_chunks(self, chunks: list) -> int:
+    # ── Public API ──────────────────────────────────────────────────────
+
+    def add_chunks(
+        self,
+        chunks: list,
+        on_progress: Callable[[int], None] | None = None,
+    ) -> int:
         """
         Add document chunks to the vector store.
 
         Args:
             chunks: List of DocumentChunk objects.
+            on_progress: Optional callback receiving the number of chunks
+                embedded after each embedding batch.
 
         Returns:
             Number of chunks added.
@@ -80,37 +733,67 @@ class VectorStoreService:
         texts = [chunk.text for chunk in chunks]
         metadatas = [chunk.metadata for chunk in chunks]
 
-        # Generate embeddings
-        embeddings = self.embedding_service.embed_texts(texts)
+        # Generate embeddings in batches so progress can be reported
+        embeddings = []
+        batch_size = settings.ingest_embed_batch_size
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            embeddings.extend(self.embedding_service.embed_texts(batch))
+            if on_progress is not None:
+                on_progress(len(batch))
         embeddings_np = np.array(embeddings, dtype=np.float32)
 
         # Normalize for cosine similarity via inner product
         faiss.normalize_L2(embeddings_np)
 
-        # Ensure index exists with correct dimension
-        self._ensure_index(embeddings_np.shape[1])
+        with self._lock:
+            self._mark_dirty()
+            # Ensure index exists with correct dimension
+            self._ensure_index(embeddings_np.shape[1])
+            self._make_writable()
+
+            # Add to FAISS under freshly allocated IDs
+            ids = np.arange(
+                self._next_id, self._next_id + len(chunks), dtype=np.int64
+            )
+            with stage_timer("index_add"), self._index_rw.write():
+                self._index.add_with_ids(embeddings_np, ids)
 
-        # Add to FAISS
-        self._index.add(embeddings_np)
+            # Write texts to disk first; records only keep a reference
+            text_refs = self._append_texts(texts, metadatas)
 
-        # Store metadata
-        for text, meta in zip(texts, metadatas):
-            self._documents.append(
+            # Store metadata
+            documents = [
                 {
                     "id": str(uuid.uuid4()),
-                    "text": text,
+                    "vector_id": vector_id,
+                    "text_ref": text_ref,
                     "metadata": meta,
                 }
-            )
+                for vector_id, text_ref, meta in zip(
+                    ids.tolist(), text_refs, metadatas
+                )
+            ]
+            # Log only the new records; snapshots are written by checkpoints
+            self._persist("add", {"documents": documents}, embeddings_np)
+            self._register(documents)
+            self.generation += 1
+            self._maybe_promote()
 
-        # Persist to disk
-        self._save()
+        if self._wal is None:
+            self.checkpoint()
 
+        CHUNKS_INDEXED.inc(len(chunks))
         logger.info(f"Added {len(chunks)} chunks to vector store")
         return len(chunks)
 
     def query(
-        self, question: str, top_k: int | None = None
+        self,
+        question: str,
+        top_k: int | None = None,
+        ef_search: int | None = None,
+        nprobe: int | None = None,
+        query_embedding: list[float] | None = None,
     ) -> list[dict]:
         """
         Query the vector store for relevant document chunks.
@@ -118,110 +801,144 @@ class VectorStoreService:
         Args:
             question: User question to search for.
             top_k: Number of results to return.
+            ef_search: HNSW search breadth override (higher = better recall).
+            nprobe: IVF lists to visit override (higher = better recall).
+            query_embedding: Precomputed embedding of the question, if the
+                caller already has one.
 
         Returns:
-            List of dicts with 'text', 'metadata', and 'distance' keys.
+            List of dicts with 'id', 'text', 'metadata', and 'distance' keys.
         """
         top_k = top_k or settings.top_k_results
 
-        if self._index is None or self._index.ntotal == 0:
+        if not self._documents:
             logger.warning("Vector store is empty, no results to return")
             return []
 
-        # Clamp top_k to available documents
-        top_k = min(top_k, self._index.ntotal)
+        # Generation is part of the key, so any add/delete misses naturally
+        cache_key = (
+            normalize_question(question),
+            top_k,
+            ef_search,
+            nprobe,
+            self.generation,
+        )
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Query cache hit for: '{question[:50]}...'")
+            return copy.deepcopy(cached)
 
         # Generate query embedding
-        query_embedding = self.embedding_service.embed_query(question)
+        if query_embedding is None:
+            query_embedding = self.embedding_service.embed_query(question)
         query_np = np.array([query_embedding], dtype=np.float32)
         faiss.normalize_L2(query_np)
 
-        # Search
-        distances, indices = self._index.search(query_np, top_k)
-
-        # Format results
-        formatted = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < 0 or idx >= len(self._documents):
-                continue
-            doc = self._documents[idx]
-            formatted.append(
-                {
-                    "text": doc["text"],
-                    "metadata": doc["metadata"],
-                    "distance": float(dist),
-                }
+        with self._lock:
+            if not self._documents:
+                return []
+            cache_key = (*cache_key[:-1], self.generation)
+
+            # Clamp top_k to available documents
+            top_k = min(top_k, len(self._documents))
+
+            # A rebuild may swap these out mid-search; the local references
+            # keep the old index and tombstone selector alive until done
+            index = self._index
+            params = self._search_params(ef_search, nprobe)
+            selector = self._tombstone_selector
+
+        # Search without _lock so retrievals run in parallel
+        with stage_timer("search"), self._index_rw.read():
+            distances, indices = index.search(query_np, top_k, params=params)
+        del selector
+
+        with self._lock:
+            # Hydrate only the hits
+            docs = self._documents.get_many(
+                [int(i) for i in indices[0] if i >= 0]
             )
 
+            # Format results
+            formatted = []
+            for dist, idx in zip(distances[0], indices[0]):
+                doc = docs.get(int(idx))
+                if doc is None:
+                    continue
+                formatted.append(
+                    {
+                        "id": int(idx),
+                        "text": self._chunk_text(doc),
+                        "metadata": doc["metadata"],
+                        "distance": float(dist),
+                    }
+                )
+
+        self._query_cache.put(cache_key, formatted)
         logger.info(
             f"Query returned {len(formatted)} results for: "
             f"'{question[:50]}...'"
         )
-        return formatted
+        # Metadata is shared with the document store and the cache, so
+        # callers get their own copy to mutate
+        return copy.deepcopy(formatted)
+
+    def query_cache_stats(self) -> dict:
+        """Hit rate and size of the exact-match query result cache."""
+        return self._query_cache.stats()
 
     def get_collection_stats(self) -> dict:
         """Get statistics about the current index."""
-        count = self._index.ntotal if self._index else 0
-        return {
-            "collection_name": settings.chroma_collection_name,
-            "total_documents": len(self.list_documents()),
-            "total_chunks": count,
-        }
+        with self._lock:
+            return {
+                "collection_name": settings.chroma_collection_name,
+                "total_documents": len(self._documents.sources()),
+                "total_chunks": len(self._documents),
+                "index_type": self._index_type(),
+            }
 
     def list_documents(self) -> list[str]:
         """
         Return a list of unique document names indexed in the store.
         """
-        if not self._documents:
-            return []
-
-        sources = {doc["metadata"].get("source") for doc in self._documents}
-        return sorted([s for s in sources if s])
+        with self._lock:
+            return self._documents.sources()
 
     def delete_document(self, source_name: str) -> bool:
         """
         Delete all chunks associated with a specific source name.
-        """
-        if self._index is None or not self._documents:
-            return False
 
-        # Filter out chunks from this source
-        new_docs = []
-        for doc in self._documents:
-            if doc["metadata"].get("source") != source_name:
-                new_docs.append(doc)
-
-        if len(new_docs) == len(self._documents):
-            return False  # Nothing found to delete
-
-        # Rebuild index if something was deleted
-        if not new_docs:
-            # Entire store was deleted
-            self.reset_collection()
-        else:
-            # Re-create FAISS index with remaining data
-            texts = [doc["text"] for doc in new_docs]
-            embeddings = self.embedding_service.embed_texts(texts)
-            embeddings_np = np.array(embeddings, dtype=np.float32)
-            faiss.normalize_L2(embeddings_np)
+        Vectors are removed from the index by ID, so the cost scales with
+        the size of the deleted document rather than the whole corpus.
+        """
+        with self._lock:
+            vector_ids = self._documents.ids_for_source(source_name)
+            if not vector_ids:
+                return False  # Nothing found to delete
 
-            # Re-init index
-            self._index = faiss.IndexFlatIP(embeddings_np.shape[1])
-            self._index.add(embeddings_np)
-            self._documents = new_docs
+            self._mark_dirty()
+            removed = self._remove_ids(vector_ids)
+            self._persist("delete", {"vector_ids": removed})
+            self._texts.drop(source_name)
+            self.generation += 1
 
-            # Save changes
-            self._save()
+        if self._wal is None:
+            self.checkpoint()
 
         logger.info(f"Document '{source_name}' deleted from vector store")
         return True
 
     def reset_collection(self) -> None:
         """Delete the index and all metadata."""
-        self._index = None
-        self._documents = []
-        if self._index_path.exists():
-            self._index_path.unlink()
-        if self._meta_path.exists():
-            self._meta_path.unlink()
+        with self._checkpoint_lock, self._lock:
+            self._mark_dirty()
+            self._clear_state()
+            self._checkpoint_seq = self._wal.seq if self._wal else 0
+            if self._wal is not None:
+                self._wal.clear()
+            self._documents.clear()
+            self._texts.clear()
+            self._index_path.unlink(missing_ok=True)
+            self._legacy_meta_path.unlink(missing_ok=True)
+            self.generation += 1
         logger.info("Vector store reset successfully")
@@ -0,0 +1,175 @@
+"""
+Write-ahead log for the vector store.
+Append-only, checksummed segments holding vector store mutations so an
+ingest only writes its own vectors and metadata instead of a full snapshot.
+"""
+
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from loguru import logger
+
+
+@dataclass
+class WalRecord:
+    """A single mutation read back from the log."""
+
+    seq: int
+    op: str
+    payload: dict
+    vectors: np.ndarray | None = None
+
+
+class WriteAheadLog:
+    """
+    Segmented append-only log.
+
+    Each record is framed as ``<crc32, seq, payload_len, vectors_len>``
+    followed by a JSON payload and raw float32 vectors. A torn or corrupt
+    frame marks the end of the log; anything after it is discarded.
+    """
+
+    _HEADER = struct.Struct("<IQII")
+    _SEGMENT_GLOB = "wal-*.log"
+
+    def __init__(self, wal_dir: Path, fsync: bool = True):
+        self._dir = Path(wal_dir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._fsync = fsync
+        self._seq = 0
+        self._handle = None
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last record written or replayed."""
+        return self._seq
+
+    def size_bytes(self) -> int:
+        """Total size of all segments on disk."""
+        return sum(p.stat().st_size for p in self._segments())
+
+    def _segments(self) -> list[Path]:
+        return sorted(self._dir.glob(self._SEGMENT_GLOB))
+
+    def _open_segment(self) -> None:
+        segment = self._dir / f"wal-{self._seq + 1:020d}.log"
+        self._handle = open(segment, "ab")
+
+    def append(
+        self, op: str, payload: dict, vectors: np.ndarray | None = None
+    ) -> int:
+        """
+        Durably append a record.
+
+        Args:
+            op: Operation name (e.g. 'add', 'delete').
+            payload: JSON-serializable operation data.
+            vectors: Optional float32 matrix stored alongside the payload.
+
+        Returns:
+            Sequence number assigned to the record.
+        """
+        if self._handle is None:
+            self._open_segment()
+
+        seq = self._seq + 1
+        meta = {"op": op, **payload}
+        body_vectors = b""
+        if vectors is not None:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            meta["shape"] = list(vectors.shape)
+            body_vectors = vectors.tobytes()
+        body = json.dumps(meta).encode("utf-8")
+
+        crc = zlib.crc32(struct.pack("<Q", seq) + body + body_vectors)
+        self._handle.write(
+            self._HEADER.pack(crc, seq, len(body), len(body_vectors))
+        )
+        self._handle.write(body)
+        self._handle.write(body_vectors)
+        self._handle.flush()
+        if self._fsync:
+            os.fsync(self._handle.fileno())
+
+        self._seq = seq
+        return seq
+
+    def replay(self, after_seq: int = 0) -> Iterator[WalRecord]:
+        """
+        Yield records with a sequence number greater than ``after_seq``.
+
+        Stops at the first incomplete or corrupt frame and truncates the
+        segment there, so a crash mid-append never poisons later writes.
+        """
+        self._seq = max(self._seq, after_seq)
+        for segment in self._segments():
+            with open(segment, "r+b") as f:
+                while True:
+                    offset = f.tell()
+                    header = f.read(self._HEADER.size)
+                    if not header:
+                        break
+                    record = self._read_frame(f, header)
+                    if record is None:
+                        logger.warning(
+                            f"Truncating torn WAL tail in {segment.name} "
+                            f"at offset {offset}"
+                        )
+                        f.truncate(offset)
+                        break
+                    self._seq = max(self._seq, record.seq)
+                    if record.seq > after_seq:
+                        yield record
+
+    def _read_frame(self, f, header: bytes) -> WalRecord | None:
+        if len(header) < self._HEADER.size:
+            return None
+        crc, seq, body_len, vectors_len = self._HEADER.unpack(header)
+        body = f.read(body_len)
+        body_vectors = f.read(vectors_len)
+        if len(body) < body_len or len(body_vectors) < vectors_len:
+            return None
+        if zlib.crc32(struct.pack("<Q", seq) + body + body_vectors) != crc:
+            return None
+
+        payload = json.loads(body)
+        op = payload.pop("op")
+        vectors = None
+        shape = payload.pop("shape", None)
+        if shape is not None:
+            vectors = np.frombuffer(body_vectors, dtype=np.float32).reshape(
+                shape
+            )
+        return WalRecord(seq=seq, op=op, payload=payload, vectors=vectors)
+
+    def rotate(self) -> list[Path]:
+        """
+        Close the active segment so new appends go to a fresh one.
+
+        Returns:
+            Closed segments; safe to delete once a checkpoint covering
+            the current sequence number has been written.
+        """
+        self.close()
+        return self._segments()
+
+    def discard(self, segments: list[Path]) -> None:
+        """Delete segments made redundant by a checkpoint."""
+        for segment in segments:
+            segment.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove every segment (sequence numbering continues)."""
+        self.discard(self.rotate())
+
+    def close(self) -> None:
+        """Close the active segment handle."""
+        if self._handle is not None:
+            self._handle.close()
+        self._handle = None
@@ -0,0 +1,88 @@
+"""
+Benchmark: document deletion latency vs. corpus size.
+
+Builds vector stores of increasing size from synthetic embeddings and
+times ``VectorStoreService.delete_document`` for a single document.
+No embedding model is loaded; vectors are random and pre-normalized.
+
+Usage:
+    python -m benchmarks.bench_delete --sizes 1000 10000 100000
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.pdf_processor import DocumentChunk
+from app.services.vector_store import VectorStoreService
+
+
+class RandomEmbeddingService:
+    """Embedding stand-in that returns random vectors of a fixed size."""
+
+    def __init__(self, dimension: int = 384, seed: int = 0):
+        self.dimension = dimension
+        self._rng = np.random.default_rng(seed)
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        return self._rng.standard_normal(
+            (len(texts), self.dimension), dtype=np.float32
+        )
+
+    def embed_query(self, query: str) -> list[float]:
+        return self._rng.standard_normal(self.dimension, dtype=np.float32)
+
+
+def build_store(
+    persist_dir: str, num_chunks: int, chunks_per_doc: int, dimension: int
+) -> VectorStoreService:
+    """Populate a store with ``num_chunks`` chunks split across documents."""
+    store = VectorStoreService(
+        persist_dir=persist_dir,
+        embedding_service=RandomEmbeddingService(dimension),
+    )
+    chunks = [
+        DocumentChunk(
+            text=f"chunk {i}",
+            metadata={
+                "source": f"doc_{i // chunks_per_doc}.pdf",
+                "page": 1,
+                "chunk_index": i % chunks_per_doc,
+            },
+        )
+        for i in range(num_chunks)
+    ]
+    store.add_chunks(chunks)
+    return store
+
+
+def run(sizes: list[int], chunks_per_doc: int, dimension: int) -> None:
+    print(f"{'chunks':>10} {'delete (ms)':>12}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = build_store(tmp, size, chunks_per_doc, dimension)
+            start = time.perf_counter()
+            store.delete_document("doc_0.pdf")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            store.close()
+        print(f"{size:>10} {elapsed_ms:>12.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 50_000, 200_000],
+    )
+    parser.add_argument("--chunks-per-doc", type=int, default=100)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+    run(args.sizes, args.chunks_per_doc, args.dimension)
+
+
+if __name__ == "__main__":
+    main()
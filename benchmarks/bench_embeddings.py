@@ -0,0 +1,88 @@
+"""
+Benchmark: embedding throughput and agreement across backends.
+
+Encodes a synthetic corpus with the PyTorch backend and each ONNX
+variant, reporting texts/second and cosine similarity of every backend's
+vectors against the PyTorch reference.
+
+Usage:
+    python -m benchmarks.bench_embeddings --num-texts 2000 --batch-size 64
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.embeddings import load_embedding_model
+
+VOCABULARY = (
+    "motor pump bearing vibration temperature sensor voltage current "
+    "frequency lubrication alignment torque gearbox coupling shaft rpm "
+    "maintenance inspection failure threshold alarm spectrum wear seal "
+    "compressor valve pressure flow rate kw hz installation procedure"
+).split()
+
+
+def synthetic_texts(num_texts: int, seed: int = 0) -> list[str]:
+    """Manual-like sentences of varying length."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choices(VOCABULARY, k=rng.randint(8, 160)))
+        for _ in range(num_texts)
+    ]
+
+
+def encode(
+    model, texts: list[str], batch_size: int
+) -> tuple[np.ndarray, float]:
+    model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    vectors = model.encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    return vectors, time.perf_counter() - start
+
+
+def run(num_texts: int, batch_size: int) -> None:
+    texts = synthetic_texts(num_texts)
+    variants = [
+        ("torch", "torch", False),
+        ("onnx", "onnx", False),
+        ("onnx-int8", "onnx", True),
+    ]
+
+    reference = None
+    print(
+        f"{'backend':>10} {'texts/s':>10} {'speedup':>8} "
+        f"{'cos mean':>9} {'cos min':>8}"
+    )
+    for name, backend, quantize in variants:
+        model = load_embedding_model(backend=backend, quantize=quantize)
+        vectors, elapsed = encode(model, texts, batch_size)
+        throughput = num_texts / elapsed
+        if reference is None:
+            reference = (vectors, throughput)
+        cosine = np.sum(vectors * reference[0], axis=1)
+        print(
+            f"{name:>10} {throughput:>10.1f} "
+            f"{throughput / reference[1]:>7.2f}x "
+            f"{cosine.mean():>9.4f} {cosine.min():>8.4f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--num-texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    run(args.num_texts, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
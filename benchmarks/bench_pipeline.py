@@ -0,0 +1,416 @@
+"""
+Benchmark: ingestion and retrieval pipeline, end to end.
+
+Generates synthetic PDFs and corpora and times each pipeline stage:
+``PDFProcessor.process_pdf``, ``EmbeddingService.embed_texts``,
+``VectorStoreService.add_chunks`` / ``query`` / ``delete_document`` and
+``POST /question`` (plain, cached and streamed) through the API with the
+app's ``stub`` LLM provider. Results are written as JSON so runs can be
+compared across commits.
+
+Usage:
+    python -m benchmarks.bench_pipeline --output results.json
+    python -m benchmarks.bench_pipeline --random-embeddings --only store
+    python -m benchmarks.bench_pipeline --compare baseline.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+from app.services.llm_service import StubProvider
+from app.services.pdf_processor import DocumentChunk, PDFProcessor
+from app.services.vector_store import VectorStoreService
+from benchmarks.bench_delete import RandomEmbeddingService
+from benchmarks.bench_embeddings import VOCABULARY, synthetic_texts
+
+SECTIONS = ("pdf", "embed", "store", "question")
+
+
+# ── Synthetic data ──────────────────────────────────────────────────────────
+
+
+def synthetic_pdf(
+    pages: int, lines_per_page: int = 45, seed: int = 0
+) -> bytes:
+    """A text-only PDF of ``pages`` pages of manual-like prose."""
+    rng = random.Random(seed)
+    font_id = 3 + 2 * pages
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{3 + 2 * i} 0 R".encode() for i in range(pages))
+        + f"] /Count {pages} >>".encode(),
+    ]
+    for i in range(pages):
+        lines = [
+            " ".join(rng.choices(VOCABULARY, k=rng.randint(8, 14)))
+            for _ in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 14 TL 50 760 Td " + " ".join(
+            f"({line}) Tj T*" for line in lines
+        ) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} >>\n"
+            f"stream\n{stream}\nendstream".encode()
+        )
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF"
+    ).encode()
+    return bytes(out)
+
+
+def synthetic_chunks(num_chunks: int, chunks_per_doc: int) -> list:
+    return [
+        DocumentChunk(
+            text=text,
+            metadata={
+                "source": f"doc_{i // chunks_per_doc}.pdf",
+                "page": 1 + (i % chunks_per_doc) // 4,
+                "chunk_index": i % chunks_per_doc,
+            },
+        )
+        for i, text in enumerate(synthetic_texts(num_chunks, seed=1))
+    ]
+
+
+def synthetic_questions(count: int, seed: int = 2) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"What is the {' '.join(rng.choices(VOCABULARY, k=4))} {i}?"
+        for i in range(count)
+    ]
+
+
+class RandomAsyncEmbeddingService(RandomEmbeddingService):
+    """Random embeddings, awaitable like EmbeddingService.aembed_query."""
+
+    async def aembed_query(self, query: str) -> list[float]:
+        return self.embed_query(query)
+
+    def batcher_stats(self) -> None:
+        return None
+
+
+# ── Measurement ─────────────────────────────────────────────────────────────
+
+
+def summarize(samples: list[float], items: int = 1) -> dict:
+    """Latency distribution of ``samples`` (seconds), each of ``items``."""
+    ms = np.array(samples) * 1000
+    return {
+        "runs": len(samples),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "items_per_run": items,
+        "items_per_second": round(items * len(samples) / sum(samples), 1),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_pdf(args) -> dict:
+    processor = PDFProcessor()
+    pdf = synthetic_pdf(args.pages)
+    chunks = processor.process_pdf(pdf, "bench.pdf")  # warm-up
+    samples = measure(
+        lambda: processor.process_pdf(pdf, "bench.pdf"), args.repeat
+    )
+    result = summarize(samples, items=args.pages)
+    result["chunks"] = len(chunks)
+    result["pdf_bytes"] = len(pdf)
+    return {"process_pdf": result}
+
+
+def bench_embed(args, embedding_service) -> dict:
+    texts = synthetic_texts(args.num_texts)
+    batch = settings.ingest_embed_batch_size
+    embedding_service.embed_texts(texts[:batch])  # warm-up
+
+    def embed_all():
+        for start in range(0, len(texts), batch):
+            embedding_service.embed_texts(texts[start : start + batch])
+
+    samples = measure(embed_all, args.repeat)
+    return {"embed_texts": summarize(samples, items=len(texts))}
+
+
+def build_store(tmp: str, args, embedding_service) -> tuple:
+    store = VectorStoreService(
+        persist_dir=tmp, embedding_service=embedding_service
+    )
+    chunks = synthetic_chunks(args.num_chunks, args.chunks_per_doc)
+    start = time.perf_counter()
+    store.add_chunks(chunks)
+    return store, time.perf_counter() - start
+
+
+def bench_store(args, embedding_service) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store, add_seconds = build_store(tmp, args, embedding_service)
+        results["add_chunks"] = summarize(
+            [add_seconds], items=args.num_chunks
+        )
+
+        # Distinct questions so the query cache never hits
+        questions = iter(synthetic_questions(args.queries))
+        samples = measure(lambda: store.query(next(questions)), args.queries)
+        results["query"] = summarize(samples)
+
+        documents = store.list_documents()[: args.deletes]
+        names = iter(documents)
+        samples = measure(
+            lambda: store.delete_document(next(names)), len(documents)
+        )
+        if samples:
+            results["delete_document"] = summarize(samples)
+        store.close()
+    return results
+
+
+def bench_question(args, embedding_service) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.api import routes
+    from app.main import app
+
+    quiet_logs()  # app.main installs its own handlers on import
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store, _ = build_store(tmp, args, embedding_service)
+        original = routes.vector_store, routes.llm_service._providers
+        routes.vector_store = store
+        routes.llm_service._providers = [stub_provider(args)]
+        routes.exact_answer_cache.clear()
+        routes.answer_cache.clear()
+        try:
+            with TestClient(app) as client:
+                errors = []
+
+                def post(question: str) -> None:
+                    response = client.post(
+                        "/question", json={"question": question}
+                    )
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+
+                def stream(question: str) -> None:
+                    with client.stream(
+                        "POST", "/question/stream", json={"question": question}
+                    ) as response:
+                        body = response.read()
+                    # Failures after the stream starts arrive as events
+                    if response.status_code != 200 or (
+                        b"event: error" in body
+                    ):
+                        errors.append(response.status_code)
+
+                def run_all(name: str, send, questions: list[str]) -> None:
+                    errors.clear()
+                    pending = iter(questions)
+                    samples = measure(
+                        lambda: send(next(pending)), len(questions)
+                    )
+                    results[name] = summarize(samples)
+                    results[name]["errors"] = len(errors)
+
+                post("warm-up question")
+                questions = synthetic_questions(args.questions, seed=3)
+                run_all("question", post, questions)
+                # The same questions again are exact answer cache hits
+                run_all("question_cached", post, questions)
+                run_all(
+                    "question_stream",
+                    stream,
+                    synthetic_questions(args.questions, seed=4),
+                )
+        finally:
+            routes.vector_store, routes.llm_service._providers = original
+            store.close()
+    return results
+
+
+def stub_provider(args) -> StubProvider:
+    """The app's stub LLM, configured from the command line."""
+    settings.stub_llm_latency_ms = args.llm_latency_ms
+    settings.stub_llm_latency_stddev_ms = args.llm_latency_stddev_ms
+    settings.stub_llm_tokens_per_second = args.llm_tokens_per_second
+    settings.stub_llm_failure_rate = args.llm_failure_rate
+    settings.stub_llm_seed = 0
+    return StubProvider()
+
+
+def quiet_logs() -> None:
+    """Only log warnings, so per-request INFO lines don't skew timings."""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+
+# ── Reporting ───────────────────────────────────────────────────────────────
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print mean and p95 change of every shared benchmark."""
+    print(
+        f"{'benchmark':>18} {'mean (ms)':>12} {'change':>8} "
+        f"{'p95 (ms)':>12} {'change':>8}"
+    )
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        changes = [
+            (result[key], (result[key] / before[key] - 1) * 100)
+            if before[key]
+            else (result[key], 0.0)
+            for key in ("mean_ms", "p95_ms")
+        ]
+        print(
+            f"{name:>18} "
+            + " ".join(
+                f"{value:>12.2f} {pct:>+7.1f}%" for value, pct in changes
+            )
+        )
+
+
+def run(args) -> dict:
+    if args.random_embeddings:
+        embedding_service = RandomAsyncEmbeddingService(args.dimension)
+    else:
+        from app.services.embeddings import EmbeddingService
+
+        embedding_service = EmbeddingService()
+
+    results = {}
+    for section in args.only:
+        started = time.perf_counter()
+        if section == "pdf":
+            results.update(bench_pdf(args))
+        elif section == "embed":
+            results.update(bench_embed(args, embedding_service))
+        elif section == "store":
+            results.update(bench_store(args, embedding_service))
+        elif section == "question":
+            results.update(bench_question(args, embedding_service))
+        print(
+            f"{section}: done in {time.perf_counter() - started:.1f}s",
+            file=sys.stderr,
+        )
+
+    return {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "embeddings": "random" if args.random_embeddings else (
+            f"{settings.embedding_model} ({settings.embedding_backend})"
+        ),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "compare")
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--only", nargs="+", choices=SECTIONS, default=list(SECTIONS)
+    )
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--num-texts", type=int, default=1000)
+    parser.add_argument("--num-chunks", type=int, default=5000)
+    parser.add_argument("--chunks-per-doc", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--deletes", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-stddev-ms", type=float, default=0.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument(
+        "--llm-failure-rate",
+        type=float,
+        default=0.0,
+        help="Share of stub LLM calls that fail (questions then get 500s).",
+    )
+    parser.add_argument(
+        "--random-embeddings",
+        action="store_true",
+        help="Use random vectors instead of loading the embedding model.",
+    )
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--output", help="Write JSON results to this file.")
+    parser.add_argument(
+        "--compare", help="Baseline JSON results to compare against."
+    )
+    args = parser.parse_args()
+
+    quiet_logs()
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
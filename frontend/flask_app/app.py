@@ -64,10 +64,12 @@ def upload():
         if chunk_size: data["chunk_size"] = chunk_size
         if chunk_overlap: data["chunk_overlap"] = chunk_overlap
         
+        # Processamento em segundo plano; o cliente acompanha via /jobs/<id>
         response = requests.post(
             f"{API_BASE_URL}/documents",
             files=upload_files,
             data=data,
+            params={"background": "true"},
             timeout=120
         )
         print(f"DEBUG: Resposta do backend: {response.status_code}")
@@ -76,6 +78,15 @@ def upload():
         print(f"DEBUG: Erro no relay: {str(e)}")
         return jsonify({"detail": str(e)}), 500
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Proxy para consultar o progresso de um upload."""
+    try:
+        response = requests.get(f"{API_BASE_URL}/jobs/{job_id}", timeout=10)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 500
+
 @app.route("/ask", methods=["POST"])
 def ask():
     """Proxy para o endpoint de pergunta do backend."""
@@ -210,11 +210,18 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             const data = await response.json();
 
-            if (response.ok) {
+            if (!response.ok) {
+                showNotification(data.detail || 'Erro ao subir arquivos.', 'error');
+                showModalState('initial');
+                return;
+            }
+
+            const job = await waitForJob(data.id);
+            if (job.status === 'completed') {
                 showModalState('success');
                 checkHealth();
             } else {
-                showNotification(data.detail || 'Erro ao subir arquivos.', 'error');
+                showNotification(job.message || job.detail || 'Erro ao processar arquivos.', 'error');
                 showModalState('initial');
             }
         } catch (err) {
@@ -223,6 +230,17 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    async function waitForJob(jobId) {
+        while (true) {
+            const response = await fetch(`/jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok || job.status === 'completed' || job.status === 'failed') {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     // --- Chat Action ---
     async function sendMessage() {
         const text = userInput.value.trim();
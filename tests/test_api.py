@@ -3,6 +3,8 @@ API integration tests.
 """
 
 import io
+import json
+import time
 
 import pytest
 from fastapi.testclient import TestClient
@@ -72,6 +74,104 @@ class TestHealthEndpoint:
         assert data["status"] in ("healthy", "degraded")
 
 
+class TestProfiling:
+    """Tests for on-demand request profiling."""
+
+    @pytest.fixture
+    def profiling_settings(self, monkeypatch, tmp_path):
+        from app.api import routes
+        from app.config import settings
+        from tests.test_services import FakeLLMProvider
+
+        monkeypatch.setattr(settings, "profiling_enabled", True)
+        monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        chunks = [{"id": 3, "text": "valve opens at 5 bar", "metadata": {}}]
+        monkeypatch.setattr(
+            routes.vector_store, "query", lambda *args, **kwargs: chunks
+        )
+        monkeypatch.setattr(
+            routes.llm_service, "_providers", [FakeLLMProvider()]
+        )
+        routes.answer_cache.clear()
+        routes.exact_answer_cache.clear()
+        return settings
+
+    ADMIN = {"X-Admin-Token": "secret"}
+
+    def test_profiled_question_is_retrievable(self, client, profiling_settings):
+        response = client.post(
+            "/question",
+            json={"question": "When does the valve open"},
+            headers={"X-Profile": "1", **self.ADMIN},
+        )
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+
+        listed = client.get("/admin/profiles", headers=self.ADMIN)
+        assert [p["id"] for p in listed.json()["profiles"]] == [profile_id]
+        text = client.get(
+            f"/admin/profiles/{profile_id}",
+            params={"format": "text"},
+            headers=self.ADMIN,
+        )
+        assert text.status_code == 200
+        assert "function calls" in text.text
+        raw = client.get(f"/admin/profiles/{profile_id}", headers=self.ADMIN)
+        assert raw.headers["content-type"] == "application/octet-stream"
+        missing = client.get("/admin/profiles/missing", headers=self.ADMIN)
+        assert missing.status_code == 404
+
+    def test_admin_token_required(self, client, profiling_settings):
+        question = {"question": "When does the valve open"}
+        assert client.get("/admin/profiles").status_code == 403
+        assert client.post(
+            "/question", json=question, params={"profile": "true"}
+        ).status_code == 403
+        assert client.get(
+            "/admin/profiles", headers=self.ADMIN
+        ).status_code == 200
+
+    def test_refused_without_configured_token(
+        self, client, profiling_settings, monkeypatch
+    ):
+        monkeypatch.setattr(profiling_settings, "admin_token", "")
+        question = {"question": "When does the valve open"}
+        assert client.get("/admin/profiles").status_code == 403
+        assert client.get(
+            "/admin/profiles", headers={"X-Admin-Token": ""}
+        ).status_code == 403
+        assert client.post(
+            "/question", json=question, headers={"X-Profile": "1"}
+        ).status_code == 403
+
+    def test_profiling_disabled(self, client, profiling_settings, monkeypatch):
+        monkeypatch.setattr(profiling_settings, "profiling_enabled", False)
+        response = client.post(
+            "/question",
+            json={"question": "When does the valve open"},
+            headers={"X-Profile": "1"},
+        )
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+        assert client.get("/admin/profiles").status_code == 404
+
+
+class TestMetricsEndpoint:
+    """Tests for the Prometheus metrics endpoint."""
+
+    def test_metrics_exposed(self, client):
+        client.get("/health")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert "rag_stage_duration_seconds" in body
+        assert "rag_index_vectors" in body
+        health = 'method="GET",route="/health"'
+        assert f"rag_http_request_duration_seconds_count{{{health}" in body
+
+
 class TestDocumentUpload:
     """Tests for document upload endpoint."""
 
@@ -97,6 +197,40 @@ class TestDocumentUpload:
         assert response.status_code == 400
 
 
+class TestIngestionJobs:
+    """Tests for background uploads and job polling."""
+
+    def test_background_upload_returns_job(self, client):
+        files = [
+            ("files", ("test.pdf", b"not valid pdf content", "application/pdf"))
+        ]
+        response = client.post(
+            "/documents", files=files, params={"background": "true"}
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job["files"] == ["test.pdf"]
+
+        for _ in range(100):
+            status = client.get(f"/jobs/{job['id']}").json()
+            if status["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.05)
+        assert status["status"] == "failed"
+        assert status["errors"]
+
+    def test_background_upload_validates_files(self, client):
+        files = [("files", ("test.txt", b"not a pdf", "text/plain"))]
+        response = client.post(
+            "/documents", files=files, params={"background": "true"}
+        )
+        assert response.status_code == 400
+
+    def test_unknown_job(self, client):
+        response = client.get("/jobs/does-not-exist")
+        assert response.status_code == 404
+
+
 class TestQuestionEndpoint:
     """Tests for question answering endpoint."""
 
@@ -123,3 +257,168 @@ class TestQuestionEndpoint:
             data="not json",
         )
         assert response.status_code == 422
+
+    def test_question_stream(self, client, monkeypatch):
+        """Streamed answers send references first, then tokens."""
+        from app.api import routes
+        from tests.test_services import FakeLLMProvider
+
+        chunks = [
+            {"id": 1, "text": "motor xxx requires 2.3kw", "metadata": {}}
+        ]
+        monkeypatch.setattr(
+            routes.vector_store, "query", lambda *args, **kwargs: chunks
+        )
+        monkeypatch.setattr(
+            routes.llm_service, "_providers", [FakeLLMProvider()]
+        )
+
+        response = client.post(
+            "/question/stream", json={"question": "Motor power?"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(
+            "text/event-stream"
+        )
+
+        events = [
+            block.split("\n")
+            for block in response.text.strip().split("\n\n")
+        ]
+        names = [lines[0].removeprefix("event: ") for lines in events]
+        assert names[0] == "references"
+        assert names[-1] == "done"
+        tokens = [
+            json.loads(lines[1].removeprefix("data: "))["text"]
+            for lines in events
+            if lines[0] == "event: token"
+        ]
+        assert "".join(tokens) == "The motor uses 2.3 kW."
+        assert routes.admission.stats()["active"] == 0
+
+    def test_stream_releases_slot_when_closed_early(self):
+        """The admission slot is freed even if the stream is abandoned."""
+        import asyncio
+
+        from app.api import routes
+
+        released = []
+
+        async def events():
+            for text in ("one", "two"):
+                yield {"event": "token", "data": {"text": text}}
+
+        async def disconnect():
+            stream = routes._sse(events(), on_close=lambda: released.append(1))
+            await anext(stream)
+            await stream.aclose()
+
+        asyncio.run(disconnect())
+        assert released == [1]
+
+    def test_repeated_question_served_from_cache(self, client, monkeypatch):
+        """A rephrased question with the same context skips the LLM."""
+        from app.api import routes
+        from tests.test_services import FakeLLMProvider
+
+        calls = []
+
+        class Counting(FakeLLMProvider):
+            def generate(self, system_prompt, user_prompt):
+                calls.append(user_prompt)
+                return super().generate(system_prompt, user_prompt)
+
+        chunks = [{"id": 7, "text": "pump flow is 40 m3/h", "metadata": {}}]
+        monkeypatch.setattr(
+            routes.vector_store, "query", lambda *args, **kwargs: chunks
+        )
+        monkeypatch.setattr(routes.llm_service, "_providers", [Counting()])
+        routes.answer_cache.clear()
+        routes.exact_answer_cache.clear()
+
+        first = client.post(
+            "/question", json={"question": "What is the pump flow rate"}
+        )
+        second = client.post(
+            "/question", json={"question": "The pump flow rate is what"}
+        )
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json()
+        assert len(calls) == 1
+
+    def test_search_overrides_not_shared_in_cache(self, client, monkeypatch):
+        """Answers retrieved with different ef_search are cached apart."""
+        from app.api import routes
+        from tests.test_services import FakeLLMProvider
+
+        def query(question, ef_search=None, **kwargs):
+            text = f"retrieved with ef_search={ef_search}"
+            return [{"id": ef_search or 0, "text": text, "metadata": {}}]
+
+        monkeypatch.setattr(routes.vector_store, "query", query)
+        monkeypatch.setattr(
+            routes.llm_service, "_providers", [FakeLLMProvider()]
+        )
+        routes.answer_cache.clear()
+        routes.exact_answer_cache.clear()
+
+        question = {"question": "What is the gear ratio"}
+        default = client.post("/question", json=question)
+        wide = client.post("/question", json={**question, "ef_search": 256})
+        assert default.json()["references"] == [
+            "retrieved with ef_search=None"
+        ]
+        assert wide.json()["references"] == ["retrieved with ef_search=256"]
+
+    def test_question_timings(self, client, monkeypatch):
+        """Stage timings come back as Server-Timing and, on request, JSON."""
+        from app.api import routes
+        from tests.test_services import FakeLLMProvider
+
+        chunks = [{"id": 8, "text": "belt tension 200 N", "metadata": {}}]
+        monkeypatch.setattr(
+            routes.vector_store, "query", lambda *args, **kwargs: chunks
+        )
+        monkeypatch.setattr(
+            routes.llm_service, "_providers", [FakeLLMProvider()]
+        )
+        routes.answer_cache.clear()
+        routes.exact_answer_cache.clear()
+
+        response = client.post(
+            "/question",
+            json={"question": "What is the belt tension", "debug": True},
+        )
+        assert response.status_code == 200
+        header = response.headers["Server-Timing"]
+        assert "retrieve;dur=" in header
+        assert "llm;dur=" in header and 'desc="fake"' in header
+        names = [span["name"] for span in response.json()["timings"]]
+        assert {"embed", "retrieve", "context", "llm", "total"} <= set(names)
+
+        cached = client.post(
+            "/question", json={"question": "What is the belt tension"}
+        )
+        assert cached.json()["timings"] is None
+        assert "exact_cache;dur=" in cached.headers["Server-Timing"]
+
+    def test_question_rejected_when_saturated(self, client, monkeypatch):
+        """Saturation surfaces as 429 with a Retry-After hint."""
+        from app.api import routes
+        from app.services.admission import AdmissionRejected
+
+        async def reject():
+            raise AdmissionRejected(429, "Too many pending questions", 3)
+
+        chunks = [{"id": 9, "text": "gear ratio 3:1", "metadata": {}}]
+        monkeypatch.setattr(
+            routes.vector_store, "query", lambda *args, **kwargs: chunks
+        )
+        monkeypatch.setattr(routes.admission, "acquire", reject)
+
+        for path in ("/question", "/question/stream"):
+            response = client.post(
+                path, json={"question": "Which gear ratio is used today"}
+            )
+            assert response.status_code == 429
+            assert response.headers["retry-after"] == "3"
@@ -2,8 +2,11 @@
 Unit tests for core services.
 """
 
+import zlib
+
 import pytest
 
+from app.services.llm_service import LLMProvider
 from app.services.pdf_processor import PDFProcessor, DocumentChunk
 
 
@@ -108,3 +111,1300 @@ class TestDocumentChunk:
         assert chunk.text == "test text"
         assert chunk.metadata["source"] == "test.pdf"
         assert chunk.metadata["page"] == 1
+
+
+class FakeEmbeddingService:
+    """Deterministic bag-of-words embeddings; avoids loading a model."""
+
+    dimension = 64
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimension
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % self.dimension] += 1.0
+        vector[0] += 1e-3
+        return vector
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, query: str) -> list[float]:
+        return self._embed(query)
+
+
+class TestVectorStoreService:
+    """Tests for FAISS-backed vector store."""
+
+    @pytest.fixture(autouse=True, params=["sqlite", "mmap"])
+    def metadata_backend(self, request, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "metadata_backend", request.param)
+        return request.param
+
+    def setup_method(self):
+        self.embeddings = FakeEmbeddingService()
+
+    def _store(self, path):
+        from app.services.vector_store import VectorStoreService
+
+        return VectorStoreService(
+            persist_dir=path, embedding_service=self.embeddings
+        )
+
+    def _chunks(self, source: str, texts: list[str]) -> list[DocumentChunk]:
+        return [
+            DocumentChunk(
+                text=text,
+                metadata={"source": source, "page": 1, "chunk_index": i},
+            )
+            for i, text in enumerate(texts)
+        ]
+
+    def test_delete_does_not_reembed(self, tmp_path, monkeypatch):
+        """Deleting a document must not re-embed the remaining chunks."""
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power", "pump flow"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+
+        def fail(_texts):
+            raise AssertionError("embed_texts called during delete")
+
+        monkeypatch.setattr(self.embeddings, "embed_texts", fail)
+        assert store.delete_document("a.pdf") is True
+        assert store.list_documents() == ["b.pdf"]
+        assert store.get_collection_stats()["total_chunks"] == 1
+
+        results = store.query("bearing noise", top_k=3)
+        assert [r["text"] for r in results] == ["bearing noise"]
+
+    def test_reading_empty_store_creates_no_database(self, tmp_path):
+        from app.services.document_store import SQLiteDocumentStore
+
+        store = self._store(tmp_path)
+        assert store.get_collection_stats()["total_chunks"] == 0
+        assert store.query("motor power") == []
+        store.close()
+        assert not (tmp_path / SQLiteDocumentStore.DB_NAME).exists()
+
+    def test_delete_unknown_document(self, tmp_path):
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+        assert store.delete_document("missing.pdf") is False
+
+    def test_delete_persists_across_reload(self, tmp_path):
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+        store.delete_document("a.pdf")
+
+        reloaded = self._store(tmp_path)
+        assert reloaded.list_documents() == ["b.pdf"]
+
+        # New IDs must not collide with surviving ones
+        reloaded.add_chunks(self._chunks("c.pdf", ["gear ratio"]))
+        assert reloaded.list_documents() == ["b.pdf", "c.pdf"]
+        assert reloaded.query("gear ratio", top_k=1)[0]["text"] == "gear ratio"
+
+    def test_clean_reload_skips_reconcile(self, tmp_path):
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+        store.close()
+
+        reloaded = self._store(tmp_path)
+        assert reloaded.load_stats["reconciled"] is False
+        reloaded.add_chunks(self._chunks("c.pdf", ["gear ratio"]))
+        assert reloaded.query("gear ratio", top_k=1)[0]["text"] == "gear ratio"
+
+        # Changed and never checkpointed, as after a crash
+        reloaded.delete_document("a.pdf")
+        recovered = self._store(tmp_path)
+        assert recovered.load_stats["reconciled"] is True
+        assert recovered.list_documents() == ["b.pdf", "c.pdf"]
+
+    def test_wal_replay_without_checkpoint(self, tmp_path):
+        """Ingests are recovered from the WAL when no snapshot was written."""
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+        store.delete_document("a.pdf")
+        assert not (tmp_path / "faiss.index").exists()
+
+        reloaded = self._store(tmp_path)
+        assert reloaded.list_documents() == ["b.pdf"]
+        assert reloaded.get_collection_stats()["total_chunks"] == 1
+
+    def test_checkpoint_then_replay(self, tmp_path):
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+        store.checkpoint()
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+
+        reloaded = self._store(tmp_path)
+        assert reloaded.list_documents() == ["a.pdf", "b.pdf"]
+        assert reloaded.get_collection_stats()["total_chunks"] == 2
+
+    def test_wal_torn_tail_is_discarded(self, tmp_path):
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+        store.close()
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("c.pdf", ["gear ratio"]))
+
+        # Simulate a crash halfway through the last append
+        segment = sorted((tmp_path / "wal").glob("wal-*.log"))[-1]
+        segment.write_bytes(segment.read_bytes()[:-10])
+
+        reloaded = self._store(tmp_path)
+        assert reloaded.list_documents() == ["a.pdf", "b.pdf"]
+        reloaded.add_chunks(self._chunks("d.pdf", ["valve seal"]))
+        assert self._store(tmp_path).list_documents() == [
+            "a.pdf",
+            "b.pdf",
+            "d.pdf",
+        ]
+
+    @pytest.mark.parametrize("index_type", ["hnsw", "ivf"])
+    def test_ann_promotion(self, tmp_path, monkeypatch, index_type):
+        """Flat index is swapped for ANN once the threshold is crossed."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "vector_index_type", index_type)
+        monkeypatch.setattr(settings, "ann_promotion_threshold", 40)
+        store = self._store(tmp_path)
+        texts = [f"sensor{i} reading{i * 7} unit{i % 5}" for i in range(50)]
+        store.add_chunks(self._chunks("a.pdf", texts[:30]))
+        assert store.get_collection_stats()["index_type"] == "flat"
+
+        store.add_chunks(self._chunks("b.pdf", texts[30:]))
+        store._rebuilder.join()
+        assert store.get_collection_stats()["index_type"] == index_type
+
+        results = store.query(texts[42], top_k=1, ef_search=128, nprobe=8)
+        assert results[0]["text"] == texts[42]
+
+        store.delete_document("b.pdf")
+        assert store.get_collection_stats()["total_chunks"] == 30
+        assert all(
+            r["metadata"]["source"] == "a.pdf"
+            for r in store.query(texts[42], top_k=5)
+        )
+        store.close()
+        assert self._store(tmp_path).list_documents() == ["a.pdf"]
+
+    @pytest.mark.parametrize("index_type", ["hnsw", "ivf"])
+    def test_ann_delete_keeps_ids_aligned(
+        self, tmp_path, monkeypatch, index_type
+    ):
+        """Deleting an older document leaves later chunks correctly mapped."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "vector_index_type", index_type)
+        monkeypatch.setattr(settings, "ann_promotion_threshold", 40)
+        store = self._store(tmp_path)
+        texts = [f"sensor{i} reading{i * 7} unit{i % 5}" for i in range(60)]
+        store.add_chunks(self._chunks("a.pdf", texts[:5]))
+        store.add_chunks(self._chunks("b.pdf", texts[5:50]))
+        store._rebuilder.join()
+        assert store.get_collection_stats()["index_type"] == index_type
+
+        # Below the compaction ratio, so the ANN index keeps serving
+        store.delete_document("a.pdf")
+        store.add_chunks(self._chunks("c.pdf", texts[50:]))
+        for i in (5, 30, 49, 55):
+            result = store.query(texts[i], top_k=1, ef_search=128, nprobe=8)
+            assert result[0]["text"] == texts[i]
+        assert all(
+            r["metadata"]["source"] != "a.pdf"
+            for r in store.query(texts[2], top_k=10, nprobe=8)
+        )
+        store.close()
+
+    def test_mmap_snapshot_reload_and_mutate(self, tmp_path):
+        """A memory-mapped snapshot stays queryable and becomes writable."""
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power", "pump flow"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+        store.close()
+
+        reloaded = self._store(tmp_path)
+        assert reloaded.load_stats["mmap"] is True
+        assert reloaded.query("pump flow", top_k=1)[0]["text"] == "pump flow"
+
+        reloaded.delete_document("a.pdf")
+        reloaded.add_chunks(self._chunks("c.pdf", ["gear ratio"]))
+        reloaded.checkpoint()
+        reloaded.add_chunks(self._chunks("d.pdf", ["valve seal"]))
+        assert reloaded.list_documents() == ["b.pdf", "c.pdf", "d.pdf"]
+        reloaded.close()
+
+        final = self._store(tmp_path)
+        assert final.list_documents() == ["b.pdf", "c.pdf", "d.pdf"]
+        assert final.query("gear ratio", top_k=1)[0]["text"] == "gear ratio"
+
+    def test_sqlite_imports_mmap_snapshot(self, tmp_path, monkeypatch):
+        """Switching to SQLite imports the existing binary snapshot."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "metadata_backend", "mmap")
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power", "pump flow"]))
+        store.close()
+
+        monkeypatch.setattr(settings, "metadata_backend", "sqlite")
+        migrated = self._store(tmp_path)
+        assert migrated.list_documents() == ["a.pdf"]
+        assert migrated.query("pump flow", top_k=1)[0]["text"] == "pump flow"
+        assert not (tmp_path / "metadata.manifest.json").exists()
+
+    def test_chunk_text_kept_out_of_records(self, tmp_path):
+        """Records only reference text on disk; deletes reclaim it."""
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power", "pump flow"]))
+        store.add_chunks(self._chunks("b.pdf", ["bearing noise"]))
+
+        assert all(
+            "text" not in doc
+            for doc in store._documents.get_many([0, 1, 2]).values()
+        )
+        assert len(list((tmp_path / "texts").glob("*.bin"))) == 2
+
+        store.delete_document("a.pdf")
+        assert len(list((tmp_path / "texts").glob("*.bin"))) == 1
+        assert store.query("bearing noise", top_k=1)[0]["text"] == (
+            "bearing noise"
+        )
+
+    def test_query_cache_invalidated_by_changes(self, tmp_path, monkeypatch):
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power"]))
+
+        calls = []
+        embed = self.embeddings.embed_query
+        monkeypatch.setattr(
+            self.embeddings,
+            "embed_query",
+            lambda q: calls.append(q) or embed(q),
+        )
+
+        first = store.query("Motor power?", top_k=3)
+        first[0]["metadata"]["source"] = "changed.pdf"
+        second = store.query("motor   power", top_k=3)
+        assert len(calls) == 1
+        assert store.query_cache_stats()["hits"] == 1
+        # Hits are copies, so a caller's edits don't leak into the cache
+        assert second[0]["metadata"]["source"] == "a.pdf"
+        second[0]["metadata"]["page"] = 99
+        assert store.query("motor power", top_k=3)[0]["metadata"]["page"] == 1
+
+        # New content bumps the generation, so the cached result is skipped
+        store.add_chunks(self._chunks("b.pdf", ["motor power rating"]))
+        assert len(store.query("motor power", top_k=3)) == 2
+        assert len(calls) == 2
+
+        store.delete_document("b.pdf")
+        assert len(store.query("motor power", top_k=3)) == 1
+        assert len(calls) == 3
+
+    def test_searches_run_in_parallel(self, tmp_path):
+        """A slow search doesn't hold the store lock against others."""
+        import threading
+
+        store = self._store(tmp_path)
+        store.add_chunks(self._chunks("a.pdf", ["motor power", "pump flow"]))
+        entered, release = threading.Event(), threading.Event()
+
+        class Gated:
+            def __init__(self, index):
+                self._inner = index
+
+            def __getattr__(self, name):
+                return getattr(self._inner, name)
+
+            def search(self, *args, **kwargs):
+                entered.set()
+                release.wait(5)
+                return self._inner.search(*args, **kwargs)
+
+        real = store._index
+        store._index = Gated(real)
+        slow = threading.Thread(target=store.query, args=("motor power",))
+        slow.start()
+        assert entered.wait(5)
+        store._index = real
+
+        assert store.query("pump flow", top_k=1)[0]["text"] == "pump flow"
+        assert slow.is_alive()
+        release.set()
+        slow.join()
+
+
+class TestQueryBatcher:
+    """Tests for the query embedding micro-batcher."""
+
+    def test_concurrent_queries_are_coalesced(self):
+        import numpy as np
+        from concurrent.futures import ThreadPoolExecutor
+
+        from app.services.embeddings import QueryBatcher
+
+        calls = []
+
+        def encode(texts):
+            calls.append(len(texts))
+            return np.array([[float(len(t)), 1.0] for t in texts])
+
+        batcher = QueryBatcher(encode, max_batch_size=8, max_wait_ms=50)
+        texts = ["a" * i for i in range(1, 17)]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(batcher.embed, texts))
+        batcher.close()
+
+        assert results == [[float(i), 1.0] for i in range(1, 17)]
+        assert sum(calls) == 16
+        assert len(calls) < 16
+        assert max(calls) <= 8
+        stats = batcher.stats()
+        assert stats["requests"] == 16
+        assert stats["max_batch_size"] == max(calls)
+
+    def test_encode_errors_propagate(self):
+        from app.services.embeddings import QueryBatcher
+
+        def encode(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = QueryBatcher(encode, max_wait_ms=0)
+        with pytest.raises(RuntimeError, match="model unavailable"):
+            batcher.embed("question")
+        batcher.close()
+
+
+class TestEmbeddingBackends:
+    """Tests for embedding backend selection."""
+
+    def test_unknown_backend_rejected(self):
+        from app.services.embeddings import load_embedding_model
+
+        with pytest.raises(ValueError, match="Unknown embedding backend"):
+            load_embedding_model(backend="tpu")
+
+
+class TestIngestionJobManager:
+    """Tests for background ingestion jobs."""
+
+    class PagesProcessor(PDFProcessor):
+        """Treats file content as the text of a single page."""
+
+        def extract_text_from_pdf(self, file_content, filename):
+            if file_content == b"corrupt":
+                raise ValueError(f"Failed to process PDF '{filename}'")
+            return [
+                {"text": file_content.decode(), "page": 1, "source": filename}
+            ]
+
+    def _manager(self, tmp_path, monkeypatch):
+        from app.config import settings
+        from app.services.jobs import IngestionJobManager
+        from app.services.vector_store import VectorStoreService
+
+        monkeypatch.setattr(settings, "ingest_embed_batch_size", 2)
+        store = VectorStoreService(
+            persist_dir=tmp_path, embedding_service=FakeEmbeddingService()
+        )
+        processor = self.PagesProcessor(chunk_size=20, chunk_overlap=5)
+        return IngestionJobManager(processor, store, max_workers=1), store
+
+    def _wait(self, manager, job_id):
+        import asyncio
+
+        return asyncio.run(manager.wait(job_id))
+
+    def test_job_reports_progress_and_result(self, tmp_path, monkeypatch):
+        manager, store = self._manager(tmp_path, monkeypatch)
+        text = "motor power rating. pump flow rate. bearing noise level."
+        job = manager.submit(
+            [("a.pdf", text.encode()), ("bad.pdf", b"corrupt")],
+            errors=["'notes.txt': Not a PDF file, skipped."],
+        )
+        assert job.status in ("queued", "running")
+
+        result = self._wait(manager, job.id)
+        manager.shutdown()
+
+        assert result["status"] == "completed"
+        assert result["pages_extracted"] == 1
+        assert result["chunks_created"] > 2
+        assert result["chunks_embedded"] == result["chunks_created"]
+        assert result["documents_indexed"] == 1
+        assert len(result["errors"]) == 2
+        assert "with warnings" in result["message"]
+        assert store.list_documents() == ["a.pdf"]
+
+    def test_job_fails_when_nothing_indexed(self, tmp_path, monkeypatch):
+        manager, _ = self._manager(tmp_path, monkeypatch)
+        job = manager.submit([("bad.pdf", b"corrupt")])
+        result = self._wait(manager, job.id)
+        manager.shutdown()
+
+        assert result["status"] == "failed"
+        assert result["message"].startswith("No documents")
+        assert manager.get("missing") is None
+
+    def test_unexpected_error_fails_job(self, tmp_path, monkeypatch):
+        manager, _ = self._manager(tmp_path, monkeypatch)
+
+        def crash(*args, **kwargs):
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(manager, "_ingest", crash)
+        job = manager.submit([("a.pdf", b"motor power")])
+        result = self._wait(manager, job.id)
+        manager.shutdown()
+
+        assert result["status"] == "failed"
+        assert result["finished_at"] is not None
+        assert "disk full" in result["message"]
+
+
+class TestBlockingPool:
+    """Tests for the event-loop offloading pools."""
+
+    def test_blocking_calls_do_not_stall_the_loop(self):
+        import asyncio
+        import time
+
+        from app.services.executors import BlockingPool
+
+        pool = BlockingPool("test", max_workers=2)
+
+        async def main():
+            slow = asyncio.create_task(pool.run(time.sleep, 0.2))
+            await asyncio.sleep(0.01)
+            assert pool.stats()["in_flight"] == 1
+
+            # The loop keeps serving other coroutines meanwhile
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            assert time.perf_counter() - started < 0.1
+
+            await slow
+            return await pool.run(sum, [1, 2, 3])
+
+        assert asyncio.run(main()) == 6
+        assert pool.stats() == {"workers": 2, "in_flight": 0, "completed": 2}
+        pool.shutdown()
+
+
+class TestContextAssembly:
+    """Tests for merging, deduplicating and budgeting prompt context."""
+
+    @staticmethod
+    def _chunk(text, page=1, index=0, source="a.pdf"):
+        return {
+            "text": text,
+            "metadata": {"source": source, "page": page, "chunk_index": index},
+        }
+
+    def test_overlapping_chunks_merged(self):
+        from app.services.context import assemble_context
+
+        first = "The motor requires 2.3 kW to operate at a 60 Hz line frequency."
+        second = "to operate at a 60 Hz line frequency. Its rated speed is 1750 rpm."
+        # Retrieved out of document order
+        context = assemble_context(
+            [self._chunk(second, index=1), self._chunk(first, index=0)],
+            max_tokens=0,
+        )
+        assert context.chunks_merged == 1
+        assert context.text.count("60 Hz line frequency") == 1
+        assert "Its rated speed is 1750 rpm." in context.text
+        assert context.tokens_saved > 0
+
+    def test_duplicates_dropped(self):
+        from app.services.context import assemble_context
+
+        text = "Pump P-101 delivers 40 m3/h at 3 bar discharge pressure."
+        context = assemble_context(
+            [
+                self._chunk(text),
+                self._chunk(text, source="copy.pdf"),
+                self._chunk(text[:30], page=2),
+            ],
+            max_tokens=0,
+        )
+        assert context.duplicates_dropped == 2
+        assert context.text.count("Pump P-101") == 1
+
+    def test_token_budget_truncates_lowest_ranked(self):
+        from app.services.context import assemble_context, count_tokens
+
+        chunks = [
+            self._chunk(f"section {page} " + "word " * 200, page=page)
+            for page in range(1, 4)
+        ]
+        context = assemble_context(chunks, max_tokens=400)
+        assert context.truncated
+        assert context.tokens <= 400
+        assert context.text.startswith("[Source 1: a.pdf, Page 1]")
+        assert "section 3" not in context.text
+        assert count_tokens(context.text) == context.tokens
+
+    def test_merge_disabled_keeps_chunks_separate(self):
+        from app.services.context import assemble_context
+
+        first = "The motor requires 2.3 kW to operate at a 60 Hz line frequency."
+        second = "to operate at a 60 Hz line frequency. Its rated speed is 1750 rpm."
+        context = assemble_context(
+            [self._chunk(first, index=0), self._chunk(second, index=1)],
+            max_tokens=0,
+            merge=False,
+        )
+        assert context.chunks_merged == 0
+        assert context.text.count("60 Hz line frequency") == 2
+
+
+class TestRequestTimings:
+    """Tests for request-scoped timing spans."""
+
+    def test_spans_recorded_only_inside_collect(self):
+        from app.services import timing
+
+        with timing.span("ignored"):
+            pass
+        with timing.collect() as timings:
+            with timing.span("embed"):
+                pass
+            with pytest.raises(ValueError):
+                with timing.span("llm", "gemini"):
+                    raise ValueError("boom")
+            timing.record("embed", 0.002)
+        assert [s.name for s in timings.spans] == ["embed", "llm", "embed"]
+        assert timings.spans[1].description == "gemini ValueError"
+        assert timings.totals()["embed"] >= 2.0
+        assert "llm;dur=" in timings.header()
+        assert 'desc="gemini ValueError"' in timings.header()
+
+    def test_pool_threads_record_into_request(self):
+        import asyncio
+
+        from app.services import timing
+        from app.services.executors import BlockingPool
+        from app.services.metrics import stage_timer
+
+        pool = BlockingPool("test", 1)
+
+        @stage_timer("search")
+        def search():
+            return 42
+
+        async def handle():
+            with timing.collect() as timings:
+                assert await pool.run(search) == 42
+            return timings
+
+        try:
+            timings = asyncio.run(handle())
+        finally:
+            pool.shutdown()
+        assert [s.name for s in timings.spans] == ["search"]
+
+
+class FakeLLMProvider(LLMProvider):
+    """Local provider that streams a canned answer word by word."""
+
+    def __init__(self, name="fake", answer="The motor uses 2.3 kW.", fail=False):
+        self.name = name
+        self.answer = answer
+        self.fail = fail
+
+    def generate(self, system_prompt: str, user_prompt: str) -> str:
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return self.answer
+
+    async def astream(self, system_prompt: str, user_prompt: str):
+        answer = await self.agenerate(system_prompt, user_prompt)
+        words = answer.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == 0 else " " + word
+
+
+class TestLLMStreaming:
+    """Tests for streamed and awaitable answers."""
+
+    CHUNKS = [
+        {"text": "motor xxx requires 2.3kw", "metadata": {"source": "a.pdf"}}
+    ]
+
+    def _service(self, providers):
+        from app.services.llm_service import LLMService
+
+        service = LLMService()
+        service._providers = providers
+        return service
+
+    def _events(self, service):
+        import asyncio
+
+        async def collect():
+            return [
+                e async for e in service.astream_answer("power?", self.CHUNKS)
+            ]
+
+        return asyncio.run(collect())
+
+    def test_references_then_tokens(self):
+        service = self._service([FakeLLMProvider()])
+        events = self._events(service)
+
+        assert events[0] == {
+            "event": "references",
+            "data": {"references": ["motor xxx requires 2.3kw"]},
+        }
+        tokens = [e["data"]["text"] for e in events if e["event"] == "token"]
+        assert len(tokens) > 1
+        assert "".join(tokens) == "The motor uses 2.3 kW."
+        assert events[-1]["event"] == "done"
+        assert events[-1]["data"]["provider"] == "fake"
+        assert events[-1]["data"]["context"]["tokens"] > 0
+
+    def test_falls_back_before_first_token(self):
+        service = self._service(
+            [
+                FakeLLMProvider(name="down", fail=True),
+                FakeLLMProvider(name="up"),
+            ]
+        )
+        events = self._events(service)
+        assert events[-1]["data"]["provider"] == "up"
+
+    def test_default_stream_yields_full_answer(self):
+        import asyncio
+
+        from app.services.llm_service import LLMProvider
+
+        class Blocking(LLMProvider):
+            def generate(self, system_prompt, user_prompt):
+                return "full answer"
+
+        async def collect():
+            return [t async for t in Blocking().astream("s", "u")]
+
+        assert asyncio.run(collect()) == ["full answer"]
+
+    def test_blocking_answer_uses_async_path(self):
+        service = self._service(
+            [FakeLLMProvider(name="down", fail=True), FakeLLMProvider()]
+        )
+        result = service.generate_answer("power?", self.CHUNKS)
+        assert result["answer"] == "The motor uses 2.3 kW."
+        assert service.latency_stats()["providers"]["fake"]["samples"] == 1
+
+    def test_concurrent_async_answers(self):
+        """Awaitable answers overlap instead of queueing on threads."""
+        import asyncio
+        import time
+
+        class SlowAsync(FakeLLMProvider):
+            async def agenerate(self, system_prompt, user_prompt):
+                await asyncio.sleep(0.1)
+                return self.answer
+
+        service = self._service([SlowAsync()])
+
+        async def main():
+            return await asyncio.gather(
+                *(
+                    service.agenerate_answer("power?", self.CHUNKS)
+                    for _ in range(200)
+                )
+            )
+
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        assert time.perf_counter() - started < 1.0
+        assert all(r["answer"] == "The motor uses 2.3 kW." for r in results)
+
+
+class TestLLMHedging:
+    """Tests for hedged requests across providers."""
+
+    CHUNKS = TestLLMStreaming.CHUNKS
+
+    class DelayedProvider(FakeLLMProvider):
+        def __init__(self, name, delay, fail=False):
+            super().__init__(name=name, answer=f"answer from {name}", fail=fail)
+            self.delay = delay
+            self.cancelled = False
+
+        async def agenerate(self, system_prompt, user_prompt):
+            import asyncio
+
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+            if self.fail:
+                raise RuntimeError(f"{self.name} unavailable")
+            return self.answer
+
+    @pytest.fixture(autouse=True)
+    def hedging(self, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "llm_hedge_enabled", True)
+        monkeypatch.setattr(settings, "llm_hedge_default_delay_ms", 50)
+        monkeypatch.setattr(settings, "llm_hedge_min_delay_ms", 1)
+        monkeypatch.setattr(settings, "llm_hedge_min_samples", 5)
+
+    def _answer(self, providers):
+        import asyncio
+
+        from app.services.llm_service import LLMService
+
+        service = LLMService()
+        service._providers = providers
+        result = asyncio.run(service.agenerate_answer("power?", self.CHUNKS))
+        return service, result["answer"]
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        slow = self.DelayedProvider("slow", delay=1.0)
+        fast = self.DelayedProvider("fast", delay=0.01)
+        service, answer = self._answer([slow, fast])
+
+        assert answer == "answer from fast"
+        assert slow.cancelled
+        stats = service.latency_stats()
+        assert stats["hedges_fired"] == 1
+        assert stats["hedges_won"] == 1
+
+    def test_fast_primary_is_not_hedged(self):
+        primary = self.DelayedProvider("primary", delay=0.0)
+        secondary = self.DelayedProvider("secondary", delay=0.0)
+        service, answer = self._answer([primary, secondary])
+
+        assert answer == "answer from primary"
+        assert service.latency_stats()["hedges_fired"] == 0
+
+    def test_failure_falls_back_without_waiting(self):
+        import time
+
+        down = self.DelayedProvider("down", delay=0.0, fail=True)
+        up = self.DelayedProvider("up", delay=0.0)
+        started = time.perf_counter()
+        _, answer = self._answer([down, up])
+
+        assert answer == "answer from up"
+        assert time.perf_counter() - started < 0.05
+
+    def test_hedge_delay_adapts_to_observed_latency(self):
+        from app.services.llm_service import LLMService
+
+        service = LLMService()
+        assert service.hedge_delay("gemini") == 0.05
+        for ms in range(1, 101):
+            service._tracker("gemini").record(ms / 1000)
+        assert service.hedge_delay("gemini") == pytest.approx(0.096)
+
+    def test_hedge_delay_stable_when_slow_calls_are_hedged(
+        self, monkeypatch
+    ):
+        """Cancelled slow calls still count, so the delay doesn't drift."""
+        import asyncio
+        import itertools
+
+        from app.config import settings
+        from app.services.llm_service import LLMService
+
+        monkeypatch.setattr(settings, "llm_hedge_default_delay_ms", 25)
+        latencies = itertools.cycle([0.005, 0.01, 0.015, 0.1])
+
+        class Sometimes(self.DelayedProvider):
+            async def agenerate(self, system_prompt, user_prompt):
+                self.delay = next(latencies)
+                return await super().agenerate(system_prompt, user_prompt)
+
+        service = LLMService()
+        service._providers = [
+            Sometimes("primary", delay=0),
+            self.DelayedProvider("backup", delay=0.001),
+        ]
+
+        async def ask_many():
+            for _ in range(24):
+                await service.agenerate_answer("power?", self.CHUNKS)
+
+        asyncio.run(ask_many())
+        assert service.hedge_delay("primary") >= 0.02
+        assert service.latency_stats()["hedges_fired"] <= 8
+
+
+class TestCircuitBreaker:
+    """Tests for per-provider circuit breakers."""
+
+    def _breaker(self, **kwargs):
+        from app.services.circuit_breaker import CircuitBreaker
+
+        options = dict(
+            window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0
+        )
+        options.update(kwargs)
+        return CircuitBreaker("test", **options)
+
+    def test_opens_on_error_rate_and_recovers(self):
+        import time
+
+        breaker = self._breaker(open_seconds=0.05)
+        breaker.record_success(0.1)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == "closed"  # below min_calls
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.allow() is False
+        assert breaker.stats()["score"] == 0.0
+
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        assert breaker.allow() is True
+        assert breaker.allow() is False  # one probe at a time
+        breaker.record_success(0.1)
+        assert breaker.state == "closed"
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_success(2.0)
+        assert breaker.state == "open"
+
+    def test_open_provider_is_skipped(self):
+        import asyncio
+
+        from app.services.llm_service import LLMService
+
+        class Counting(FakeLLMProvider):
+            calls = 0
+
+            def generate(self, system_prompt, user_prompt):
+                Counting.calls += 1
+                return super().generate(system_prompt, user_prompt)
+
+        down = Counting(name="down", fail=True)
+        service = LLMService()
+        service._providers = [down, FakeLLMProvider(name="up")]
+        chunks = TestLLMStreaming.CHUNKS
+
+        async def ask():
+            return await service.agenerate_answer("power?", chunks)
+
+        for _ in range(10):
+            assert asyncio.run(ask())["answer"] == "The motor uses 2.3 kW."
+
+        health = service.provider_health()
+        assert health["down"]["state"] == "open"
+        assert health["up"]["state"] == "closed"
+        assert Counting.calls < 10
+
+
+class TestRateLimiting:
+    """Tests for client-side quotas and 429 retries."""
+
+    class QuotaError(Exception):
+        status_code = 429
+
+    def test_token_bucket_throttles_and_rejects(self):
+        from app.services.rate_limit import TokenBucket
+
+        bucket = TokenBucket(per_minute=60)  # one token a second
+        assert bucket.reserve(60, max_wait=0) == 0.0
+        wait = bucket.reserve(1, max_wait=5)
+        assert 0.9 < wait <= 1.0
+        assert bucket.reserve(10, max_wait=5) is None
+        assert TokenBucket(per_minute=0).reserve(10**6, max_wait=0) == 0.0
+
+    def test_limiter_rejects_beyond_max_wait(self, monkeypatch):
+        import asyncio
+
+        from app.config import settings
+        from app.services.rate_limit import (
+            ProviderRateLimiter,
+            RateLimitExceeded,
+        )
+
+        monkeypatch.setattr(settings, "llm_rate_limit_max_wait_seconds", 0.1)
+        limiter = ProviderRateLimiter("test", rpm=1, tpm=0)
+        asyncio.run(limiter.acquire(100))
+        with pytest.raises(RateLimitExceeded):
+            asyncio.run(limiter.acquire(100))
+        assert limiter.stats()["rejected"] == 1
+
+    def test_rate_limit_detection_and_backoff(self, monkeypatch):
+        from app.config import settings
+        from app.services.rate_limit import backoff_delay, is_rate_limit_error
+
+        assert is_rate_limit_error(self.QuotaError("slow down"))
+        response_error = RuntimeError("slow down")
+        response_error.response = type("R", (), {"status_code": 429})()
+        assert is_rate_limit_error(response_error)
+        gemini_error = RuntimeError("quota")
+        gemini_error.status = "RESOURCE_EXHAUSTED"
+        assert is_rate_limit_error(gemini_error)
+        # Message text alone, e.g. a request ID containing 429, isn't enough
+        assert not is_rate_limit_error(RuntimeError("429 RESOURCE_EXHAUSTED"))
+        assert not is_rate_limit_error(RuntimeError("boom"))
+
+        monkeypatch.setattr(settings, "llm_retry_base_delay_seconds", 1.0)
+        monkeypatch.setattr(settings, "llm_retry_max_delay_seconds", 4.0)
+        for attempt in range(6):
+            assert 0 <= backoff_delay(attempt) <= min(4.0, 2**attempt)
+
+        error = self.QuotaError()
+        error.response = type("R", (), {"headers": {"retry-after": "2"}})()
+        assert backoff_delay(0, error) == 2.0
+
+    def test_429_retried_before_fallback(self, monkeypatch):
+        import asyncio
+
+        from app.config import settings
+        from app.services.llm_service import LLMService
+
+        monkeypatch.setattr(settings, "llm_retry_base_delay_seconds", 0.01)
+        quota_error = self.QuotaError
+
+        class Throttled(FakeLLMProvider):
+            calls = 0
+
+            async def agenerate(self, system_prompt, user_prompt):
+                Throttled.calls += 1
+                if Throttled.calls < 3:
+                    raise quota_error("429 Too Many Requests")
+                return self.answer
+
+        service = LLMService()
+        service._providers = [
+            Throttled(name="primary", answer="from primary"),
+            FakeLLMProvider(name="backup", answer="from backup"),
+        ]
+        result = asyncio.run(
+            service.agenerate_answer("power?", TestLLMStreaming.CHUNKS)
+        )
+        assert result["answer"] == "from primary"
+        assert service.rate_limit_stats()["primary"]["retries"] == 2
+        assert service.provider_health()["primary"]["error_rate"] == 0.0
+
+
+class TestStubProvider:
+    """Tests for the offline load-testing LLM provider."""
+
+    @pytest.fixture
+    def stub_settings(self, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "stub_llm_enabled", True)
+        monkeypatch.setattr(settings, "stub_llm_latency_ms", 1.0)
+        monkeypatch.setattr(settings, "stub_llm_latency_stddev_ms", 0.5)
+        monkeypatch.setattr(settings, "stub_llm_answer_tokens", 5)
+        return settings
+
+    def test_registered_first_when_enabled(self, stub_settings):
+        from app.services.llm_service import LLMService
+
+        service = LLMService()
+        assert service._providers[0].name == "stub"
+
+    def test_deterministic_answers_and_outcomes(
+        self, stub_settings, monkeypatch
+    ):
+        from app.services.llm_service import StubProvider, StubProviderError
+
+        monkeypatch.setattr(stub_settings, "stub_llm_failure_rate", 0.3)
+        monkeypatch.setattr(stub_settings, "stub_llm_rate_limit_rate", 0.2)
+
+        def outcomes(provider):
+            results = []
+            for _ in range(30):
+                try:
+                    results.append(provider.generate("sys", "alpha beta"))
+                except StubProviderError as e:
+                    results.append(e.status_code)
+            return results
+
+        first = outcomes(StubProvider())
+        assert first == outcomes(StubProvider())
+        assert "alpha beta alpha beta alpha" in first
+        assert 429 in first and 500 in first
+
+    def test_streams_tokens_at_configured_rate(
+        self, stub_settings, monkeypatch
+    ):
+        import asyncio
+        import time
+
+        from app.services.llm_service import StubProvider
+
+        monkeypatch.setattr(stub_settings, "stub_llm_latency_stddev_ms", 0)
+        monkeypatch.setattr(stub_settings, "stub_llm_tokens_per_second", 100)
+
+        async def collect():
+            return [t async for t in StubProvider().astream("sys", "word")]
+
+        start = time.perf_counter()
+        tokens = asyncio.run(collect())
+        assert tokens == ["word"] + [" word"] * 4
+        assert time.perf_counter() - start >= 0.04
+
+    def test_injected_429_retried(self, stub_settings, monkeypatch):
+        import asyncio
+
+        from app.services.llm_service import LLMService, StubProvider
+
+        monkeypatch.setattr(stub_settings, "llm_retry_base_delay_seconds", 0)
+        monkeypatch.setattr(stub_settings, "stub_llm_rate_limit_rate", 0.5)
+        service = LLMService()
+        service._providers = [StubProvider()]
+        for _ in range(5):
+            asyncio.run(
+                service.agenerate_answer("power?", TestLLMStreaming.CHUNKS)
+            )
+        assert service.rate_limit_stats()["stub"]["retries"] > 0
+
+
+class TestSemanticAnswerCache:
+    """Tests for the embedding-keyed answer cache."""
+
+    def _cache(self, **kwargs):
+        from app.services.answer_cache import SemanticAnswerCache
+
+        options = dict(threshold=0.9, max_entries=10, ttl_seconds=60)
+        options.update(kwargs)
+        return SemanticAnswerCache(**options)
+
+    def setup_method(self):
+        self.embed = FakeEmbeddingService().embed_query
+        self.result = {"answer": "2.3 kW", "references": ["motor power"]}
+
+    def test_similar_question_hits(self):
+        cache = self._cache()
+        vector = self.embed("motor power rating")
+        cache.store("motor power rating", vector, [1, 2], 0, self.result)
+        rephrased = self.embed("rating motor power")
+        assert cache.lookup(rephrased, [1, 2], 0) == self.result
+        assert cache.lookup(self.embed("pump flow"), [1, 2], 0) is None
+        assert cache.stats()["hits"] == 1
+
+    def test_different_chunks_or_provider_miss(self):
+        cache = self._cache()
+        vector = self.embed("motor power rating")
+        cache.store("motor power rating", vector, [1, 2], 0, self.result)
+        assert cache.lookup(vector, [1, 3], 0) is None
+        assert cache.lookup(vector, [1, 2], 0, provider="openai") is None
+
+    def test_store_change_invalidates(self):
+        cache = self._cache()
+        vector = self.embed("motor power rating")
+        cache.store("motor power rating", vector, [1], 0, self.result)
+        assert cache.lookup(vector, [1], 1) is None
+        assert cache.stats()["entries"] == 0
+
+        # Answers computed against an older generation are not cached
+        cache.store("motor power rating", vector, [1], 0, self.result)
+        assert cache.lookup(vector, [1], 1) is None
+
+    def test_capacity_evicts_least_recent(self):
+        cache = self._cache(max_entries=2)
+        for i, text in enumerate(["motor power", "pump flow", "gear ratio"]):
+            cache.store(text, self.embed(text), [i], 0, {"answer": text})
+        assert cache.stats()["entries"] == 2
+        assert cache.lookup(self.embed("motor power"), [0], 0) is None
+        assert cache.lookup(self.embed("gear ratio"), [2], 0) == {
+            "answer": "gear ratio"
+        }
+
+
+class TestLRUCache:
+    """Tests for the exact-match cache."""
+
+    def test_lru_eviction_and_stats(self):
+        from app.services.cache import LRUCache
+
+        cache = LRUCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "b" is now least recent
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.stats() == {
+            "entries": 2,
+            "max_entries": 2,
+            "hits": 2,
+            "misses": 1,
+            "hit_rate": 0.667,
+        }
+
+    def test_entries_expire(self):
+        import time
+
+        from app.services.cache import LRUCache
+
+        cache = LRUCache(max_entries=2, ttl_seconds=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_normalize_question(self):
+        from app.services.cache import normalize_question
+
+        assert normalize_question("  What is the  Motor power? ") == (
+            "what is the motor power"
+        )
+
+
+class TestSingleFlight:
+    """Tests for in-flight request coalescing."""
+
+    def test_concurrent_calls_share_one_computation(self):
+        import asyncio
+
+        from app.services.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return {"answer": "2.3 kW"}
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.do("motor power", compute) for _ in range(50)),
+                flight.do("pump flow", compute),
+            )
+
+        results = asyncio.run(main())
+        assert len(runs) == 2
+        assert all(r == {"answer": "2.3 kW"} for r in results)
+        assert flight.stats() == {"in_flight": 0, "calls": 51, "coalesced": 49}
+
+    def test_errors_reach_every_waiter(self):
+        import asyncio
+
+        from app.services.singleflight import SingleFlight
+
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.do("q", compute) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(main())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_leader_cancellation_does_not_cancel_followers(self):
+        import asyncio
+
+        from app.services.singleflight import SingleFlight
+
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        async def main():
+            leader = asyncio.create_task(flight.do("q", compute))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do("q", compute))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(main()) == "answer"
+
+
+class TestAdmissionController:
+    """Tests for question admission control."""
+
+    def test_rejects_when_queue_full_or_wait_too_long(self):
+        import asyncio
+
+        from app.services.admission import (
+            AdmissionController,
+            AdmissionRejected,
+        )
+
+        admission = AdmissionController(
+            max_concurrent=1, max_queue=1, max_wait_seconds=0.05
+        )
+
+        async def hold(seconds):
+            async with admission.slot():
+                await asyncio.sleep(seconds)
+
+        async def main():
+            running = asyncio.create_task(hold(0.2))
+            await asyncio.sleep(0.01)
+            queued = asyncio.create_task(hold(0))
+            await asyncio.sleep(0.01)
+            assert admission.stats()["queue_depth"] == 1
+
+            with pytest.raises(AdmissionRejected) as full:
+                await admission.acquire()
+            with pytest.raises(AdmissionRejected) as timed_out:
+                await queued
+            await running
+            return full.value, timed_out.value
+
+        full, timed_out = asyncio.run(main())
+        assert full.status_code == 429
+        assert timed_out.status_code == 503
+        assert full.retry_after >= 1
+
+        stats = admission.stats()
+        assert stats["active"] == 0
+        assert stats["queue_depth"] == 0
+        assert stats["admitted"] == 1
+        assert stats["rejected_queue_full"] == 1
+        assert stats["rejected_timeout"] == 1
+
+    def test_timeouts_racing_releases_keep_every_slot(self):
+        import asyncio
+        import random
+
+        from app.services.admission import (
+            AdmissionController,
+            AdmissionRejected,
+        )
+
+        admission = AdmissionController(
+            max_concurrent=2, max_queue=1000, max_wait_seconds=0.01
+        )
+        rng = random.Random(7)
+
+        async def ask():
+            try:
+                async with admission.slot():
+                    await asyncio.sleep(rng.uniform(0.005, 0.015))
+            except AdmissionRejected:
+                pass
+
+        async def main():
+            await asyncio.gather(*(ask() for _ in range(300)))
+            # Every permit must be back: all slots can be taken at once
+            for _ in range(admission.max_concurrent):
+                await admission.acquire()
+
+        asyncio.run(main())
+        assert admission.stats()["active"] == admission.max_concurrent